@@ -0,0 +1,82 @@
+# api/config.py
+
+"""
+Configuración del API, leída de variables de entorno al importar.
+"""
+
+import os
+
+# Backend de inferencia de los especialistas:
+#   "torch": carga los .pth con PyTorch (por defecto)
+#   "numpy": usa los paquetes .npz exportados con scripts/export_numpy_weights.py
+#            y no importa torch en ningún momento
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").strip().lower()
+
+if INFERENCE_BACKEND not in ("torch", "numpy"):
+    raise ValueError(f"INFERENCE_BACKEND debe ser 'torch' o 'numpy', no '{INFERENCE_BACKEND}'")
+
+# Ejecutor del trabajo de CPU de las rutas de predicción (ver api/utils/executor.py):
+#   EXECUTOR_KIND: "thread" (por defecto) o "process"
+#   EXECUTOR_WORKERS: tamaño del pool
+#   EXECUTOR_QUEUE_LIMIT: peticiones que pueden esperar un worker antes de responder 503
+EXECUTOR_KIND = os.getenv("EXECUTOR_KIND", "thread").strip().lower()
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", str(os.cpu_count() or 1)))
+EXECUTOR_QUEUE_LIMIT = int(os.getenv("EXECUTOR_QUEUE_LIMIT", "32"))
+
+# Micro-batching de /judge/predict y /ensemble/predict (ver api/utils/batching.py):
+#   BATCH_WINDOW_MS: tiempo máximo que una petición espera a que se forme un lote (0 lo desactiva)
+#   BATCH_MAX_ROWS: filas a partir de las cuales el lote se procesa sin esperar la ventana
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "3"))
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "64"))
+
+# Caché de resultados de /judge/predict y /ensemble/predict (ver api/utils/cache.py):
+#   CACHE_BACKEND: "memory" (LRU por proceso, por defecto) o "sqlite" (archivo compartido
+#                  entre workers)
+#   CACHE_MAX_ENTRIES: resultados guardados por endpoint (0 desactiva la caché)
+#   CACHE_TTL_SECONDS: vigencia de cada resultado (0 = sin vencimiento)
+#   CACHE_SQLITE_PATH: archivo del backend sqlite
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+CACHE_SQLITE_PATH = os.getenv(
+    "CACHE_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs", "cache", "predictions.sqlite3")
+)
+
+if CACHE_BACKEND not in ("memory", "sqlite"):
+    raise ValueError(f"CACHE_BACKEND debe ser 'memory' o 'sqlite', no '{CACHE_BACKEND}'")
+
+# Almacén precalculado del catálogo Kepler (ver api/services/catalog_service.py):
+#   CATALOG_AUTO_REBUILD: reconstruir el almacén en segundo plano cuando falta o cambian
+#                         los pesos, los artefactos de preprocesamiento o Kepler.csv
+CATALOG_AUTO_REBUILD = os.getenv("CATALOG_AUTO_REBUILD", "1").strip().lower() not in ("0", "false", "no")
+
+# Validación de entrada (ver api/utils/validation.py):
+#   VALIDATION_BUDGET_US: tiempo máximo esperado por validación; las que lo superan se
+#                         cuentan en /stats/validation
+VALIDATION_BUDGET_US = float(os.getenv("VALIDATION_BUDGET_US", "100"))
+
+# Calentamiento al arrancar (ver api/utils/warmup.py):
+#   WARMUP_ON_STARTUP: cargar los modelos y ejecutar un lote sintético antes de reportar
+#                      /ready (si es 0, /ready responde listo de inmediato)
+#   WARMUP_ROUNDS: pasadas del lote sintético por cada tamaño de lote
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1").strip().lower() not in ("0", "false", "no")
+WARMUP_ROUNDS = int(os.getenv("WARMUP_ROUNDS", "3"))
+
+# Artefactos de preprocesamiento (ver api/utils/preprocessing_artifacts.py):
+#   PREPROCESSING_FORMAT: "mmap" (por defecto) lee el paquete de arrays con memory-map y
+#                         lo regenera desde imputer.gz/scaler.gz si falta o quedó
+#                         desactualizado; "joblib" carga directamente los .gz
+PREPROCESSING_FORMAT = os.getenv("PREPROCESSING_FORMAT", "mmap").strip().lower()
+
+if PREPROCESSING_FORMAT not in ("mmap", "joblib"):
+    raise ValueError(f"PREPROCESSING_FORMAT debe ser 'mmap' o 'joblib', no '{PREPROCESSING_FORMAT}'")
+
+# Servidor pre-fork (ver api/server.py; python -m api.server):
+#   SERVER_WORKERS: procesos worker que atienden peticiones; todos comparten los modelos
+#                   cargados una sola vez en el proceso padre
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+
+# Métricas Prometheus (ver api/utils/metrics.py; GET /metrics):
+#   METRICS_ENABLED: medir las etapas del pipeline y las peticiones HTTP (0 lo desactiva)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").strip().lower() not in ("0", "false", "no")
@@ -8,11 +8,36 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from api.routes import fotometria, orbital, estelar, falsos_positivos, ensemble, judge
+from api.config import WARMUP_ON_STARTUP
+from api.routes import fotometria, orbital, estelar, falsos_positivos, ensemble, judge, stats, catalog
+from api.utils.executor import executor
+from api.utils import metrics, warmup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida del API: al arrancar carga los modelos y calienta el pipeline en
+    segundo plano (/ready responde 503 hasta que termina); al apagar se detiene el
+    pool de inferencia.
+    """
+    warmup_task = None
+    if WARMUP_ON_STARTUP:
+        warmup_task = asyncio.ensure_future(warmup.run_warm_up())
+    else:
+        warmup.mark_ready()
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    executor.shutdown()
+
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -20,7 +45,8 @@ app = FastAPI(
     description="API para detección de exoplanetas usando modelos especialistas de deep learning + Juez Final",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -32,6 +58,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas de las peticiones HTTP (GET /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Registrar rutas
 app.include_router(fotometria.router)
 app.include_router(orbital.router)
@@ -39,6 +68,8 @@ app.include_router(estelar.router)
 app.include_router(falsos_positivos.router)
 app.include_router(ensemble.router)
 app.include_router(judge.router)  # ← NUEVO: Juez Final
+app.include_router(stats.router)
+app.include_router(catalog.router)
 
 
 @app.get("/")
@@ -56,9 +87,25 @@ async def root():
             },
             "aggregators": {
                 "ensemble": "/ensemble/predict",
-                "judge": "/judge/predict"  # ← NUEVO
+                "judge": "/judge/predict",  # ← NUEVO
+                "judge_batch": "/judge/predict-batch",
+                "judge_file": "/judge/predict-file"
             }
         },
+        "catalog": {
+            "by_kepoi_name": "/catalog/{kepoi_name}",
+            "by_kepid": "/catalog?kepid={kepid}"
+        },
+        "stats": {
+            "batching": "/stats/batching",
+            "cache": "/stats/cache",
+            "validation": "/stats/validation",
+            "prometheus": "/metrics"
+        },
+        "probes": {
+            "liveness": "/health",
+            "readiness": "/ready"
+        },
         "docs": "/docs",
         "description": "Sistema jerárquico: 4 especialistas → Ensemble (promedio) + Judge (regresión logística)"
     }
@@ -66,7 +113,10 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Endpoint de salud general del API."""
+    """
+    Liveness: el proceso responde. No carga modelos ni espera al calentamiento;
+    para saber si el API puede atender predicciones usar /ready.
+    """
     return {
         "status": "healthy",
         "api": "exoplanet-detection",
@@ -74,10 +124,43 @@ async def health():
         "models": {
             "specialists": 4,
             "aggregators": 2
-        }
+        },
+        "executor": executor.stats()
     }
 
 
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: modelos cargados y pipeline calentado.
+    
+    Returns:
+        Duración del calentamiento y de cada paso (en segundos)
+        
+    Raises:
+        HTTPException (503): Mientras el calentamiento no termina (o si falló)
+    """
+    state = warmup.readiness()
+    if not state["ready"]:
+        raise HTTPException(
+            status_code=503,
+            detail={"status": "error" if state["error"] else "warming_up", **state},
+            headers={"Retry-After": "1"}
+        )
+    return {"status": "ready", **state}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Métricas en el formato de texto de Prometheus: latencia de cada etapa del
+    pipeline (histogramas), peticiones por ruta y estado, peticiones en curso y
+    throughput. Ver api/utils/metrics.py.
+    """
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     # Ejecutar servidor
     uvicorn.run(
@@ -0,0 +1,95 @@
+# api/routes/catalog.py
+
+from fastapi import APIRouter, HTTPException, Query
+import logging
+
+from api.services import catalog_service
+
+router = APIRouter(prefix="/catalog", tags=["Catálogo"])
+
+# Segundos sugeridos al cliente para reintentar mientras se construye el almacén
+RETRY_AFTER_SECONDS = 30
+
+
+def unavailable(error: Exception) -> HTTPException:
+    """Respuesta 503 mientras el almacén no está construido."""
+    logging.warning(f"Consulta al catálogo sin almacén disponible: {str(error)}")
+    return HTTPException(
+        status_code=503,
+        detail=f"{str(error)}; se está construyendo, intente de nuevo en unos segundos",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
+
+
+@router.get("/health")
+async def health_check():
+    """
+    Estado del almacén precalculado del catálogo.
+
+    Returns:
+        Filas, fecha de construcción, huella de los artefactos y si hay una
+        reconstrucción en curso
+    """
+    return {
+        "status": "healthy" if catalog_service.get_store() is not None else "building",
+        "service": "catalog",
+        "store": catalog_service.status()
+    }
+
+
+@router.get("")
+async def lookup_by_kepid(kepid: int = Query(..., description="ID Kepler de la estrella")):
+    """
+    Resultados precalculados de todos los KOIs de una estrella.
+
+    Args:
+        kepid: ID Kepler de la estrella
+
+    Returns:
+        Un resultado por KOI con el mismo formato que /judge/predict
+
+    Raises:
+        HTTPException (404): Si el kepid no está en el catálogo
+        HTTPException (503): Si el almacén aún no está disponible
+    """
+    try:
+        results = catalog_service.lookup_kepid(kepid)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"kepid {kepid} no está en el catálogo")
+    except RuntimeError as e:
+        raise unavailable(e)
+
+    return {
+        "status": "success",
+        "kepid": kepid,
+        "count": len(results),
+        "results": results
+    }
+
+
+@router.get("/{kepoi_name}")
+async def lookup_by_kepoi_name(kepoi_name: str):
+    """
+    Resultado precalculado de un KOI (especialistas + juez), sin evaluar los modelos.
+
+    Args:
+        kepoi_name: Nombre del KOI (p. ej. K00752.01)
+
+    Returns:
+        IDs y disposición del KOI, y el resultado con el mismo formato que /judge/predict
+
+    Raises:
+        HTTPException (404): Si el KOI no está en el catálogo
+        HTTPException (503): Si el almacén aún no está disponible
+    """
+    try:
+        result = catalog_service.lookup_kepoi_name(kepoi_name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"{kepoi_name} no está en el catálogo")
+    except RuntimeError as e:
+        raise unavailable(e)
+
+    return {
+        "status": "success",
+        **result
+    }
@@ -1,10 +1,14 @@
 # api/routes/ensemble.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-from api.utils.preprocessing import preprocess_input, validate_input
+from api.utils.preprocessing import preprocess_input
+from api.utils.validation import ValidationError, validate_payload
+from api.utils.executor import inference_slot
+from api.utils.batching import MicroBatcher
+from api.utils.cache import PredictionCache
 from api.services import ensemble_service
 
 router = APIRouter(prefix="/ensemble", tags=["Ensemble"])
@@ -15,7 +19,27 @@ class PredictionRequest(BaseModel):
     data: Dict[str, Any]
 
 
-@router.post("/predict")
+def predict_ensemble_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Preprocesa y evalúa con el ensemble un lote de peticiones de /predict.
+    
+    Args:
+        rows: Datos validados de cada petición (ValidatedRecord)
+        
+    Returns:
+        Predicción combinada para cada petición, en el mismo orden
+    """
+    return ensemble_service.predict_ensemble_batch(preprocess_input(rows))
+
+
+# Agrupa las peticiones concurrentes a /predict
+ensemble_batcher = MicroBatcher("ensemble", predict_ensemble_rows)
+
+# Resultados ya calculados de /predict
+ensemble_cache = PredictionCache("ensemble")
+
+
+@router.post("/predict", dependencies=[Depends(inference_slot)])
 async def predict_ensemble(request: PredictionRequest):
     """
     Endpoint para realizar predicciones usando todos los modelos especialistas.
@@ -28,22 +52,26 @@ async def predict_ensemble(request: PredictionRequest):
         Predicción combinada de todos los modelos
     """
     try:
-        # Validar entrada
-        is_valid, error_msg = validate_input(request.data)
-        if not is_valid:
-            raise HTTPException(status_code=400, detail=error_msg)
-        
-        # Preprocesar datos
-        processed_data = preprocess_input(request.data)
+        # Validar entrada (features de los 4 especialistas, en una sola pasada)
+        try:
+            record = validate_payload(request.data, 'ensemble')
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=e.message)
         
-        # Realizar predicción con todos los modelos
-        prediction = ensemble_service.predict_ensemble(processed_data)
+        # Responder desde la caché si esta entrada ya se evaluó; si no, preprocesar y
+        # predecir con todos los modelos (las peticiones concurrentes van en un solo lote)
+        prediction = await ensemble_cache.get_async(record)
+        if prediction is None:
+            prediction = await ensemble_batcher.submit(record)
+            await ensemble_cache.put_async(record, prediction)
         
         return {
             "status": "success",
             "result": prediction
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
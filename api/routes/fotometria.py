@@ -1,11 +1,13 @@
 # api/routes/fotometria.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Dict, Any
 import logging
 
-from api.utils.preprocessing import preprocess_input, validate_input
+from api.utils.preprocessing import preprocess_input
+from api.utils.validation import ValidationError, validate_payload
+from api.utils.executor import inference_slot, run_blocking
 from api.utils.feature_groups import get_base_features, get_feature_group
 from api.services import fotometria_service
 
@@ -33,7 +35,7 @@ class PredictionRequest(BaseModel):
         }
 
 
-@router.post("/predict")
+@router.post("/predict", dependencies=[Depends(inference_slot)])
 async def predict_fotometria(request: PredictionRequest):
     """
     Endpoint para realizar predicciones usando el modelo de fotometría.
@@ -53,16 +55,18 @@ async def predict_fotometria(request: PredictionRequest):
     Raises:
         HTTPException (400): Si faltan características requeridas
         HTTPException (500): Si hay errores en el procesamiento o predicción
+        HTTPException (503): Si el servidor está saturado
     """
     try:
         # Validar datos de entrada usando feature_groups
-        is_valid, error_msg = validate_input(request.data, 'fotometria')
-        if not is_valid:
-            logging.error(f"Error de validación: {error_msg}")
+        try:
+            record = validate_payload(request.data, 'fotometria')
+        except ValidationError as e:
+            logging.error(f"Error de validación: {e.message}")
             raise HTTPException(
                 status_code=400, 
                 detail={
-                    "error": error_msg,
+                    "error": e.message,
                     "required_features": {
                         "base_features": get_base_features('fotometria'),
                         "all_features": get_feature_group('fotometria')
@@ -72,7 +76,7 @@ async def predict_fotometria(request: PredictionRequest):
 
         # Preprocesar datos
         try:
-            processed_data = preprocess_input(request.data)
+            processed_data = await run_blocking(preprocess_input, record)
             logging.info("Datos preprocesados exitosamente")
         except Exception as e:
             logging.error(f"Error en preprocesamiento: {str(e)}")
@@ -83,7 +87,7 @@ async def predict_fotometria(request: PredictionRequest):
 
         # Realizar predicción
         try:
-            prediction = fotometria_service.predict(processed_data)
+            prediction = await run_blocking(fotometria_service.predict, processed_data)
             logging.info(f"Predicción exitosa: {prediction}")
             
             return {
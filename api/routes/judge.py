@@ -1,16 +1,48 @@
 # api/routes/judge.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
 from pydantic import BaseModel
-from typing import Dict, Any
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+from typing import Dict, Any, List, Tuple
+import asyncio
+import csv
+import io
+import json
 import logging
+import time
 
-from api.utils.preprocessing import preprocess_input, validate_input
+from api.utils.preprocessing import preprocess_input, preprocess_matrix
+from api.utils.validation import VALIDATION_SCHEMA, ValidationError, validate_payload
+from api.utils.executor import executor, acquire_slot, inference_slot, run_blocking
+from api.utils.csv_stream import (
+    BodyStreamingResponse, CSVBlockReader, missing_raw_columns, parse_block, request_file_chunks
+)
+from api.utils.batching import MicroBatcher
+from api.utils.cache import PredictionCache
 from api.utils.feature_groups import get_base_features, get_feature_group
+from api.utils import metrics
 from api.services import judge_service
 
 router = APIRouter(prefix="/judge", tags=["Judge"])
 
+SPECIALISTS = ['fotometria', 'orbital', 'estelar', 'falsos_positivos']
+
+# Identificadores del candidato que se devuelven tal cual en cada resultado del lote
+ID_FIELDS = ['kepid', 'kepoi_name']
+
+# Máximo de candidatos aceptados en una sola llamada a /predict-batch
+MAX_BATCH_ROWS = 10000
+
+# Filas por bloque en /predict-file (acota la memoria de cada petición)
+FILE_BLOCK_ROWS = 1024
+
+# Formatos de salida de /predict-file
+FILE_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
 
 class PredictionRequest(BaseModel):
     """Modelo de datos para la solicitud de predicción."""
@@ -67,7 +99,36 @@ class PredictionRequest(BaseModel):
         }
 
 
-@router.post("/predict")
+def predict_judge_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Preprocesa y evalúa con el juez un lote de peticiones de /predict.
+    
+    Args:
+        rows: Datos validados de cada petición (ValidatedRecord)
+        
+    Returns:
+        Resultado del juez para cada petición, en el mismo orden
+        
+    Raises:
+        ValueError: Si hay errores en el preprocesamiento o la predicción
+    """
+    try:
+        processed_data = preprocess_input(rows)
+    except Exception as e:
+        logging.error(f"Error en preprocesamiento: {str(e)}")
+        raise ValueError(f"Error al preprocesar datos: {str(e)}")
+    
+    return judge_service.predict_batch(processed_data)
+
+
+# Agrupa las peticiones concurrentes a /predict
+judge_batcher = MicroBatcher("judge", predict_judge_rows)
+
+# Resultados ya calculados de /predict y /predict-batch
+judge_cache = PredictionCache("judge")
+
+
+@router.post("/predict", dependencies=[Depends(inference_slot)])
 async def predict_judge(request: PredictionRequest):
     """
     Endpoint para realizar predicciones usando el Juez Final (Regresión Logística).
@@ -95,42 +156,36 @@ async def predict_judge(request: PredictionRequest):
     Raises:
         HTTPException (400): Si faltan características o hay errores de validación
         HTTPException (500): Si hay errores en el procesamiento o predicción
+        HTTPException (503): Si el servidor está saturado
     """
     try:
-        # 1. Validar características para todos los modelos
-        required_features = {
-            model: get_base_features(model)
-            for model in ['fotometria', 'orbital', 'estelar', 'falsos_positivos']
-        }
-        
-        # Validar características para cada modelo especialista
-        for model_type, features in required_features.items():
-            is_valid, error_msg = validate_input(request.data, model_type)
-            if not is_valid:
-                logging.error(f"Error de validación en {model_type}: {error_msg}")
-                raise HTTPException(
-                    status_code=400, 
-                    detail={
-                        "error": f"Error en características de {model_type}",
-                        "message": error_msg,
-                        "required_features": features
-                    }
-                )
-
-        # 2. Preprocesar datos para todos los modelos
+        # 1. Validar características para los 4 especialistas en una sola pasada
         try:
-            processed_data = preprocess_input(request.data)
-            logging.info("Datos preprocesados exitosamente para todos los modelos")
-        except Exception as e:
-            logging.error(f"Error en preprocesamiento: {str(e)}")
+            record = validate_payload(request.data, SPECIALISTS)
+        except ValidationError as e:
+            logging.error(f"Error de validación en {e.model_type}: {e.message}")
             raise HTTPException(
                 status_code=400, 
-                detail=f"Error al preprocesar datos: {str(e)}"
+                detail={
+                    "error": f"Error en características de {e.model_type}" if e.model_type else "Datos de entrada inválidos",
+                    "message": e.message,
+                    "required_features": get_base_features(e.model_type)
+                }
             )
 
-        # 3. Obtener predicción del juez (incluye predicciones de especialistas)
+        # 2. Responder desde la caché si esta entrada ya se evaluó
+        cached = await judge_cache.get_async(record)
+        if cached is not None:
+            return {
+                "status": "success",
+                "result": cached
+            }
+
+        # 3. Preprocesar y obtener la predicción del juez (incluye predicciones de
+        #    especialistas); las peticiones concurrentes se procesan en un solo lote
         try:
-            prediction = judge_service.predict(processed_data)
+            prediction = await judge_batcher.submit(record)
+            await judge_cache.put_async(record, prediction)
             logging.info("Predicción del juez completada exitosamente")
             
             return {
@@ -162,6 +217,309 @@ async def predict_judge(request: PredictionRequest):
         )
 
 
+def parse_batch_body(body: bytes, content_type: str) -> List[Dict[str, Any]]:
+    """
+    Interpreta el cuerpo de /predict-batch como un array JSON o como NDJSON.
+    
+    Args:
+        body: Cuerpo crudo de la petición
+        content_type: Cabecera Content-Type de la petición
+        
+    Returns:
+        Lista de diccionarios, uno por candidato
+        
+    Raises:
+        ValueError: Si el cuerpo no es un array JSON / NDJSON de objetos
+    """
+    text = body.decode("utf-8").strip()
+    if not text:
+        raise ValueError("El cuerpo de la petición está vacío")
+    
+    if "ndjson" in content_type or not text.startswith("["):
+        rows = []
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Línea {line_number} no es JSON válido: {str(e)}")
+    else:
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"El cuerpo no es JSON válido: {str(e)}")
+    
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Se esperaba un array JSON (o NDJSON) de objetos con las características")
+    return rows
+
+
+def validate_batch_rows(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """
+    Valida cada fila del lote para los 4 especialistas.
+    
+    Las filas válidas se reemplazan en `rows` por su ValidatedRecord.
+    
+    Args:
+        rows: Candidatos del lote
+        
+    Returns:
+        (resultados iniciales con los IDs de cada fila y el error de las inválidas,
+         índices de las filas válidas)
+    """
+    results: List[Dict[str, Any]] = [
+        {field: row[field] for field in ID_FIELDS if field in row}
+        for row in rows
+    ]
+    valid_indices = []
+    for i, row in enumerate(rows):
+        try:
+            rows[i] = VALIDATION_SCHEMA.validate(row, SPECIALISTS)
+        except ValidationError as e:
+            results[i].update({
+                "status": "error",
+                "error": f"Error en características de {e.model_type}: {e.message}"
+            })
+        else:
+            valid_indices.append(i)
+    return results, valid_indices
+
+
+@router.post("/predict-batch", dependencies=[Depends(inference_slot)])
+async def predict_judge_batch(request: Request):
+    """
+    Endpoint para evaluar muchos candidatos con el Juez Final en una sola llamada.
+    
+    Acepta un array JSON o NDJSON (un objeto por línea, Content-Type
+    application/x-ndjson) donde cada objeto contiene las mismas características
+    que /judge/predict, más opcionalmente `kepid` y/o `kepoi_name`.
+    
+    El preprocesamiento, los 4 especialistas y el juez se ejecutan una sola vez
+    sobre la matriz completa, por lo que el costo por fila es mucho menor que
+    llamar a /judge/predict fila por fila.
+    
+    Args:
+        request: Petición con el lote de candidatos
+        
+    Returns:
+        Un resultado por fila, en el mismo orden de entrada, con los IDs del
+        candidato y el mismo formato de resultado que /judge/predict. Las filas
+        con errores de validación se devuelven con status "error".
+        
+    Raises:
+        HTTPException (400): Si el cuerpo no se puede interpretar o el lote está vacío
+        HTTPException (413): Si el lote supera MAX_BATCH_ROWS filas
+        HTTPException (500): Si hay errores en el procesamiento o predicción
+        HTTPException (503): Si el servidor está saturado
+    """
+    body = await request.body()
+    started = time.perf_counter()
+    try:
+        rows = parse_batch_body(body, request.headers.get("content-type", ""))
+        metrics.observe_stage("parse", started)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not rows:
+        raise HTTPException(status_code=400, detail="El lote no contiene candidatos")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote tiene {len(rows)} filas; el máximo es {MAX_BATCH_ROWS}"
+        )
+    
+    # 1. Validar cada fila; las inválidas se reportan sin detener el lote
+    results, valid_indices = await run_blocking(validate_batch_rows, rows)
+    
+    # 2. Tomar de la caché las filas ya evaluadas
+    if valid_indices:
+        cached = await judge_cache.get_many_async([rows[i] for i in valid_indices])
+        for i, prediction in zip(valid_indices, cached):
+            if prediction is not None:
+                results[i].update({"status": "success", "result": prediction})
+    pending_indices = [i for i in valid_indices if "result" not in results[i]]
+    
+    # 3. Preprocesar y predecir el resto en una sola pasada
+    if pending_indices:
+        try:
+            processed_data = await run_blocking(preprocess_input, [rows[i] for i in pending_indices])
+        except Exception as e:
+            logging.error(f"Error en preprocesamiento por lotes: {str(e)}")
+            raise HTTPException(
+                status_code=400,
+                detail=f"Error al preprocesar datos: {str(e)}"
+            )
+        
+        try:
+            predictions = await run_blocking(judge_service.predict_batch, processed_data)
+        except ValueError as e:
+            logging.error(f"Error en predicción por lotes: {str(e)}")
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logging.error(f"Error interno en predicción por lotes: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="Error interno del servidor al realizar la predicción"
+            )
+        
+        for i, prediction in zip(pending_indices, predictions):
+            results[i].update({"status": "success", "result": prediction})
+        await judge_cache.put_many_async([rows[i] for i in pending_indices], predictions)
+    
+    return {
+        "status": "success",
+        "count": len(results),
+        "valid": len(valid_indices),
+        "results": results
+    }
+
+
+def score_file_block(header: List[str], lines: List[str]) -> List[Dict[str, Any]]:
+    """
+    Evalúa un bloque de líneas de /predict-file: matriz cruda, preprocesamiento
+    vectorizado, especialistas y juez.
+    
+    Args:
+        header: Columnas del archivo
+        lines: Líneas de datos del bloque
+        
+    Returns:
+        Un resultado por línea con el mismo formato que las filas de /predict-batch
+    """
+    started = time.perf_counter()
+    ids, raw, errors = parse_block(header, lines, ID_FIELDS)
+    metrics.observe_stage("parse", started)
+    results = [dict(row_ids) for row_ids in ids]
+    valid = [i for i, error in enumerate(errors) if error is None]
+    
+    for i, error in enumerate(errors):
+        if error is not None:
+            results[i].update({"status": "error", "error": error})
+    if valid:
+        predictions = judge_service.predict_matrix(preprocess_matrix(raw[valid]))
+        for i, prediction in zip(valid, predictions):
+            results[i].update({"status": "success", "result": prediction})
+    return results
+
+
+def format_file_rows(results: List[Dict[str, Any]], output_format: str, id_fields: List[str]) -> str:
+    """Resultados de un bloque como líneas NDJSON o filas CSV (ver file_csv_columns)."""
+    if output_format == "ndjson":
+        return "".join(json.dumps(result) + "\n" for result in results)
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for result in results:
+        prediction = result.get("result", {})
+        writer.writerow(
+            [result.get(field, "") for field in id_fields] +
+            [result["status"], prediction.get("score", ""), prediction.get("prediccion", ""),
+             prediction.get("confianza", "")] +
+            [prediction.get("specialist_scores", {}).get(name, "") for name in SPECIALISTS] +
+            [result.get("error", "")]
+        )
+    return buffer.getvalue()
+
+
+def file_csv_columns(id_fields: List[str]) -> List[str]:
+    """Columnas de la respuesta CSV de /predict-file."""
+    return (
+        id_fields + ["status", "score", "prediccion", "confianza"] +
+        [f"score_{name}" for name in SPECIALISTS] + ["error"]
+    )
+
+
+@router.post("/predict-file")
+async def predict_judge_file(
+    request: Request,
+    output_format: str = Query("csv", alias="format", description="Formato de la respuesta: csv o ndjson")
+):
+    """
+    Evalúa con el Juez Final un CSV del NASA Exoplanet Archive de cualquier tamaño.
+    
+    Acepta el CSV como cuerpo crudo (Content-Type text/csv) o como archivo en un
+    formulario multipart/form-data (campo `file`), con o sin el encabezado de
+    comentarios '#' del Archive. El archivo se lee en bloques de FILE_BLOCK_ROWS
+    filas; cada bloque pasa por el preprocesamiento vectorizado, los especialistas
+    y el juez, y sus resultados se envían de inmediato, mientras se siguen leyendo
+    los bloques siguientes. Los valores vacíos se imputan como en el catálogo.
+    
+    Args:
+        request: Petición con el archivo
+        output_format: "csv" (por defecto) o "ndjson" (parámetro `format`)
+        
+    Returns:
+        Una fila por candidato, en el orden del archivo, con `kepid`/`kepoi_name`
+        si el archivo los trae. En NDJSON cada línea tiene el formato de las filas
+        de /predict-batch; en CSV las columnas de file_csv_columns. Las filas con
+        valores no numéricos se devuelven con status "error".
+        
+    Raises:
+        HTTPException (400): Si el formato no es válido, el archivo no tiene
+            encabezado o le faltan columnas
+        HTTPException (503): Si el servidor está saturado
+    """
+    if output_format not in FILE_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: '{output_format}' (use csv o ndjson)")
+    
+    # El lugar en el ejecutor se mantiene hasta terminar de enviar la respuesta
+    acquire_slot()
+    try:
+        reader = CSVBlockReader(request_file_chunks(request), FILE_BLOCK_ROWS)
+        header = await reader.read_header()
+    except ValueError as e:
+        executor.release()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        executor.release()
+        raise
+    
+    missing = missing_raw_columns(header)
+    if missing:
+        executor.release()
+        raise HTTPException(status_code=400, detail=f"Faltan columnas en el archivo: {missing}")
+    id_fields = [field for field in ID_FIELDS if field in header]
+    
+    async def generate():
+        if output_format == "csv":
+            yield ",".join(file_csv_columns(id_fields)) + "\n"
+        
+        # Mientras el ejecutor evalúa un bloque se lee y corta el siguiente
+        rows = 0
+        pending = None
+        try:
+            async for lines in reader.blocks():
+                task = asyncio.ensure_future(run_blocking(score_file_block, header, lines))
+                if pending is not None:
+                    results = await pending
+                    rows += len(results)
+                    yield format_file_rows(results, output_format, id_fields)
+                pending = task
+            if pending is not None:
+                results = await pending
+                pending = None
+                rows += len(results)
+                yield format_file_rows(results, output_format, id_fields)
+            logging.info(f"Archivo evaluado por el juez: {rows} filas")
+        except ClientDisconnect:
+            logging.warning(f"El cliente se desconectó durante /predict-file tras {rows} filas")
+        except Exception as e:
+            # La respuesta ya empezó (200): el error se informa como última fila
+            logging.error(f"Error en /predict-file tras {rows} filas: {str(e)}")
+            yield format_file_rows([{"status": "error", "error": str(e)}], output_format, id_fields)
+        finally:
+            if pending is not None:
+                pending.cancel()
+    
+    return BodyStreamingResponse(
+        generate(),
+        media_type=FILE_MEDIA_TYPES[output_format],
+        background=BackgroundTask(executor.release)
+    )
+
+
 @router.get("/features")
 async def get_required_features():
     """
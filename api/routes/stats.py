@@ -0,0 +1,48 @@
+# api/routes/stats.py
+
+from fastapi import APIRouter
+
+from api.utils import batching, cache
+from api.utils.validation import VALIDATION_SCHEMA
+from api.utils.executor import executor
+
+router = APIRouter(prefix="/stats", tags=["Estadísticas"])
+
+
+@router.get("/batching")
+async def batching_stats():
+    """
+    Métricas del micro-batching de /judge/predict y /ensemble/predict.
+    
+    Returns:
+        Para cada lote: número de lotes y peticiones, histograma y máximo del tamaño
+        de lote, y espera en cola de las peticiones (media, p50, p95, máximo en ms)
+    """
+    return {
+        "batchers": batching.all_stats(),
+        "executor": executor.stats()
+    }
+
+
+@router.get("/cache")
+async def cache_stats():
+    """
+    Métricas de la caché de resultados de /judge/predict y /ensemble/predict.
+    
+    Returns:
+        Para cada caché: backend, tamaño, aciertos, fallos, tasa de aciertos,
+        resultados vencidos y expulsados, e invalidaciones por cambio de artefactos
+    """
+    return {"caches": cache.all_stats()}
+
+
+@router.get("/validation")
+async def validation_stats():
+    """
+    Métricas de la validación de entrada de las rutas de predicción.
+    
+    Returns:
+        Validaciones realizadas y fallidas, tiempo medio y máximo (µs) y cuántas
+        superaron el presupuesto VALIDATION_BUDGET_US
+    """
+    return VALIDATION_SCHEMA.stats()
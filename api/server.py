@@ -0,0 +1,178 @@
+# api/server.py
+
+"""
+Servidor pre-fork con varios workers de api.main:app.
+
+`uvicorn --workers N` arranca cada worker como un proceso nuevo (spawn): cada uno
+vuelve a importar torch/pandas y a cargar los 5 modelos, el grafo fusionado y el
+almacén del catálogo. Aquí el proceso padre importa el API y carga ese estado una
+sola vez, abre el socket y después hace fork de los workers, que heredan sus
+páginas de memoria (copy-on-write). Los artefactos de preprocesamiento y los scores
+del catálogo ya son memory-maps de archivos, así que también se comparten. Antes
+del fork, gc.freeze() saca los objetos cargados del recolector de basura para que
+sus pasadas no escriban en esas páginas y las vuelvan privadas de cada worker.
+
+El padre no atiende peticiones: vigila a los workers, reinicia los que terminan de
+forma inesperada y les reenvía SIGTERM/SIGINT para un apagado ordenado. Cada worker
+hace su propio calentamiento (lifespan del API) y responde /ready por separado.
+
+Uso:
+    python -m api.server --workers 4 --host 0.0.0.0 --port 8000
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+# Agregar el directorio raíz al path
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import uvicorn
+
+from api.config import INFERENCE_BACKEND, SERVER_WORKERS
+
+# Conexiones pendientes del socket compartido (el mismo valor por defecto que uvicorn)
+BACKLOG = 2048
+
+# Un worker que termina antes de este tiempo se reinicia con esta espera
+RESTART_BACKOFF_SECONDS = 1.0
+
+
+def preload():
+    """
+    Importa el API y carga todo el estado de solo lectura en el proceso padre.
+
+    Returns:
+        La aplicación api.main:app
+    """
+    started = time.perf_counter()
+    from api.main import app
+    from api.utils import warmup
+
+    warmup.load_models()
+    gc.collect()
+    gc.freeze()
+    logging.info(f"Modelos cargados en el proceso padre en {time.perf_counter() - started:.2f}s")
+    return app
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Socket de escucha que heredan todos los workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    # Con proto=IPPROTO_TCP asyncio activa TCP_NODELAY en cada conexión aceptada; sin él
+    # las respuestas esperan al ACK retardado del cliente (~40 ms por petición)
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, torch_threads: int, log_level: str) -> None:
+    """Cuerpo de un worker (proceso hijo): uvicorn sobre el socket heredado."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if INFERENCE_BACKEND == "torch":
+        # Sin esto cada worker usaría un hilo por núcleo y competirían entre sí
+        import torch
+        torch.set_num_threads(torch_threads)
+
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class PreforkServer:
+    """Proceso padre: crea los workers con fork y los mantiene vivos."""
+
+    def __init__(self, app, sock: socket.socket, workers: int, log_level: str = "info"):
+        """
+        Args:
+            app: Aplicación ASGI ya cargada
+            sock: Socket de escucha compartido
+            workers: Número de workers
+            log_level: Nivel de log de uvicorn en los workers
+        """
+        if workers < 1:
+            raise ValueError("workers debe ser >= 1")
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> None:
+        """Crea un worker."""
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.app, self.sock, self.torch_threads, self.log_level)
+            except BaseException as e:
+                logging.error(f"Error en el worker {os.getpid()}: {str(e)}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logging.info(f"Worker {pid} iniciado")
+
+    def stop(self, signum, frame) -> None:
+        """Apagado ordenado: SIGTERM a todos los workers."""
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def serve(self) -> None:
+        """Crea los workers y espera; reinicia los que terminan hasta recibir SIGTERM/SIGINT."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+
+            logging.warning(f"Worker {pid} terminó con código {os.waitstatus_to_exitcode(status)}; reiniciando")
+            if time.monotonic() - started < RESTART_BACKOFF_SECONDS:
+                time.sleep(RESTART_BACKOFF_SECONDS)
+            self.spawn()
+
+        self.sock.close()
+        logging.info("Servidor detenido")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor pre-fork del API de exoplanetas")
+    parser.add_argument("--host", default="0.0.0.0", help="Dirección de escucha")
+    parser.add_argument("--port", type=int, default=8000, help="Puerto")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Número de workers (SERVER_WORKERS)")
+    parser.add_argument("--log-level", default="info", help="Nivel de log de uvicorn")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s [%(process)d] %(levelname)s %(message)s")
+    app = preload()
+    sock = bind_socket(args.host, args.port)
+    logging.info(f"Escuchando en {args.host}:{args.port} con {args.workers} workers")
+    PreforkServer(app, sock, args.workers, args.log_level).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# api/services/catalog_service.py
+
+"""
+Consulta del almacén precalculado del catálogo Kepler (model/prediction/build_catalog.py).
+
+Los scores de los especialistas y del juez de las ~9.600 filas de Kepler.csv se leen
+con memory-map y se indexan por kepoi_name y kepid, así que una consulta no toca los
+modelos. Si el almacén no existe o quedó desactualizado (cambiaron los pesos, los
+artefactos de preprocesamiento o el CSV), se reconstruye en segundo plano; mientras
+tanto se sigue sirviendo la versión anterior.
+
+La reconstrucción ejecuta model/prediction/build_catalog.py en un proceso aparte,
+que carga los pesos y artefactos actuales (los de este proceso pueden ser los de
+antes del cambio). Un lock de archivo (fcntl.flock sobre CATALOG_PATH/build.lock)
+asegura que solo un proceso construye a la vez: con el servidor pre-fork todos los
+workers ven el almacén desactualizado, pero solo uno lo reconstruye y los demás
+cargan la versión nueva cuando se publica.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Agregar el directorio raíz al path
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+from api.config import CATALOG_AUTO_REBUILD
+from api.services.judge_service import build_result
+from api.utils.cache import artifacts_fingerprint
+
+# Configuración
+CATALOG_PATH = os.path.join(BASE_DIR, "outputs", "catalog")
+RAW_CATALOG_PATH = os.path.join(BASE_DIR, "data", "raw", "Kepler.csv")
+CURRENT_FILENAME = "CURRENT"
+LOCK_FILENAME = "build.lock"
+BUILD_SCRIPT = os.path.join(BASE_DIR, "model", "prediction", "build_catalog.py")
+
+# Segundos entre revisiones de si el almacén quedó desactualizado
+STALE_CHECK_SECONDS = 5.0
+
+# Versión del pipeline con que se construye el almacén (cambiarla lo reconstruye).
+# 2: imputación fila a fila, independiente del tamaño de bloque
+CATALOG_FORMAT_VERSION = 2
+
+
+class CatalogStore:
+    """Una versión del almacén, con sus arrays en memory-map y los índices por ID."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Directorio de la versión (outputs/catalog/<versión>)
+
+        Raises:
+            FileNotFoundError: Si falta algún archivo de la versión
+        """
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+        self.specialist_scores = np.load(os.path.join(path, "specialists.npy"), mmap_mode="r")
+        self.judge_scores = np.load(os.path.join(path, "judge_score.npy"), mmap_mode="r")
+        self.judge_classes = np.load(os.path.join(path, "judge_class.npy"), mmap_mode="r")
+
+        self.kepoi_names: List[str] = self.meta["kepoi_name"]
+        self.kepids: List[int] = self.meta["kepid"]
+        self.dispositions: List[str] = self.meta["koi_disposition"]
+        self.by_kepoi_name = {name: i for i, name in enumerate(self.kepoi_names)}
+        self.by_kepid: Dict[int, List[int]] = defaultdict(list)
+        for i, kepid in enumerate(self.kepids):
+            self.by_kepid[kepid].append(i)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """Resultado de una fila, con el mismo formato que /judge/predict."""
+        return {
+            "kepid": self.kepids[i],
+            "kepoi_name": self.kepoi_names[i],
+            "koi_disposition": self.dispositions[i],
+            "result": build_result(
+                self.specialist_scores[i].tolist(),
+                float(self.judge_scores[i]),
+                int(self.judge_classes[i])
+            )
+        }
+
+    def is_stale(self) -> bool:
+        """True si los artefactos, el pipeline o el catálogo crudo cambiaron desde que se construyó."""
+        return meta_is_stale(self.meta)
+
+
+def meta_is_stale(meta: Dict[str, Any], raw_path: str = RAW_CATALOG_PATH) -> bool:
+    """True si la versión descrita por `meta` no corresponde al pipeline, los artefactos o el CSV actuales."""
+    if meta.get("format_version") != CATALOG_FORMAT_VERSION:
+        return True
+    if meta.get("artifacts_fingerprint") != artifacts_fingerprint():
+        return True
+    try:
+        stat = os.stat(raw_path)
+    except OSError:
+        return False
+    return meta.get("source_signature") != f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+@contextmanager
+def build_lock(catalog_path: str = CATALOG_PATH, wait: bool = True) -> Iterator[bool]:
+    """
+    Lock exclusivo entre procesos para construir el almacén (fcntl.flock sobre
+    <catalog_path>/build.lock; el sistema lo libera si el proceso muere).
+
+    Args:
+        catalog_path: Directorio del almacén
+        wait: Esperar a que se libere; con False no espera
+
+    Yields:
+        True si se obtuvo el lock (siempre con wait=True)
+    """
+    os.makedirs(catalog_path, exist_ok=True)
+    with open(os.path.join(catalog_path, LOCK_FILENAME), "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# Almacén cargado y estado de la reconstrucción
+store: Optional[CatalogStore] = None
+_checked_at = 0.0
+_stale = False
+_rebuild_thread: Optional[threading.Thread] = None
+_last_error: Optional[str] = None
+_failed_fingerprint: Optional[str] = None
+_lock = threading.Lock()
+
+
+def current_version_path() -> Optional[str]:
+    """Directorio de la versión vigente, o None si el almacén no se ha construido."""
+    try:
+        with open(os.path.join(CATALOG_PATH, CURRENT_FILENAME)) as f:
+            return os.path.join(CATALOG_PATH, f.read().strip())
+    except OSError:
+        return None
+
+
+def load_store() -> Optional[CatalogStore]:
+    """Carga (o recarga si cambió la versión vigente) el almacén del catálogo."""
+    global store
+    path = current_version_path()
+    if path is None:
+        return store
+    if store is None or store.path != path:
+        try:
+            store = CatalogStore(path)
+            logging.info(f"Almacén del catálogo cargado: {store.meta['rows']} filas ({path})")
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"No se pudo cargar el almacén del catálogo: {str(e)}")
+    return store
+
+
+def _rebuild() -> None:
+    """
+    Reconstruye el almacén con build_catalog.py en otro proceso (desde un hilo
+    aparte) y carga la versión nueva. Si otro proceso ya lo está reconstruyendo no
+    hace nada: la versión nueva se carga cuando ese proceso la publica.
+    """
+    global _last_error, _failed_fingerprint, _checked_at
+    try:
+        with build_lock(CATALOG_PATH, wait=False) as acquired:
+            pass
+        if not acquired:
+            logging.info("Otro proceso está reconstruyendo el almacén del catálogo")
+            return
+
+        logging.info("Reconstruyendo el almacén del catálogo")
+        result = subprocess.run(
+            [sys.executable, BUILD_SCRIPT, "--if-stale", "--no-wait",
+             "--output", CATALOG_PATH, "--input", RAW_CATALOG_PATH],
+            cwd=BASE_DIR, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            lines = (result.stderr or result.stdout).strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f"build_catalog.py terminó con código {result.returncode}")
+        _last_error = _failed_fingerprint = None
+    except Exception as e:
+        # No se reintenta hasta que cambien los artefactos
+        _last_error = str(e)
+        _failed_fingerprint = artifacts_fingerprint()
+        logging.error(f"Error al reconstruir el almacén del catálogo: {str(e)}")
+    load_store()
+    _checked_at = 0.0
+
+
+def start_rebuild() -> bool:
+    """
+    Lanza la reconstrucción en segundo plano si no hay una en curso.
+
+    Returns:
+        True si se lanzó una reconstrucción nueva
+    """
+    global _rebuild_thread
+    with _lock:
+        if _rebuild_thread is not None and _rebuild_thread.is_alive():
+            return False
+        _rebuild_thread = threading.Thread(target=_rebuild, name="catalog-rebuild", daemon=True)
+        _rebuild_thread.start()
+        return True
+
+
+def rebuilding() -> bool:
+    """True mientras hay una reconstrucción en curso."""
+    return _rebuild_thread is not None and _rebuild_thread.is_alive()
+
+
+def get_store() -> Optional[CatalogStore]:
+    """
+    Almacén vigente; si falta o está desactualizado lanza la reconstrucción
+    (cuando CATALOG_AUTO_REBUILD está activo) y sigue sirviendo el anterior.
+    """
+    global _checked_at, _stale
+    current = load_store()
+
+    now = time.monotonic()
+    if now - _checked_at >= STALE_CHECK_SECONDS:
+        _checked_at = now
+        _stale = current is None or current.is_stale()
+        if _stale and CATALOG_AUTO_REBUILD and _failed_fingerprint != artifacts_fingerprint():
+            start_rebuild()
+    return current
+
+
+def lookup_kepoi_name(kepoi_name: str) -> Dict[str, Any]:
+    """
+    Resultado precalculado de un KOI.
+
+    Raises:
+        RuntimeError: Si el almacén aún no está disponible
+        KeyError: Si el KOI no está en el catálogo
+    """
+    current = get_store()
+    if current is None:
+        raise RuntimeError("El almacén del catálogo aún no está disponible")
+    index = current.by_kepoi_name.get(kepoi_name)
+    if index is None:
+        raise KeyError(kepoi_name)
+    return current.row(index)
+
+
+def lookup_kepid(kepid: int) -> List[Dict[str, Any]]:
+    """
+    Resultados precalculados de todos los KOIs de una estrella.
+
+    Raises:
+        RuntimeError: Si el almacén aún no está disponible
+        KeyError: Si el kepid no está en el catálogo
+    """
+    current = get_store()
+    if current is None:
+        raise RuntimeError("El almacén del catálogo aún no está disponible")
+    indices = current.by_kepid.get(kepid)
+    if not indices:
+        raise KeyError(kepid)
+    return [current.row(i) for i in indices]
+
+
+def status() -> Dict[str, Any]:
+    """Estado del almacén: versión, filas, fecha de construcción y si está desactualizado."""
+    current = get_store()
+    return {
+        "available": current is not None,
+        "rows": current.meta["rows"] if current is not None else 0,
+        "built_at": current.meta.get("built_at") if current is not None else None,
+        "artifacts_fingerprint": current.meta.get("artifacts_fingerprint") if current is not None else None,
+        "stale": _stale,
+        "rebuilding": rebuilding(),
+        "auto_rebuild": CATALOG_AUTO_REBUILD,
+        "last_error": _last_error
+    }
@@ -8,6 +8,62 @@ from api.services import fotometria_service
 from api.services import orbital_service
 from api.services import estelar_service
 from api.services import falsos_positivos_service
+from api.services import inference_graph
+from api.services.judge_service import specialist_label
+
+SERVICES = {
+    'fotometria': fotometria_service,
+    'orbital': orbital_service,
+    'estelar': estelar_service,
+    'falsos_positivos': falsos_positivos_service
+}
+
+
+def build_specialist_result(name: str, score: float) -> Dict[str, Any]:
+    """
+    Arma el resultado de un especialista con el mismo formato que su servicio.
+    
+    Args:
+        name: Nombre del especialista
+        score: Score (probabilidad) del especialista
+    """
+    return {
+        "modelo": name,
+        "score": round(score, 4),
+        "prediccion": specialist_label(name, score),
+        "confianza": round(abs(score - 0.5) * 2, 4)  # Normalizado de 0 a 1
+    }
+
+
+def predict_ensemble_batch(data: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Realiza la predicción del ensemble para varios candidatos a la vez.
+    
+    Los 4 especialistas se evalúan en una sola pasada del grafo fusionado sobre la
+    matriz completa.
+    
+    Args:
+        data: DataFrame preprocesado con una fila por candidato
+        
+    Returns:
+        Lista (en el mismo orden que las filas) con el mismo formato que predict_ensemble()
+        
+    Raises:
+        ValueError: Si faltan características para algún especialista
+    """
+    for service in SERVICES.values():
+        service.validate_input_data(data)
+    
+    graph = inference_graph.load_graph()
+    specialist_scores = graph.specialist_scores(graph.to_matrix(data))
+    
+    return [
+        combine_predictions({
+            name: build_specialist_result(name, score)
+            for name, score in zip(inference_graph.SPECIALISTS, row_scores)
+        })
+        for row_scores in specialist_scores.tolist()
+    ]
 
 
 def predict_ensemble(data: pd.DataFrame) -> Dict[str, Any]:
@@ -20,14 +76,19 @@ def predict_ensemble(data: pd.DataFrame) -> Dict[str, Any]:
     Returns:
         Diccionario con las predicciones de todos los modelos y la predicción final
     """
-    # Obtener predicciones de cada modelo
-    predictions = {
-        'fotometria': fotometria_service.predict(data),
-        'orbital': orbital_service.predict(data),
-        'estelar': estelar_service.predict(data),
-        'falsos_positivos': falsos_positivos_service.predict(data)
-    }
+    return predict_ensemble_batch(data)[0]
+
+
+def combine_predictions(predictions: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combina las predicciones de los 4 especialistas en la predicción del ensemble.
     
+    Args:
+        predictions: Resultado de cada especialista, por nombre
+        
+    Returns:
+        Diccionario con las predicciones de todos los modelos y la predicción final
+    """
     # Calcular score promedio ponderado
     # El modelo de falsos positivos tiene peso invertido
     scores = [
@@ -0,0 +1,187 @@
+# api/services/inference_graph.py
+
+"""
+Grafo de inferencia fusionado: los 4 especialistas + el juez en una sola pasada.
+
+Los especialistas son MLPs de 3 capas con la misma forma, así que sus capas se
+combinan en matrices diagonales por bloques: una sola multiplicación por capa
+evalúa los 4 modelos a la vez. Las columnas de cada especialista se toman de la
+matriz preprocesada con arrays de índices precalculados y el juez (regresión
+logística) se aplica al final como un producto punto.
+
+Las capas se guardan como arrays NumPy; con el backend torch el forward se hace con
+torch.addmm y con el backend numpy con productos matriciales de NumPy.
+"""
+
+import threading
+import time
+
+import numpy as np
+from typing import Dict, List, Tuple
+
+from api.config import INFERENCE_BACKEND
+from api.services import runtime
+from api.utils import metrics
+from api.utils.feature_groups import get_feature_group
+from api.services import fotometria_service, orbital_service, estelar_service, falsos_positivos_service
+
+SPECIALISTS = ['fotometria', 'orbital', 'estelar', 'falsos_positivos']
+
+# Decimales con los que cada especialista reporta su score; el juez los recibe así,
+# igual que en la ruta de un solo candidato
+SCORE_DECIMALS = 4
+
+# Grafo cargado (se construye la primera vez que se usa)
+graph = None
+_load_lock = threading.Lock()
+
+
+class FusedInferenceGraph:
+    """
+    Especialistas en forma diagonal por bloques + juez lineal.
+    """
+
+    def __init__(self, specialist_models: Dict[str, object], judge_model, columns: List[str]):
+        """
+        Args:
+            specialist_models: Modelos especialistas cargados (torch o runtime.NumpyMLP), por nombre
+            judge_model: Regresión logística del juez (sklearn o runtime.NumpyJudge)
+            columns: Orden de las columnas de la matriz preprocesada
+        """
+        self.columns = list(columns)
+        column_index = {name: i for i, name in enumerate(self.columns)}
+
+        # Índices de las columnas de cada especialista, concatenados en orden
+        self.feature_index = np.array([
+            column_index[feature]
+            for name in SPECIALISTS
+            for feature in get_feature_group(name)
+        ])
+
+        # Capas lineales de cada especialista (network = Linear, ReLU, Linear, ReLU, Linear[, Sigmoid])
+        layers = [runtime.linear_layers(specialist_models[name]) for name in SPECIALISTS]
+        self.weights = []
+        self.biases = []
+        for depth in range(3):
+            self.weights.append(np.ascontiguousarray(_block_diag([
+                model_layers[depth][0] for model_layers in layers
+            ]).T))
+            self.biases.append(np.concatenate([
+                model_layers[depth][1] for model_layers in layers
+            ]).astype(np.float32))
+
+        if INFERENCE_BACKEND == "torch":
+            import torch
+            self._torch_weights = [torch.from_numpy(w) for w in self.weights]
+            self._torch_biases = [torch.from_numpy(b) for b in self.biases]
+
+        # Juez: p = sigmoid(scores · coef + intercept)
+        self.judge_coef = np.asarray(judge_model.coef_, dtype=np.float64).reshape(-1)
+        self.judge_intercept = float(np.asarray(judge_model.intercept_).reshape(-1)[0])
+        self.judge_classes = np.asarray(judge_model.classes_)
+
+    def to_matrix(self, data) -> np.ndarray:
+        """
+        Matriz float32 (n_filas, len(columns)) a partir del DataFrame preprocesado.
+
+        Args:
+            data: DataFrame con (al menos) las columnas del grafo
+        """
+        if list(data.columns) != self.columns:
+            data = data[self.columns]
+        return data.to_numpy(dtype=np.float32)
+
+    def specialist_scores(self, X: np.ndarray) -> np.ndarray:
+        """
+        Scores de los 4 especialistas para cada fila.
+
+        Args:
+            X: Matriz preprocesada (n_filas, len(columns))
+
+        Returns:
+            Matriz float64 (n_filas, 4) en el orden de SPECIALISTS
+        """
+        started = time.perf_counter()
+        hidden = np.ascontiguousarray(X[:, self.feature_index], dtype=np.float32)
+
+        if INFERENCE_BACKEND == "numpy":
+            hidden = np.maximum(hidden @ self.weights[0] + self.biases[0], 0)
+            hidden = np.maximum(hidden @ self.weights[1] + self.biases[1], 0)
+            output = hidden @ self.weights[2] + self.biases[2]
+            scores = runtime.sigmoid(output).astype(np.float64)
+        else:
+            import torch
+            hidden = torch.from_numpy(hidden)
+            with torch.no_grad():
+                hidden = torch.relu(torch.addmm(self._torch_biases[0], hidden, self._torch_weights[0]))
+                hidden = torch.relu(torch.addmm(self._torch_biases[1], hidden, self._torch_weights[1]))
+                output = torch.addmm(self._torch_biases[2], hidden, self._torch_weights[2])
+                scores = torch.sigmoid(output).numpy().astype(np.float64)
+
+        metrics.observe_stage("specialists", started)
+        return scores
+
+    def judge(self, specialist_scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Aplica el juez sobre los scores de los especialistas.
+
+        Args:
+            specialist_scores: Matriz (n_filas, 4)
+
+        Returns:
+            (probabilidad de CONFIRMED, clase predicha) para cada fila
+        """
+        started = time.perf_counter()
+        decision = np.dot(specialist_scores, self.judge_coef) + self.judge_intercept
+        probas = 1.0 / (1.0 + np.exp(-decision))
+        predictions = self.judge_classes[(decision > 0).astype(int)]
+        metrics.observe_stage("judge", started)
+        return probas, predictions
+
+    def run(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Ejecuta especialistas y juez sobre la matriz completa.
+
+        Args:
+            X: Matriz preprocesada (n_filas, len(columns))
+
+        Returns:
+            (scores de especialistas redondeados, probabilidad del juez, clase del juez)
+        """
+        specialist_scores = np.round(self.specialist_scores(X), SCORE_DECIMALS)
+        probas, predictions = self.judge(specialist_scores)
+        return specialist_scores, probas, predictions
+
+
+def _block_diag(blocks: List[np.ndarray]) -> np.ndarray:
+    """Matriz float32 diagonal por bloques (equivalente a torch.block_diag)."""
+    result = np.zeros((sum(b.shape[0] for b in blocks), sum(b.shape[1] for b in blocks)), dtype=np.float32)
+    row = col = 0
+    for block in blocks:
+        result[row:row + block.shape[0], col:col + block.shape[1]] = block
+        row += block.shape[0]
+        col += block.shape[1]
+    return result
+
+
+def load_graph() -> FusedInferenceGraph:
+    """Construye (una sola vez) el grafo fusionado a partir de los modelos cargados."""
+    global graph
+    if graph is None:
+        with _load_lock:
+            if graph is None:
+                from api.utils.preprocessing import TRAIN_COLUMNS
+                from api.services import judge_service
+
+                specialist_models = {
+                    'fotometria': fotometria_service.load_model(),
+                    'orbital': orbital_service.load_model(),
+                    'estelar': estelar_service.load_model(),
+                    'falsos_positivos': falsos_positivos_service.load_model()
+                }
+                graph = FusedInferenceGraph(
+                    specialist_models,
+                    judge_service.load_model().model,
+                    TRAIN_COLUMNS
+                )
+    return graph
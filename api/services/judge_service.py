@@ -3,9 +3,10 @@
 import joblib
 import os
 import sys
+import threading
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 
 # Agregar el directorio raíz al path
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,23 +14,34 @@ sys.path.append(BASE_DIR)
 
 import logging
 from model.architecture.m_judge import JudgeModel
-from api.services import fotometria_service, orbital_service, estelar_service, falsos_positivos_service
+from api.config import INFERENCE_BACKEND
+from api.services import inference_graph, runtime
 
 # Configuración
 WEIGHTS_PATH = os.path.join(BASE_DIR, "outputs", "weights", "judge_model.joblib")
+NUMPY_WEIGHTS_PATH = runtime.numpy_bundle_path("judge_model.joblib")
+SPECIALISTS = inference_graph.SPECIALISTS
 
 # Cargar modelo
 model = None
+_load_lock = threading.Lock()
 
 
 def load_model():
     """Carga el modelo del juez (Regresión Logística)."""
     global model
     if model is None:
-        sklearn_model = joblib.load(WEIGHTS_PATH)
-        model = JudgeModel()
-        model.load_state_dict(sklearn_model)
-        model.eval()
+        # Un solo hilo carga el modelo; los demás esperan y reutilizan el resultado
+        with _load_lock:
+            if model is None:
+                if INFERENCE_BACKEND == "numpy":
+                    judge = runtime.NumpyJudge.load(NUMPY_WEIGHTS_PATH, source_path=WEIGHTS_PATH)
+                else:
+                    judge = joblib.load(WEIGHTS_PATH)
+                loaded = JudgeModel()
+                loaded.load_state_dict(judge)
+                loaded.eval()
+                model = loaded
     return model
 
 
@@ -44,6 +56,11 @@ def validate_input_data(data: pd.DataFrame) -> None:
         ValueError: Si faltan características requeridas para algún modelo
     """
     from api.utils.preprocessing import validate_features_for_model
+    from api.utils.validation import is_validated
+    
+    # Entrada ya validada por la ruta (ValidatedRecord): no repetir la validación
+    if all(is_validated(data, model_type) for model_type in SPECIALISTS):
+        return
     
     logging.info("Validando datos de entrada para todos los modelos especialistas")
     
@@ -58,50 +75,22 @@ def validate_input_data(data: pd.DataFrame) -> None:
     logging.info("Validación de características completada exitosamente")
 
 
-def collect_specialist_predictions(data: pd.DataFrame) -> pd.DataFrame:
+def collect_specialist_scores(data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Obtiene las predicciones de todos los modelos especialistas.
+    Obtiene los scores de los 4 especialistas y la decisión del juez con el grafo fusionado.
     
     Args:
-        data: DataFrame con los datos preprocesados
+        data: DataFrame con los datos preprocesados (una fila por candidato)
         
     Returns:
-        DataFrame con los scores de los especialistas
+        (scores de especialistas (n_filas, 4), probabilidad del juez, clase del juez)
         
     Raises:
-        ValueError: Si hay errores en las predicciones de los especialistas
+        ValueError: Si hay errores en las predicciones
     """
     try:
-        # Obtener predicciones de cada especialista
-        logging.info("Obteniendo predicciones de los especialistas")
-        pred_fotometria = fotometria_service.predict(data)
-        pred_orbital = orbital_service.predict(data)
-        pred_estelar = estelar_service.predict(data)
-        pred_falsos_positivos = falsos_positivos_service.predict(data)
-        
-        # Crear DataFrame con los scores
-        specialist_scores = pd.DataFrame({
-            'score_fotometria': [pred_fotometria['score']],
-            'score_orbital': [pred_orbital['score']],
-            'score_estelar': [pred_estelar['score']],
-            'score_falsos_positivos': [pred_falsos_positivos['score']]
-        })
-        
-        logging.info("Predicciones de especialistas obtenidas exitosamente")
-        return specialist_scores, {
-            'scores': {
-                'fotometria': pred_fotometria['score'],
-                'orbital': pred_orbital['score'],
-                'estelar': pred_estelar['score'],
-                'falsos_positivos': pred_falsos_positivos['score']
-            },
-            'predictions': {
-                'fotometria': pred_fotometria['prediccion'],
-                'orbital': pred_orbital['prediccion'],
-                'estelar': pred_estelar['prediccion'],
-                'falsos_positivos': pred_falsos_positivos['prediccion']
-            }
-        }
+        graph = inference_graph.load_graph()
+        return graph.run(graph.to_matrix(data))
         
     except Exception as e:
         error = f"Error al obtener predicciones de especialistas: {str(e)}"
@@ -109,51 +98,109 @@ def collect_specialist_predictions(data: pd.DataFrame) -> pd.DataFrame:
         raise ValueError(error)
 
 
-def predict(data: pd.DataFrame) -> Dict[str, Any]:
+def specialist_label(name: str, score: float) -> str:
     """
-    Realiza una predicción usando el juez final.
+    Traduce el score de un especialista a su predicción textual.
     
-    El juez toma las predicciones de los 4 especialistas y hace la decisión final.
+    El especialista de falsos positivos detecta falsos positivos, por lo que su
+    etiqueta está invertida respecto a los demás (igual que en su servicio).
+    """
+    if name == 'falsos_positivos':
+        return "FALSE POSITIVE" if score > 0.5 else "CONFIRMED"
+    return "CONFIRMED" if score > 0.5 else "FALSE POSITIVE"
+
+
+def build_result(specialist_scores: List[float], score: float, prediction: int) -> Dict[str, Any]:
+    """
+    Arma el resultado del juez para un candidato.
     
     Args:
-        data: DataFrame preprocesado con las características
+        specialist_scores: Scores de los especialistas en el orden de SPECIALISTS
+        score: Probabilidad de CONFIRMED según el juez
+        prediction: Clase predicha por el juez (1 = CONFIRMED)
         
     Returns:
         Diccionario con la predicción del juez y los scores de los especialistas
+    """
+    return {
+        "modelo": "judge",
+        "score": round(score, 4),
+        "prediccion": "CONFIRMED" if prediction == 1 else "FALSE POSITIVE",
+        "confianza": round(abs(score - 0.5) * 2, 4),
+        "specialist_scores": dict(zip(SPECIALISTS, specialist_scores)),
+        "specialist_predictions": {
+            name: specialist_label(name, value)
+            for name, value in zip(SPECIALISTS, specialist_scores)
+        }
+    }
+
+
+def predict_batch(data: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Realiza la predicción del juez para varios candidatos a la vez.
+    
+    Los especialistas y el juez se evalúan en una sola pasada del grafo fusionado
+    sobre la matriz completa, en lugar de una vez por candidato.
+    
+    Args:
+        data: DataFrame preprocesado con una fila por candidato
+        
+    Returns:
+        Lista (en el mismo orden que las filas) con el mismo formato que predict()
         
     Raises:
         ValueError: Si hay errores en la validación, predicciones o decisión final
     """
-    # 1. Validar datos para todos los modelos
+    # 1. Validar datos una sola vez para todo el lote
     validate_input_data(data)
     
-    # 2. Obtener predicciones de especialistas
-    specialist_scores, specialist_results = collect_specialist_predictions(data)
+    # 2. Especialistas + juez en una sola pasada
+    specialist_scores, scores, predictions = collect_specialist_scores(data)
+    logging.info(f"Predicción del juez exitosa, filas: {len(scores)}")
     
-    # 3. Cargar modelo del juez y hacer predicción
-    try:
-        judge_model = load_model()
-        logging.info("Realizando predicción con el juez")
+    # 3. Preparar un resultado por fila
+    return [
+        build_result(row_scores, score, prediction)
+        for row_scores, score, prediction in zip(
+            specialist_scores.tolist(), scores.tolist(), predictions.tolist()
+        )
+    ]
+
+
+def predict_matrix(X: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Predicción del juez sobre una matriz ya preprocesada (preprocess_matrix), sin
+    pasar por DataFrames. La usan las rutas que leen archivos por bloques.
+    
+    Args:
+        X: Matriz preprocesada (n_filas, len(TRAIN_COLUMNS))
         
-        # Obtener probabilidades y predicción
-        probas = judge_model.predict_proba(specialist_scores.values)
-        score = probas[0][1]  # Probabilidad de clase 1 (CONFIRMED)
-        prediction = judge_model.predict(specialist_scores.values)[0]
-        prediccion_text = "CONFIRMED" if prediction == 1 else "FALSE POSITIVE"
+    Returns:
+        Lista (en el mismo orden que las filas) con el mismo formato que predict()
+    """
+    graph = inference_graph.load_graph()
+    specialist_scores, scores, predictions = graph.run(X)
+    return [
+        build_result(row_scores, score, prediction)
+        for row_scores, score, prediction in zip(
+            specialist_scores.tolist(), scores.tolist(), predictions.tolist()
+        )
+    ]
+
+
+def predict(data: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Realiza una predicción usando el juez final.
+    
+    El juez toma las predicciones de los 4 especialistas y hace la decisión final.
+    
+    Args:
+        data: DataFrame preprocesado con las características
         
-        logging.info(f"Predicción del juez exitosa: {prediccion_text} (score: {score})")
+    Returns:
+        Diccionario con la predicción del juez y los scores de los especialistas
         
-    except Exception as e:
-        error = f"Error en predicción del juez: {str(e)}"
-        logging.error(error)
-        raise ValueError(error)
-    
-    # 4. Preparar resultado final
-    return {
-        "modelo": "judge",
-        "score": round(float(score), 4),
-        "prediccion": prediccion_text,
-        "confianza": round(abs(score - 0.5) * 2, 4),
-        "specialist_scores": specialist_results['scores'],
-        "specialist_predictions": specialist_results['predictions']
-    }
+    Raises:
+        ValueError: Si hay errores en la validación, predicciones o decisión final
+    """
+    return predict_batch(data)[0]
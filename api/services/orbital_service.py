@@ -1,9 +1,11 @@
 # api/services/orbital_service.py
 
-import torch
 import os
 import sys
+import threading
+import time
 import pandas as pd
+import numpy as np
 from typing import Dict, Any
 
 # Agregar el directorio raíz al path para importar los modelos
@@ -11,26 +13,43 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__fil
 sys.path.append(BASE_DIR)
 
 import logging
-from model.architecture.m_orbital import OrbitalNet
+from api.config import INFERENCE_BACKEND
+from api.services import runtime
+from api.utils import metrics
 from api.utils.feature_groups import get_feature_group
 
 # Configuración
 WEIGHTS_PATH = os.path.join(BASE_DIR, "outputs", "weights", "orbital_net.pth")
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+NUMPY_WEIGHTS_PATH = runtime.numpy_bundle_path("orbital_net.pth")
 
 # Cargar modelo
 model = None
+_load_lock = threading.Lock()
 
 
 def load_model():
     """Carga el modelo orbital."""
     global model
     if model is None:
-        features = get_feature_group('orbital')
-        model = OrbitalNet(input_features=len(features))
-        model.load_state_dict(torch.load(WEIGHTS_PATH, map_location=DEVICE))
-        model.to(DEVICE)
-        model.eval()
+        # Un solo hilo carga el modelo; los demás esperan y reutilizan el resultado
+        with _load_lock:
+            if model is None:
+                if INFERENCE_BACKEND == "numpy":
+                    loaded = runtime.NumpyMLP.load(NUMPY_WEIGHTS_PATH, source_path=WEIGHTS_PATH)
+                else:
+                    import torch
+                    from model.architecture.m_orbital import OrbitalNet
+                    from model.architecture.m_common import hidden_sizes_from_state_dict
+
+                    features = get_feature_group('orbital')
+                    device = runtime.device()
+                    # Los anchos de las capas ocultas salen de los pesos (pueden venir de search.py)
+                    state = torch.load(WEIGHTS_PATH, map_location=device)
+                    loaded = OrbitalNet(input_features=len(features), hidden_sizes=hidden_sizes_from_state_dict(state))
+                    loaded.load_state_dict(state)
+                    loaded.to(device)
+                    loaded.eval()
+                model = loaded
     return model
 
 
@@ -44,9 +63,15 @@ def validate_input_data(data: pd.DataFrame) -> None:
     Raises:
         ValueError: Si faltan características requeridas
     """
+    from api.utils.validation import is_validated
+    
+    # Entrada ya validada por la ruta (ValidatedRecord): no repetir la validación
+    if is_validated(data, 'orbital'):
+        return
+    
     from api.utils.preprocessing import validate_features_for_model
     
-    logging.info(f"Validando datos de entrada: {data.columns.tolist()}")
+    logging.info("Validando datos de entrada: %d columnas", len(data.columns))
     
     # Validar características base y derivadas
     is_valid, error_msg = validate_features_for_model(data, 'orbital')
@@ -55,7 +80,7 @@ def validate_input_data(data: pd.DataFrame) -> None:
         raise ValueError(error_msg)
 
 
-def prepare_features(data: pd.DataFrame) -> torch.Tensor:
+def prepare_features(data: pd.DataFrame) -> np.ndarray:
     """
     Prepara las características para el modelo orbital.
     
@@ -63,7 +88,7 @@ def prepare_features(data: pd.DataFrame) -> torch.Tensor:
         data: DataFrame con los datos preprocesados
         
     Returns:
-        Tensor de PyTorch con las características ordenadas
+        Matriz float32 con las características ordenadas
         
     Raises:
         ValueError: Si hay errores al preparar los datos
@@ -73,20 +98,46 @@ def prepare_features(data: pd.DataFrame) -> torch.Tensor:
     
     try:
         # Seleccionar y ordenar características
-        X = data[features].values
+        X = data[features].values.astype(np.float32)
         logging.info(f"Datos preparados shape: {X.shape}")
         
-        # Convertir a tensor
-        X_tensor = torch.FloatTensor(X).to(DEVICE)
-        logging.info(f"Tensor creado shape: {X_tensor.shape}")
-        
-        return X_tensor
+        return X
         
     except Exception as e:
         logging.error(f"Error al preparar características: {str(e)}")
         raise ValueError(f"Error al preparar características: {str(e)}")
 
 
+def predict_batch(data: pd.DataFrame) -> np.ndarray:
+    """
+    Calcula los scores del modelo orbital para todas las filas en un solo forward pass.
+    
+    Args:
+        data: DataFrame preprocesado con una fila por candidato
+        
+    Returns:
+        Array 1-D con el score (probabilidad) de cada fila
+        
+    Raises:
+        ValueError: Si hay errores en la validación o predicción
+    """
+    validate_input_data(data)
+    model = load_model()
+    X = prepare_features(data)
+    
+    try:
+        started = time.perf_counter()
+        scores = runtime.forward(model, X)
+        metrics.observe_stage("specialist_orbital", started)
+        logging.info(f"Predicción por lotes exitosa, filas: {len(scores)}")
+            
+    except Exception as e:
+        logging.error(f"Error en predicción por lotes: {str(e)}")
+        raise ValueError(f"Error al realizar predicción: {str(e)}")
+    
+    return scores
+
+
 def predict(data: pd.DataFrame) -> Dict[str, Any]:
     """
     Realiza una predicción usando el modelo orbital.
@@ -107,14 +158,14 @@ def predict(data: pd.DataFrame) -> Dict[str, Any]:
     model = load_model()
     
     # 3. Preparar características
-    X_tensor = prepare_features(data)
+    X = prepare_features(data)
     
     # 4. Realizar predicción
     try:
-        with torch.no_grad():
-            output = model(X_tensor)
-            score = torch.sigmoid(output).cpu().item()
-            logging.info(f"Predicción exitosa, score: {score}")
+        started = time.perf_counter()
+        score = float(runtime.forward(model, X)[0])
+        metrics.observe_stage("specialist_orbital", started)
+        logging.info(f"Predicción exitosa, score: {score}")
             
     except Exception as e:
         logging.error(f"Error en predicción: {str(e)}")
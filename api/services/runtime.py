@@ -0,0 +1,272 @@
+# api/services/runtime.py
+
+"""
+Runtime de inferencia compartido por los servicios.
+
+Con INFERENCE_BACKEND="numpy" los especialistas y el juez se evalúan con NumPy a
+partir de los paquetes .npz de outputs/weights (ver scripts/export_numpy_weights.py)
+y torch no llega a importarse. Con "torch" se usan los módulos de PyTorch como siempre.
+
+Cada .npz guarda el SHA-1 del .pth / .joblib del que se exportó (source_sha1). Al
+cargarlo se compara con el archivo de pesos actual, así que un .npz que quedó de un
+entrenamiento anterior no se sirve en silencio: los scripts de entrenamiento lo
+regeneran al guardar los pesos (export_numpy_bundle).
+"""
+
+import hashlib
+import os
+import numpy as np
+from typing import List, Optional, Tuple
+
+from api.config import INFERENCE_BACKEND
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+WEIGHTS_DIR = os.path.join(BASE_DIR, "outputs", "weights")
+
+
+def numpy_bundle_path(weights_filename: str) -> str:
+    """Ruta del paquete .npz correspondiente a un archivo de pesos (.pth / .joblib)."""
+    return os.path.join(WEIGHTS_DIR, os.path.splitext(weights_filename)[0] + ".npz")
+
+
+def file_sha1(path: str) -> str:
+    """SHA-1 del contenido de un archivo."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def check_bundle_source(bundle, path: str, source_path: Optional[str]) -> None:
+    """
+    Comprueba que un .npz se exportó de los pesos actuales. Si el archivo de pesos
+    no existe (despliegue solo con los .npz) no se comprueba.
+
+    Args:
+        bundle: Contenido del .npz (np.load)
+        path: Ruta del .npz
+        source_path: Ruta del .pth / .joblib del que se exportó
+
+    Raises:
+        ValueError: Si el .npz no tiene source_sha1 o no coincide con el de los pesos
+    """
+    if source_path is None or not os.path.exists(source_path):
+        return
+    recorded = str(bundle["source_sha1"]) if "source_sha1" in bundle.files else ""
+    if recorded != file_sha1(source_path):
+        raise ValueError(
+            f"'{os.path.basename(path)}' no corresponde a '{os.path.basename(source_path)}' "
+            "(pesos reentrenados después de exportar); ejecute python scripts/export_numpy_weights.py"
+        )
+
+
+def sigmoid(x: np.ndarray) -> np.ndarray:
+    """Función sigmoide elemento a elemento (exp puede desbordar a inf: el resultado es 0)."""
+    with np.errstate(over="ignore"):
+        return 1.0 / (1.0 + np.exp(-x))
+
+
+class NumpyMLP:
+    """
+    MLP (Linear → ReLU → ... → Linear [→ Sigmoid]) evaluado con NumPy.
+    Equivalente al `network` nn.Sequential de los especialistas.
+    """
+
+    def __init__(self, weights: List[np.ndarray], biases: List[np.ndarray], final_sigmoid: bool):
+        """
+        Args:
+            weights: Pesos de cada capa con la forma de PyTorch (salidas, entradas)
+            biases: Bias de cada capa
+            final_sigmoid: Si la arquitectura termina en nn.Sigmoid
+        """
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.final_sigmoid = bool(final_sigmoid)
+        # Traspuestas contiguas para x @ W
+        self._weights_t = [np.ascontiguousarray(w.T) for w in self.weights]
+
+    @classmethod
+    def load(cls, path: str, source_path: Optional[str] = None) -> "NumpyMLP":
+        """
+        Carga un especialista exportado a .npz.
+
+        Args:
+            path: Ruta del .npz
+            source_path: .pth del que se exportó; si se indica, se comprueba su SHA-1
+
+        Raises:
+            ValueError: Si el .npz no corresponde a source_path
+        """
+        with np.load(path) as bundle:
+            check_bundle_source(bundle, path, source_path)
+            n_layers = int(bundle["n_layers"])
+            return cls(
+                [bundle[f"weight_{i}"] for i in range(n_layers)],
+                [bundle[f"bias_{i}"] for i in range(n_layers)],
+                bool(bundle["final_sigmoid"])
+            )
+
+    @classmethod
+    def from_torch(cls, model) -> "NumpyMLP":
+        """Construye el especialista a partir del `network` nn.Sequential de un módulo de PyTorch."""
+        import torch
+        weights, biases = [], []
+        final_sigmoid = False
+        modules = list(model.network)
+        for i, module in enumerate(modules):
+            if isinstance(module, torch.nn.Linear):
+                weights.append(module.weight.detach().cpu().numpy())
+                biases.append(module.bias.detach().cpu().numpy())
+            elif isinstance(module, torch.nn.Sigmoid) and i == len(modules) - 1:
+                final_sigmoid = True
+            elif not isinstance(module, torch.nn.ReLU):
+                raise ValueError(f"Capa no soportada por el runtime NumPy: {module}")
+        return cls(weights, biases, final_sigmoid)
+
+    def save(self, path: str, source_sha1: str = "") -> None:
+        """Guarda el especialista en formato .npz, con el SHA-1 del .pth del que se exportó."""
+        arrays = {
+            "n_layers": np.array(len(self.weights)),
+            "final_sigmoid": np.array(self.final_sigmoid),
+            "source_sha1": np.array(source_sha1)
+        }
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"weight_{i}"] = w
+            arrays[f"bias_{i}"] = b
+        np.savez(path, **arrays)
+
+    def linear_layers(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Capas lineales como pares (peso, bias)."""
+        return list(zip(self.weights, self.biases))
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        """Salida de la red para X (n_filas, n_features) con forma (n_filas, 1)."""
+        hidden = np.asarray(X, dtype=np.float32)
+        last = len(self._weights_t) - 1
+        for i, (w_t, b) in enumerate(zip(self._weights_t, self.biases)):
+            hidden = hidden @ w_t + b
+            if i < last:
+                np.maximum(hidden, 0, out=hidden)
+        if self.final_sigmoid:
+            hidden = sigmoid(hidden)
+        return hidden
+
+
+class NumpyJudge:
+    """
+    Regresión logística binaria evaluada con NumPy.
+    Expone la misma interfaz que sklearn (coef_, intercept_, classes_, predict_proba, predict).
+    """
+
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray, classes: np.ndarray):
+        self.coef_ = np.asarray(coef, dtype=np.float64).reshape(1, -1)
+        self.intercept_ = np.asarray(intercept, dtype=np.float64).reshape(1)
+        self.classes_ = np.asarray(classes)
+
+    @classmethod
+    def load(cls, path: str, source_path: Optional[str] = None) -> "NumpyJudge":
+        """
+        Carga el juez exportado a .npz.
+
+        Args:
+            path: Ruta del .npz
+            source_path: .joblib del que se exportó; si se indica, se comprueba su SHA-1
+
+        Raises:
+            ValueError: Si el .npz no corresponde a source_path
+        """
+        with np.load(path) as bundle:
+            check_bundle_source(bundle, path, source_path)
+            return cls(bundle["coef"], bundle["intercept"], bundle["classes"])
+
+    @classmethod
+    def from_sklearn(cls, model) -> "NumpyJudge":
+        """Construye el juez a partir de un LogisticRegression ajustado."""
+        return cls(model.coef_, model.intercept_, model.classes_)
+
+    def save(self, path: str, source_sha1: str = "") -> None:
+        """Guarda el juez en formato .npz, con el SHA-1 del .joblib del que se exportó."""
+        np.savez(path, coef=self.coef_, intercept=self.intercept_, classes=self.classes_,
+                 source_sha1=np.array(source_sha1))
+
+    def decision_function(self, X) -> np.ndarray:
+        return np.dot(np.asarray(X, dtype=np.float64), self.coef_[0]) + self.intercept_[0]
+
+    def predict_proba(self, X) -> np.ndarray:
+        proba = sigmoid(self.decision_function(X))
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+def export_numpy_bundle(model, weights_path: str) -> str:
+    """
+    Exporta a .npz (junto a weights_path) un especialista de PyTorch o el juez de
+    sklearn que se acaba de guardar en weights_path.
+
+    Args:
+        model: Módulo de PyTorch con `network` o LogisticRegression ajustado
+        weights_path: .pth / .joblib recién guardado con los pesos de `model`
+
+    Returns:
+        Ruta del .npz
+    """
+    bundle = NumpyJudge.from_sklearn(model) if hasattr(model, "coef_") else NumpyMLP.from_torch(model)
+    output_path = os.path.splitext(weights_path)[0] + ".npz"
+    bundle.save(output_path, source_sha1=file_sha1(weights_path))
+    return output_path
+
+
+def device():
+    """Dispositivo de PyTorch a usar (solo con el backend torch)."""
+    import torch
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def linear_layers(model) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Capas lineales de un especialista (NumpyMLP o módulo de PyTorch) como arrays NumPy.
+    """
+    if isinstance(model, NumpyMLP):
+        return model.linear_layers()
+
+    import torch
+    return [
+        (module.weight.detach().cpu().numpy(), module.bias.detach().cpu().numpy())
+        for module in model.network
+        if isinstance(module, torch.nn.Linear)
+    ]
+
+
+def forward(model, X: np.ndarray, apply_sigmoid: bool = True) -> np.ndarray:
+    """
+    Evalúa un especialista sobre X con el backend que corresponda.
+
+    Args:
+        model: NumpyMLP o módulo de PyTorch
+        X: Matriz (n_filas, n_features)
+        apply_sigmoid: Aplicar sigmoide a la salida de la red
+
+    Returns:
+        Array 1-D con la salida (o el score) de cada fila
+    """
+    if isinstance(model, NumpyMLP):
+        output = model(X)
+        if apply_sigmoid:
+            output = sigmoid(output)
+        return output.reshape(-1)
+
+    import torch
+    X_tensor = torch.FloatTensor(np.asarray(X, dtype=np.float32)).to(device())
+    with torch.no_grad():
+        output = model(X_tensor)
+        if apply_sigmoid:
+            output = torch.sigmoid(output)
+    return output.cpu().numpy().reshape(-1)
+
+
+def uses_numpy() -> bool:
+    """Indica si el backend configurado es NumPy."""
+    return INFERENCE_BACKEND == "numpy"
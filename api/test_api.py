@@ -158,17 +158,21 @@ def log_with_timestamp(msg: str, file=None):
         file.flush()
 
 def wait_for_server(max_attempts=30, delay=1):
-    """Espera a que el servidor esté disponible."""
+    """Espera a que el servidor esté disponible y haya terminado de calentar los modelos (/ready)."""
     print(f"\nEsperando a que el servidor este disponible...")
     for i in range(max_attempts):
         try:
-            response = requests.get(f"{BASE_URL}/health", timeout=10)
+            response = requests.get(f"{BASE_URL}/ready", timeout=10)
+            if response.status_code == 404:
+                # Servidor sin /ready: basta con que responda /health
+                response = requests.get(f"{BASE_URL}/health", timeout=10)
             if response.status_code == 200:
                 print(f"[OK] Servidor disponible!")
                 return True
+            print(f"Intento {i+1}/{max_attempts} (calentando modelos)...", end='\r')
         except (requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout):
             print(f"Intento {i+1}/{max_attempts}...", end='\r')
-            time.sleep(delay)
+        time.sleep(delay)
     return False
 
 
@@ -335,6 +339,170 @@ def test_judge():
         print(f"Error: {str(e)}")
 
 
+def test_judge_batch(n_rows: int = 100):
+    """Prueba el endpoint por lotes del juez (array JSON y NDJSON)."""
+    print("\n" + "="*70)
+    print("JUEZ FINAL - PREDICCION POR LOTES")
+    print("="*70)
+    
+    rows = []
+    for i in range(n_rows):
+        row = dict(example_data["data"])
+        row["kepid"] = 10000000 + i
+        row["kepoi_name"] = f"K{i:05d}.01"
+        rows.append(row)
+    
+    predict_url = f"{BASE_URL}/judge/predict-batch"
+    
+    # Array JSON
+    print(f"\n[1] Lote de {n_rows} filas como array JSON...")
+    try:
+        start = time.time()
+        response = requests.post(predict_url, json=rows, timeout=60)
+        elapsed = time.time() - start
+        print(f"Status: {response.status_code}")
+        if response.status_code == 200:
+            result = response.json()
+            print(f"Filas: {result['count']}, válidas: {result['valid']}")
+            print(f"Tiempo total: {elapsed:.3f}s ({elapsed / n_rows * 1000:.2f} ms/fila)")
+            print(json.dumps(result["results"][0], indent=2))
+            if [r.get("kepoi_name") for r in result["results"]] != [r["kepoi_name"] for r in rows]:
+                print("[ERROR] Los IDs de la respuesta no coinciden con los de la entrada")
+        else:
+            print(f"Error: {response.text}")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    
+    # NDJSON
+    print(f"\n[2] Lote de {n_rows} filas como NDJSON...")
+    try:
+        body = "\n".join(json.dumps(row) for row in rows)
+        response = requests.post(
+            predict_url,
+            data=body,
+            headers={"Content-Type": "application/x-ndjson"},
+            timeout=60
+        )
+        print(f"Status: {response.status_code}")
+        if response.status_code == 200:
+            result = response.json()
+            print(f"Filas: {result['count']}, válidas: {result['valid']}")
+        else:
+            print(f"Error: {response.text}")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+
+def test_judge_concurrent(n_requests: int = 32):
+    """Envía peticiones concurrentes a /judge/predict y muestra las métricas de micro-batching."""
+    from concurrent.futures import ThreadPoolExecutor
+    
+    print("\n" + "="*70)
+    print("JUEZ FINAL - PETICIONES CONCURRENTES (MICRO-BATCHING)")
+    print("="*70)
+    
+    predict_url = f"{BASE_URL}/judge/predict"
+    try:
+        expected = requests.post(predict_url, json=example_data, timeout=30).json()
+        
+        print(f"\n[1] {n_requests} peticiones concurrentes...")
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=n_requests) as pool:
+            responses = list(pool.map(
+                lambda _: requests.post(predict_url, json=example_data, timeout=60),
+                range(n_requests)
+            ))
+        elapsed = time.time() - start
+        
+        status_codes = [r.status_code for r in responses]
+        print(f"Status: {dict((code, status_codes.count(code)) for code in set(status_codes))}")
+        print(f"Tiempo total: {elapsed:.3f}s ({n_requests / elapsed:.1f} peticiones/s)")
+        different = sum(1 for r in responses if r.status_code == 200 and r.json() != expected)
+        if different:
+            print(f"[ERROR] {different} respuestas difieren de la predicción individual")
+        
+        print("\n[2] Métricas de micro-batching...")
+        stats_response = requests.get(f"{BASE_URL}/stats/batching", timeout=10)
+        print(json.dumps(stats_response.json()["batchers"].get("judge"), indent=2))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+
+def test_judge_cache():
+    """Repite la misma petición a /judge/predict y muestra las métricas de la caché."""
+    print("\n" + "="*70)
+    print("JUEZ FINAL - CACHÉ DE RESULTADOS")
+    print("="*70)
+    
+    predict_url = f"{BASE_URL}/judge/predict"
+    try:
+        timings = []
+        responses = []
+        for _ in range(2):
+            start = time.time()
+            responses.append(requests.post(predict_url, json=example_data, timeout=30))
+            timings.append(time.time() - start)
+        
+        print(f"Status: {[r.status_code for r in responses]}")
+        print(f"Primera petición: {timings[0] * 1000:.1f} ms, repetida: {timings[1] * 1000:.1f} ms")
+        if responses[0].status_code == 200 and responses[0].json() != responses[1].json():
+            print("[ERROR] La respuesta desde la caché difiere de la original")
+        
+        stats_response = requests.get(f"{BASE_URL}/stats/cache", timeout=10)
+        print(json.dumps(stats_response.json()["caches"].get("judge"), indent=2))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+
+def test_catalog(kepoi_name: str = "K00752.01"):
+    """Consulta el almacén precalculado del catálogo por kepoi_name y por kepid."""
+    print("\n" + "="*70)
+    print("CATÁLOGO PRECALCULADO")
+    print("="*70)
+    
+    try:
+        health = requests.get(f"{BASE_URL}/catalog/health", timeout=10).json()
+        print(f"Almacén: {json.dumps(health['store'], indent=2)}")
+        
+        start = time.time()
+        response = requests.get(f"{BASE_URL}/catalog/{kepoi_name}", timeout=10)
+        print(f"\n[1] /catalog/{kepoi_name}: {response.status_code} ({(time.time() - start) * 1000:.1f} ms)")
+        if response.status_code != 200:
+            print(f"Error: {response.text}")
+            return
+        result = response.json()
+        print(json.dumps(result["result"], indent=2))
+        
+        response = requests.get(f"{BASE_URL}/catalog", params={"kepid": result["kepid"]}, timeout=10)
+        print(f"\n[2] /catalog?kepid={result['kepid']}: {response.status_code}, KOIs: {response.json().get('count')}")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+
+def test_metrics():
+    """Lee /metrics y resume la latencia media de cada etapa del pipeline."""
+    print("\n" + "="*70)
+    print("MÉTRICAS PROMETHEUS")
+    print("="*70)
+    
+    try:
+        response = requests.get(f"{BASE_URL}/metrics", timeout=10)
+        print(f"Status: {response.status_code} ({response.headers.get('content-type')})")
+        sums, counts = {}, {}
+        for line in response.text.splitlines():
+            if line.startswith("exoplanet_stage_duration_seconds_sum"):
+                sums[line.split('stage="')[1].split('"')[0]] = float(line.split()[-1])
+            elif line.startswith("exoplanet_stage_duration_seconds_count"):
+                counts[line.split('stage="')[1].split('"')[0]] = int(line.split()[-1])
+            elif line.startswith(("exoplanet_http_requests_in_flight", "exoplanet_http_throughput")):
+                print(line)
+        for stage, count in counts.items():
+            if count:
+                print(f"  {stage:<28} {count:>6} llamadas, media {sums[stage] / count * 1e6:.1f} µs")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+
 def generate_invalid_data():
     """
     Genera datos inválidos para pruebas.
@@ -393,6 +561,68 @@ def test_invalid_data():
             except Exception as e:
                 print(f"Error: {str(e)}")
 
+def test_judge_file(n_rows: int = 50):
+    """Prueba la subida de un CSV del Archive al juez (respuesta en streaming CSV y NDJSON)."""
+    print("\n" + "="*70)
+    print("JUEZ FINAL - PREDICCION DE ARCHIVO CSV")
+    print("="*70)
+
+    rows = []
+    for i in range(n_rows):
+        row = dict(example_data["data"])
+        row["kepid"] = 10000000 + i
+        row["kepoi_name"] = f"K{i:05d}.01"
+        row["koi_tce_plnt_num"] = 1
+        rows.append(row)
+    # Mismo formato que las descargas del Archive: comentarios '#' antes del encabezado
+    body = "# Archivo de prueba\n# generado por test_api.py\n" + pd.DataFrame(rows).to_csv(index=False)
+
+    predict_url = f"{BASE_URL}/judge/predict-file"
+
+    # multipart/form-data, respuesta CSV
+    print(f"\n[1] Archivo de {n_rows} filas como multipart, respuesta CSV...")
+    try:
+        start = time.time()
+        response = requests.post(
+            predict_url,
+            files={"file": ("kepler.csv", body, "text/csv")},
+            stream=True,
+            timeout=60
+        )
+        print(f"Status: {response.status_code}")
+        if response.status_code == 200:
+            lines = [line for line in response.iter_lines(decode_unicode=True) if line]
+            elapsed = time.time() - start
+            print(f"Filas: {len(lines) - 1} en {elapsed:.3f}s")
+            print("\n".join(lines[:3]))
+        else:
+            print(f"Error: {response.text}")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+    # CSV crudo, respuesta NDJSON
+    print(f"\n[2] Archivo de {n_rows} filas como cuerpo crudo, respuesta NDJSON...")
+    try:
+        response = requests.post(
+            predict_url,
+            params={"format": "ndjson"},
+            data=body.encode("utf-8"),
+            headers={"Content-Type": "text/csv"},
+            stream=True,
+            timeout=60
+        )
+        print(f"Status: {response.status_code}")
+        if response.status_code == 200:
+            results = [json.loads(line) for line in response.iter_lines() if line]
+            print(f"Filas: {len(results)}, válidas: {sum(r['status'] == 'success' for r in results)}")
+            print(json.dumps(results[0], indent=2))
+            if [r.get("kepoi_name") for r in results] != [r["kepoi_name"] for r in rows]:
+                print("[ERROR] Los IDs de la respuesta no coinciden con los del archivo")
+        else:
+            print(f"Error: {response.text}")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
 def test_all_models():
     """
     Prueba todos los modelos secuencialmente.
@@ -422,6 +652,12 @@ def test_all_models():
     # Probar ensemble y juez
     test_ensemble()
     test_judge()
+    test_judge_batch()
+    test_judge_file()
+    test_judge_concurrent()
+    test_judge_cache()
+    test_catalog()
+    test_metrics()
     
     print("\n" + "="*70)
     print("PRUEBAS COMPLETAS")
@@ -452,13 +688,31 @@ def test_specific_model(model_name):
         "estelar": ("Estelar", "estelar"),
         "falsos_positivos": ("Falsos Positivos", "falsos-positivos"),
         "ensemble": None,
-        "judge": None
+        "judge": None,
+        "judge-batch": None,
+        "judge-file": None,
+        "judge-concurrent": None,
+        "judge-cache": None,
+        "catalog": None,
+        "metrics": None
     }
 
     if model_name == "ensemble":
         test_ensemble()
     elif model_name == "judge":
         test_judge()
+    elif model_name == "judge-batch":
+        test_judge_batch()
+    elif model_name == "judge-file":
+        test_judge_file()
+    elif model_name == "judge-concurrent":
+        test_judge_concurrent()
+    elif model_name == "judge-cache":
+        test_judge_cache()
+    elif model_name == "catalog":
+        test_catalog()
+    elif model_name == "metrics":
+        test_metrics()
     elif model_name in model_map:
         name, path = model_map[model_name]
         test_individual_model(name, path)
@@ -483,6 +737,12 @@ if __name__ == "__main__":
             print("  python test_api.py falsos-positivos  # Probar modelo de falsos positivos")
             print("  python test_api.py ensemble    # Probar el modelo ensemble")
             print("  python test_api.py judge       # Probar el juez final")
+            print("  python test_api.py judge-batch # Probar el juez final por lotes")
+            print("  python test_api.py judge-file  # Probar el juez final con un archivo CSV")
+            print("  python test_api.py judge-concurrent  # Probar peticiones concurrentes al juez")
+            print("  python test_api.py judge-cache # Probar la caché de resultados del juez")
+            print("  python test_api.py catalog     # Probar el catálogo precalculado")
+            print("  python test_api.py metrics     # Ver la latencia de cada etapa en /metrics")
             sys.exit(0)
         
         print(f"\nProbando modelo: {model_name}")
@@ -0,0 +1,238 @@
+# api/utils/batching.py
+
+"""
+Micro-batching de peticiones concurrentes.
+
+Las peticiones individuales a /judge/predict y /ensemble/predict que llegan dentro
+de una ventana corta (BATCH_WINDOW_MS) o hasta juntar BATCH_MAX_ROWS filas se
+procesan juntas: un solo preprocesamiento y una sola pasada de los modelos sobre la
+matriz completa. Cada petición recibe después su propio resultado. Así el costo
+bajo carga crece con el número de lotes y no con el de peticiones.
+
+Como mucho se procesan a la vez tantos lotes como workers tiene el ejecutor;
+mientras están ocupados las peticiones nuevas se siguen acumulando, de modo que
+el tamaño de lote crece solo cuando sube la carga.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from api.config import BATCH_WINDOW_MS, BATCH_MAX_ROWS
+from api.utils.executor import executor, run_blocking
+
+# Lotes registrados, por nombre (para /stats/batching)
+BATCHERS: Dict[str, "MicroBatcher"] = {}
+
+# Límites superiores de los buckets del histograma de tamaños de lote
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+# Número de esperas recientes guardadas para los percentiles
+WAIT_SAMPLES = 1000
+
+
+class _PendingRequest:
+    """Una petición esperando a ser procesada en un lote."""
+
+    __slots__ = ("item", "future", "enqueued_at")
+
+    def __init__(self, item: Any, future: asyncio.Future):
+        self.item = item
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Agrupa las peticiones que llegan en una ventana de tiempo y las procesa juntas.
+
+    `process_batch` recibe la lista de elementos del lote y devuelve la lista de
+    resultados en el mismo orden; se ejecuta en el ejecutor compartido. Si el lote
+    completo falla, cada elemento se reprocesa por separado para que el error solo
+    llegue a las peticiones que lo causan.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process_batch: Callable[[List[Any]], List[Any]],
+        window_ms: float = BATCH_WINDOW_MS,
+        max_rows: int = BATCH_MAX_ROWS,
+        max_concurrent: Optional[int] = None
+    ):
+        """
+        Args:
+            name: Nombre del lote (para las métricas)
+            process_batch: Función síncrona lista de elementos -> lista de resultados
+            window_ms: Tiempo máximo que espera la primera petición de un lote (0 desactiva el batching)
+            max_rows: Tamaño máximo de un lote; al alcanzarlo se procesa de inmediato
+            max_concurrent: Lotes procesándose a la vez (por defecto, los workers del ejecutor)
+        """
+        self.name = name
+        self.process_batch = process_batch
+        self.window = max(window_ms, 0) / 1000
+        self.max_rows = max(int(max_rows), 1)
+        self.max_concurrent = max_concurrent or executor.max_workers
+        self.enabled = self.window > 0 and self.max_rows > 1
+
+        self._pending: List[_PendingRequest] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = 0
+        self._waiting_worker = False
+        self._tasks = set()
+
+        # Métricas
+        self._batches = 0
+        self._requests = 0
+        self._fallbacks = 0
+        self._max_batch_size = 0
+        self._size_histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._total_wait = 0.0
+
+        BATCHERS[name] = self
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Encola un elemento y espera su resultado.
+
+        Raises:
+            Exception: La excepción que produjo el procesamiento de este elemento
+        """
+        if not self.enabled:
+            self._record([time.perf_counter()], time.perf_counter())
+            return (await run_blocking(self.process_batch, [item]))[0]
+
+        loop = asyncio.get_running_loop()
+        request = _PendingRequest(item, loop.create_future())
+        self._pending.append(request)
+
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None and not self._waiting_worker:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await request.future
+
+    def _flush(self) -> None:
+        """Saca el siguiente lote de la cola y lanza su procesamiento."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self._running >= self.max_concurrent:
+            # Todos los workers ocupados: el lote sigue creciendo hasta que termine uno
+            self._waiting_worker = True
+            return
+
+        batch = self._pending[:self.max_rows]
+        self._pending = self._pending[self.max_rows:]
+        if self._pending:
+            # Lo que no cupo forma el siguiente lote
+            loop = asyncio.get_running_loop()
+            if len(self._pending) >= self.max_rows:
+                loop.call_soon(self._flush)
+            else:
+                self._timer = loop.call_later(self.window, self._flush)
+
+        if batch:
+            self._running += 1
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: asyncio.Task) -> None:
+        """Libera el lugar del lote terminado y procesa lo acumulado mientras tanto."""
+        self._tasks.discard(task)
+        self._running -= 1
+        if self._waiting_worker:
+            self._waiting_worker = False
+            if self._pending:
+                self._flush()
+
+    async def _run(self, batch: List[_PendingRequest]) -> None:
+        """Procesa un lote y entrega a cada petición su resultado o su error."""
+        # Peticiones cuyo cliente ya se desconectó
+        batch = [request for request in batch if not request.future.done()]
+        if not batch:
+            return
+        self._record([request.enqueued_at for request in batch], time.perf_counter())
+
+        try:
+            results = await run_blocking(self.process_batch, [request.item for request in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Se esperaban {len(batch)} resultados, se obtuvieron {len(results)}")
+        except Exception as e:
+            if len(batch) == 1:
+                _set_exception(batch[0].future, e)
+                return
+            # Reprocesar uno por uno para aislar el error
+            logging.warning(f"Lote '{self.name}' de {len(batch)} filas falló ({str(e)}), procesando por separado")
+            self._fallbacks += 1
+            for request in batch:
+                try:
+                    _set_result(request.future, (await run_blocking(self.process_batch, [request.item]))[0])
+                except Exception as item_error:
+                    _set_exception(request.future, item_error)
+            return
+
+        for request, result in zip(batch, results):
+            _set_result(request.future, result)
+
+    def _record(self, enqueued_at: List[float], started_at: float) -> None:
+        """Registra el tamaño del lote y la espera en cola de cada petición."""
+        size = len(enqueued_at)
+        self._batches += 1
+        self._requests += size
+        self._max_batch_size = max(self._max_batch_size, size)
+        bucket = next((i for i, limit in enumerate(BATCH_SIZE_BUCKETS) if size <= limit), len(BATCH_SIZE_BUCKETS))
+        self._size_histogram[bucket] += 1
+        for enqueued in enqueued_at:
+            wait = started_at - enqueued
+            self._waits.append(wait)
+            self._total_wait += wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de tamaño de lote y espera en cola."""
+        waits_ms = np.array(self._waits) * 1000 if self._waits else np.zeros(1)
+        labels = [f"<={limit}" for limit in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "max_rows": self.max_rows,
+            "batches": self._batches,
+            "requests": self._requests,
+            "pending": len(self._pending),
+            "running": self._running,
+            "fallbacks": self._fallbacks,
+            "batch_size": {
+                "mean": round(self._requests / self._batches, 2) if self._batches else 0.0,
+                "max": self._max_batch_size,
+                "histogram": dict(zip(labels, self._size_histogram))
+            },
+            "queue_wait_ms": {
+                "mean": round(self._total_wait * 1000 / self._requests, 3) if self._requests else 0.0,
+                "p50": round(float(np.percentile(waits_ms, 50)), 3),
+                "p95": round(float(np.percentile(waits_ms, 95)), 3),
+                "max": round(float(waits_ms.max()), 3)
+            }
+        }
+
+
+def _set_result(future: asyncio.Future, result: Any) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, error: Exception) -> None:
+    if not future.done():
+        future.set_exception(error)
+
+
+def all_stats() -> Dict[str, Any]:
+    """Métricas de todos los lotes registrados."""
+    return {name: batcher.stats() for name, batcher in BATCHERS.items()}
@@ -0,0 +1,379 @@
+# api/utils/cache.py
+
+"""
+Caché de resultados de /judge/predict y /ensemble/predict.
+
+Los dashboards piden los mismos KOIs una y otra vez; con la caché la segunda vez
+no se paga validación de modelos → imputación → escalado → especialistas → juez.
+
+La clave es un hash de la fila cruda que recibiría el preprocesamiento (valores en
+el orden de RAW_COLUMNS más las columnas de error presentes), así que dos entradas
+tienen la misma clave si y solo si el pipeline las vería iguales: el orden de las
+claves, `1` vs `1.0` o campos que no son características (kepid, kepoi_name) no
+cambian el resultado ni la clave.
+
+La huella de los artefactos (pesos de outputs/weights, imputer.gz y scaler.gz) forma
+parte de la clave; cuando alguno cambia en disco la caché se vacía.
+
+Backends:
+    memory: LRU en memoria por proceso (por defecto)
+    sqlite: archivo SQLite local compartido por varios workers de uvicorn
+
+Las rutas async usan get_many_async / put_many_async (y get_async / put_async): con
+el backend en memoria la consulta se hace en el event loop, y con SQLite en un hilo
+aparte (asyncio.to_thread). Nunca pasan por el ejecutor de inferencia: con
+EXECUTOR_KIND="process" la caché tendría que serializarse a otro proceso (y lo que
+se guardara ahí se perdería), y con hilos un acierto esperaría en la misma cola que
+la imputación y ocuparía un lugar del límite de 503.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from api.config import (
+    CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CACHE_SQLITE_PATH
+)
+from api.services.runtime import WEIGHTS_DIR
+from api.utils.preprocessing import PROCESSED_PATH, records_to_raw_matrix
+
+# Artefactos de preprocesamiento que invalidan la caché al cambiar (además de los pesos)
+PREPROCESSING_ARTIFACTS = [
+    os.path.join(PROCESSED_PATH, "imputer.gz"),
+    os.path.join(PROCESSED_PATH, "scaler.gz")
+]
+
+# Segundos entre revisiones de la huella de los artefactos
+FINGERPRINT_CHECK_SECONDS = 1.0
+
+
+def artifacts_fingerprint() -> str:
+    """
+    Huella de los archivos de pesos y de preprocesamiento (ruta, tamaño y fecha de
+    modificación de cada uno).
+    """
+    paths = list(PREPROCESSING_ARTIFACTS)
+    if os.path.isdir(WEIGHTS_DIR):
+        paths += [os.path.join(WEIGHTS_DIR, name) for name in sorted(os.listdir(WEIGHTS_DIR))]
+
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        except OSError:
+            digest.update(f"{os.path.basename(path)}:missing;".encode())
+    return digest.hexdigest()[:16]
+
+
+def canonical_keys(rows: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """
+    Hash canónico de cada fila, a partir de la matriz cruda del preprocesamiento.
+
+    Returns:
+        Una clave por fila; None si las filas no se pueden convertir (p. ej. valores
+        no numéricos), en cuyo caso no se usan con la caché
+    """
+    try:
+        raw, errors_present = records_to_raw_matrix(rows)
+    except (ValueError, TypeError):
+        return [None] * len(rows)
+    # Todos los NaN con el mismo patrón de bits, y -0.0 igual a 0.0
+    raw = np.where(np.isnan(raw), np.nan, raw + 0.0)
+    return [
+        hashlib.sha1(raw[i].tobytes() + np.packbits(errors_present[i]).tobytes()).hexdigest()
+        for i in range(len(rows))
+    ]
+
+
+class MemoryBackend:
+    """LRU en memoria con tamaño máximo."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, stored_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    LRU en un archivo SQLite local, compartido entre procesos. Los resultados se
+    guardan como JSON; cada caché usa su propio espacio de nombres dentro del archivo.
+    """
+
+    def __init__(self, path: str, namespace: str, max_entries: int):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+        # La conexión se abre en el primer uso y una por proceso: una conexión SQLite
+        # no puede usarse después de un fork (servidor pre-fork, api/server.py)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexión de este proceso (se abre la primera vez)."""
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, used_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS predictions_lru ON predictions (namespace, used_at)"
+            )
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, stored_at FROM predictions WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE predictions SET used_at = ? WHERE namespace = ? AND key = ?",
+                (time.time(), self.namespace, key)
+            )
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, stored_at: float) -> None:
+        payload = json.dumps(value)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, payload, stored_at, time.time())
+            )
+            excess = self.conn.execute(
+                "SELECT COUNT(*) FROM predictions WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.conn.execute(
+                    "DELETE FROM predictions WHERE namespace = ? AND key IN ("
+                    "SELECT key FROM predictions WHERE namespace = ? ORDER BY used_at LIMIT ?)",
+                    (self.namespace, self.namespace, excess)
+                )
+                self.evictions += excess
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM predictions WHERE namespace = ? AND key = ?", (self.namespace, key)
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM predictions WHERE namespace = ?", (self.namespace,))
+
+    def size(self) -> int:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM predictions WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+
+
+# Cachés registradas, por nombre (para /stats/cache)
+CACHES: Dict[str, "PredictionCache"] = {}
+
+
+class PredictionCache:
+    """
+    Caché LRU/TTL de resultados de predicción indexada por el hash canónico de la entrada.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        backend: str = CACHE_BACKEND,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        sqlite_path: str = CACHE_SQLITE_PATH
+    ):
+        """
+        Args:
+            name: Nombre de la caché (y espacio de nombres en SQLite)
+            backend: "memory" o "sqlite"
+            max_entries: Resultados guardados como máximo (0 desactiva la caché)
+            ttl_seconds: Vigencia de cada resultado (0 = sin vencimiento)
+            sqlite_path: Archivo del backend SQLite
+        """
+        self.name = name
+        self.enabled = max_entries > 0
+        self.ttl = max(ttl_seconds, 0)
+        self.backend_name = backend
+        self.backend = None
+        if self.enabled:
+            if backend == "sqlite":
+                self.backend = SQLiteBackend(sqlite_path, name, max_entries)
+            else:
+                self.backend = MemoryBackend(max_entries)
+        self.max_entries = max_entries
+
+        self._fingerprint = artifacts_fingerprint()
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Métricas
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._invalidations = 0
+
+        CACHES[name] = self
+
+    def _check_artifacts(self) -> None:
+        """Vacía la caché si cambió algún archivo de pesos o de preprocesamiento."""
+        now = time.monotonic()
+        if now - self._checked_at < FINGERPRINT_CHECK_SECONDS:
+            return
+        with self._lock:
+            if now - self._checked_at < FINGERPRINT_CHECK_SECONDS:
+                return
+            self._checked_at = now
+            fingerprint = artifacts_fingerprint()
+            if fingerprint != self._fingerprint:
+                logging.info(f"Artefactos del modelo modificados, vaciando la caché '{self.name}'")
+                self._fingerprint = fingerprint
+                self._invalidations += 1
+                self.backend.clear()
+
+    def _full_key(self, key: str) -> str:
+        return f"{self._fingerprint}:{key}"
+
+    def get_many(self, rows: List[Dict[str, Any]]) -> List[Optional[Any]]:
+        """
+        Busca el resultado de cada fila.
+
+        Returns:
+            El resultado guardado de cada fila, o None si no está (o venció)
+        """
+        if not self.enabled:
+            return [None] * len(rows)
+        self._check_artifacts()
+
+        results = []
+        now = time.time()
+        for key in canonical_keys(rows):
+            entry = self.backend.get(self._full_key(key)) if key is not None else None
+            if entry is not None and self.ttl and now - entry[1] > self.ttl:
+                self.backend.delete(self._full_key(key))
+                self._expired += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                results.append(None)
+            else:
+                self._hits += 1
+                results.append(entry[0])
+        return results
+
+    def put_many(self, rows: List[Dict[str, Any]], results: List[Any]) -> None:
+        """Guarda el resultado de cada fila."""
+        if not self.enabled:
+            return
+        now = time.time()
+        for key, result in zip(canonical_keys(rows), results):
+            if key is not None:
+                self.backend.set(self._full_key(key), result, now)
+
+    def get(self, data: Dict[str, Any]) -> Optional[Any]:
+        """Resultado guardado para una entrada, o None."""
+        return self.get_many([data])[0]
+
+    def put(self, data: Dict[str, Any], result: Any) -> None:
+        """Guarda el resultado de una entrada."""
+        self.put_many([data], [result])
+
+    async def get_many_async(self, rows: List[Dict[str, Any]]) -> List[Optional[Any]]:
+        """get_many sin bloquear el event loop (SQLite en un hilo aparte)."""
+        if self.enabled and self.backend_name == "sqlite":
+            return await asyncio.to_thread(self.get_many, rows)
+        return self.get_many(rows)
+
+    async def put_many_async(self, rows: List[Dict[str, Any]], results: List[Any]) -> None:
+        """put_many sin bloquear el event loop (SQLite en un hilo aparte)."""
+        if self.enabled and self.backend_name == "sqlite":
+            await asyncio.to_thread(self.put_many, rows, results)
+        else:
+            self.put_many(rows, results)
+
+    async def get_async(self, data: Dict[str, Any]) -> Optional[Any]:
+        """get sin bloquear el event loop."""
+        return (await self.get_many_async([data]))[0]
+
+    async def put_async(self, data: Dict[str, Any], result: Any) -> None:
+        """put sin bloquear el event loop."""
+        await self.put_many_async([data], [result])
+
+    def clear(self) -> None:
+        """Vacía la caché."""
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Aciertos, fallos, tamaño y expulsiones de la caché."""
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend_name,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "size": self.backend.size() if self.enabled else 0,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "expired": self._expired,
+            "evictions": self.backend.evictions if self.enabled else 0,
+            "invalidations": self._invalidations,
+            "artifacts_fingerprint": self._fingerprint
+        }
+
+
+def all_stats() -> Dict[str, Any]:
+    """Métricas de todas las cachés registradas."""
+    return {name: cache.stats() for name, cache in CACHES.items()}
@@ -0,0 +1,264 @@
+# api/utils/csv_stream.py
+
+"""
+Lectura por bloques de CSVs del NASA Exoplanet Archive subidos al API.
+
+El cuerpo de la petición (CSV crudo o multipart/form-data con un campo de archivo)
+se lee a medida que llega: los bytes se decodifican y se cortan en líneas, se
+descartan los comentarios '#' del encabezado del Archive y las filas se agrupan en
+bloques de tamaño fijo. Cada bloque se convierte a la matriz cruda de
+preprocess_matrix (columnas de RAW_COLUMNS, NaN en los valores vacíos), así que la
+memoria depende del tamaño del bloque y no del tamaño del archivo.
+
+Limitación: un campo entre comillas no puede contener saltos de línea (el Archive
+no los usa).
+"""
+
+import codecs
+import csv
+import math
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .preprocessing import RAW_COLUMNS
+
+# Campo del formulario multipart con el archivo
+FILE_FIELD = "file"
+
+
+class MultipartFileStream:
+    """
+    Extrae, a medida que llegan los trozos del cuerpo, los bytes del archivo de una
+    petición multipart/form-data (el campo FILE_FIELD, o la primera parte con
+    nombre de archivo).
+    """
+
+    def __init__(self, boundary: bytes):
+        self.found = False
+        self._output: List[bytes] = []
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._in_file = False
+        self._done = False
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end
+        })
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        is_file = options.get(b"name") == FILE_FIELD.encode() or b"filename" in options
+        self._in_file = is_file and not self._done
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._output.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self.found = self._done = True
+        self._in_file = False
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Procesa un trozo del cuerpo y devuelve los bytes del archivo que contenía."""
+        self._parser.write(chunk)
+        data = b"".join(self._output)
+        self._output.clear()
+        return data
+
+
+async def request_file_chunks(request: Request) -> AsyncIterator[bytes]:
+    """
+    Bytes del archivo subido, a medida que llegan (CSV crudo o multipart/form-data).
+
+    Raises:
+        ValueError: Si la petición multipart no trae ningún archivo
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data":
+        async for chunk in request.stream():
+            if chunk:
+                yield chunk
+        return
+
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise ValueError("Falta el boundary de multipart/form-data")
+    parser = MultipartFileStream(boundary)
+    async for chunk in request.stream():
+        data = parser.feed(chunk)
+        if data:
+            yield data
+    if not parser.found:
+        raise ValueError(f"La petición multipart no contiene el archivo (campo '{FILE_FIELD}')")
+
+
+class CSVBlockReader:
+    """
+    Agrupa las filas de un CSV que llega en trozos de bytes en bloques de hasta
+    `block_rows` líneas, sin las líneas de comentario ('#') ni las vacías.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], block_rows: int):
+        self._chunks = chunks
+        self.block_rows = block_rows
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._partial = ""
+        self._lines: List[str] = []
+        self._exhausted = False
+        self.header: Optional[List[str]] = None
+
+    async def _fill(self) -> bool:
+        """Lee el siguiente trozo y lo corta en líneas completas; False al terminar el cuerpo."""
+        if self._exhausted:
+            return False
+        try:
+            chunk = await self._chunks.__anext__()
+            text = self._decoder.decode(chunk)
+        except StopAsyncIteration:
+            self._exhausted = True
+            text = self._decoder.decode(b"", final=True)
+            if self._partial or text:
+                text = text + "\n"
+        except UnicodeDecodeError:
+            raise ValueError("El archivo no es texto UTF-8")
+
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            line = line.rstrip("\r")
+            if line.strip() and not line.startswith("#"):
+                self._lines.append(line)
+        return True
+
+    async def read_header(self) -> List[str]:
+        """
+        Lee hasta la primera línea que no es comentario (los nombres de las columnas).
+
+        Raises:
+            ValueError: Si el archivo no tiene encabezado
+        """
+        while not self._lines:
+            if not await self._fill():
+                raise ValueError("El archivo está vacío o solo contiene comentarios")
+        self.header = [name.strip() for name in next(csv.reader([self._lines.pop(0)]))]
+        return self.header
+
+    async def blocks(self) -> AsyncIterator[List[str]]:
+        """Bloques de hasta `block_rows` líneas de datos, en orden."""
+        while True:
+            while len(self._lines) < self.block_rows and await self._fill():
+                pass
+            if not self._lines:
+                return
+            block = self._lines[:self.block_rows]
+            del self._lines[:self.block_rows]
+            yield block
+
+
+def missing_raw_columns(header: List[str]) -> List[str]:
+    """Columnas de RAW_COLUMNS que no están en el encabezado."""
+    present = set(header)
+    return [col for col in RAW_COLUMNS if col not in present]
+
+
+def parse_block(
+    header: List[str],
+    lines: List[str],
+    id_fields: List[str]
+) -> Tuple[List[Dict[str, Any]], np.ndarray, List[Optional[str]]]:
+    """
+    Convierte un bloque de líneas a la matriz cruda de preprocess_matrix.
+
+    Los valores vacíos quedan como NaN (se imputan); las filas con un valor no
+    numérico o con un número de campos distinto al del encabezado se marcan con su
+    error y su fila de la matriz queda en NaN.
+
+    Args:
+        header: Nombres de las columnas del archivo
+        lines: Líneas de datos del bloque
+        id_fields: Columnas que se copian tal cual como identificadores
+
+    Returns:
+        (identificadores de cada fila, matriz (n_filas, len(RAW_COLUMNS)),
+         error de cada fila o None)
+    """
+    raw_index = [header.index(col) for col in RAW_COLUMNS]
+    id_index = [(field, header.index(field)) for field in id_fields if field in header]
+
+    raw = np.full((len(lines), len(RAW_COLUMNS)), np.nan)
+    ids: List[Dict[str, Any]] = []
+    errors: List[Optional[str]] = []
+    for i, fields in enumerate(csv.reader(lines)):
+        ids.append({field: _identifier(fields[j]) for field, j in id_index if j < len(fields)})
+        if len(fields) != len(header):
+            errors.append(f"La fila tiene {len(fields)} campos; el encabezado tiene {len(header)}")
+            continue
+        try:
+            raw[i] = [float(fields[j]) if fields[j].strip() else math.nan for j in raw_index]
+        except ValueError:
+            bad = [col for col, j in zip(RAW_COLUMNS, raw_index) if not _is_number(fields[j])]
+            raw[i] = math.nan
+            errors.append(f"Valores no numéricos en: {bad}")
+            continue
+        errors.append(None)
+    return ids, raw, errors
+
+
+def _is_number(value: str) -> bool:
+    if not value.strip():
+        return True
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _identifier(value: str) -> Any:
+    """Identificador de la fila: entero si lo es (kepid), texto si no (kepoi_name)."""
+    value = value.strip()
+    return int(value) if value.isdigit() else value
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que puede seguir leyendo el cuerpo de la petición mientras
+    envía la respuesta.
+
+    Con ASGI < 2.4 (uvicorn) StreamingResponse escucha la desconexión del cliente
+    con receive() en paralelo y consumiría los trozos del cuerpo que el generador
+    todavía no leyó. Aquí receive() solo lo usa el generador; la tarea de fondo
+    (background) se ejecuta siempre, también si el cliente se desconecta.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        finally:
+            if self.background is not None:
+                await self.background()
@@ -0,0 +1,144 @@
+# api/utils/executor.py
+
+"""
+Ejecutor acotado para el trabajo de CPU de las rutas de predicción.
+
+El preprocesamiento (pandas + imputación KNN) y los forward de los modelos son
+síncronos; si se ejecutan dentro de un `async def` bloquean el event loop y todas
+las demás peticiones del worker (incluidos /health y /features) esperan. Las rutas
+de predicción los envían a un pool de hilos o procesos con un número limitado de
+peticiones en curso: cuando el pool y su cola están llenos se responde 503 de
+inmediato en lugar de acumular latencia.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from api.config import EXECUTOR_KIND, EXECUTOR_WORKERS, EXECUTOR_QUEUE_LIMIT
+
+# Segundos sugeridos al cliente para reintentar cuando el servidor está saturado
+RETRY_AFTER_SECONDS = 1
+
+
+class BoundedExecutor:
+    """
+    Pool de hilos/procesos con control de admisión: como máximo
+    `max_workers + queue_limit` peticiones en curso (ejecutándose o en cola).
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 1, queue_limit: int = 0):
+        """
+        Args:
+            kind: "thread" o "process"
+            max_workers: Tamaño del pool
+            queue_limit: Peticiones que pueden esperar a que se libere un worker
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Tipo de ejecutor no soportado: '{kind}'")
+        if max_workers < 1 or queue_limit < 0:
+            raise ValueError("max_workers debe ser >= 1 y queue_limit >= 0")
+
+        self.kind = kind
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.capacity = max_workers + queue_limit
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_pool(self) -> Executor:
+        """Crea el pool la primera vez que se usa."""
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        return self._pool
+
+    def try_acquire(self) -> bool:
+        """Reserva un lugar para una petición; False si el ejecutor está lleno."""
+        if self._in_flight >= self.capacity:
+            self._rejected += 1
+            return False
+        self._in_flight += 1
+        return True
+
+    def release(self) -> None:
+        """Libera el lugar reservado con try_acquire."""
+        self._in_flight -= 1
+        self._completed += 1
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta func(*args, **kwargs) en el pool y espera su resultado sin bloquear
+        el event loop. Las excepciones de func se propagan tal cual.
+
+        Con kind="process", func y sus argumentos deben ser serializables (funciones
+        a nivel de módulo); cada proceso carga sus propios modelos.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), functools.partial(func, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado actual del ejecutor."""
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "rejected": self._rejected
+        }
+
+    def shutdown(self) -> None:
+        """Detiene el pool (esperando las tareas en curso)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+# Ejecutor compartido por todas las rutas de predicción
+executor = BoundedExecutor(EXECUTOR_KIND, EXECUTOR_WORKERS, EXECUTOR_QUEUE_LIMIT)
+
+
+def acquire_slot() -> None:
+    """
+    Reserva un lugar en el ejecutor para una petición; quien lo reserva debe
+    liberarlo con executor.release().
+
+    Raises:
+        HTTPException (503): Si ya hay `capacity` peticiones en curso
+    """
+    if not executor.try_acquire():
+        logging.warning(f"Ejecutor saturado ({executor.capacity} peticiones en curso), respondiendo 503")
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor saturado, intente de nuevo en unos segundos",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+
+async def inference_slot():
+    """
+    Dependencia de FastAPI para las rutas de predicción: reserva un lugar en el
+    ejecutor durante toda la petición o responde 503 si está lleno.
+
+    Raises:
+        HTTPException (503): Si ya hay `capacity` peticiones en curso
+    """
+    acquire_slot()
+    try:
+        yield
+    finally:
+        executor.release()
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Atajo para ejecutar trabajo de CPU en el ejecutor compartido."""
+    return await executor.run(func, *args, **kwargs)
@@ -0,0 +1,476 @@
+# api/utils/imputation.py
+
+"""
+Motor de imputación KNN equivalente a sklearn.impute.KNNImputer.
+
+KNNImputer.transform recalcula en cada llamada todo lo que depende de la matriz de
+entrenamiento (normas, máscaras de faltantes, donantes por columna, medias) y pasa
+por la validación y el troceado genérico de sklearn. Aquí todo eso se precalcula una
+sola vez al cargar el imputer: por petición solo queda el kernel nan-euclidean
+(productos matriciales contra los términos precalculados) y la selección de vecinos
+por columna faltante.
+
+Se usa la misma fórmula y el mismo orden de operaciones que
+sklearn.metrics.pairwise.nan_euclidean_distances y KNNImputer._calc_impute, por lo
+que los valores imputados son los mismos que los del imputer original.
+
+KNNImputer calcula las distancias de todo un bloque de filas con productos
+matriciales, y BLAS no redondea igual el producto de un bloque que el de cada fila:
+con columnas del orden de 1e23 eso cambia el vecino elegido, así que con sklearn
+el valor imputado de una fila depende de qué otras filas se imputan con ella.
+transform (el camino del API) calcula las distancias de cada fila como
+KNNImputer.transform con esa sola fila: una fila da el mismo resultado en
+/judge/predict, en un lote, en un bloque de un archivo o en el catálogo. Los
+productos de todo el bloque se hacen en una sola llamada a np.matmul con las filas
+apiladas (n_filas, 1, n_features), que hace el producto vector-matriz de cada fila
+por separado (el mismo que np.dot con esa sola fila) sin un bucle en Python.
+
+Para el preprocesamiento offline (scripts/preprocess.py), parallel_transform reparte
+los bloques de filas entre varios procesos que comparten el motor (fork, sin
+copiarlo). Los bloques son los mismos que usa sklearn (pairwise_distances_chunked
+con working_memory): BLAS no redondea igual un producto matricial de otra forma, y
+con otros bloques una distancia podría cambiar en el último bit y con ella el
+vecino elegido en un empate.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from typing import Dict, List, Optional
+
+# Filas procesadas por bloque en transform. Los productos fila a fila leen la matriz
+# de entrenamiento completa por cada fila: con bloques chicos las distancias y los
+# temporales del bloque (~BLOCK_ROWS x n_train) siguen en caché
+BLOCK_ROWS = 32
+
+# working_memory (MiB) por defecto de sklearn, si sklearn no está instalado
+DEFAULT_WORKING_MEMORY = 1024
+
+# Arrays que forman el estado del motor (ver arrays() / from_arrays()); los donantes
+# de cada columna se guardan concatenados con sus desplazamientos
+ENGINE_ARRAYS = [
+    "fit_X", "mask_fit_X", "valid_mask",
+    "_fit_zeroed", "_fit_norms", "_fit_squared", "_fit_missing", "_fit_present", "_fit_present_total",
+    "_col_means", "_donors_flat", "_donor_values_flat", "_donor_offsets"
+]
+
+
+class KNNImputationEngine:
+    """
+    Imputación KNN (métrica nan_euclidean, pesos uniformes) con los términos de la
+    matriz de entrenamiento precalculados.
+    """
+
+    def __init__(
+        self,
+        fit_X: np.ndarray,
+        n_neighbors: int,
+        feature_names: Optional[List[str]] = None,
+        valid_mask: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            fit_X: Matriz de entrenamiento del imputer (con NaN en los faltantes)
+            n_neighbors: Número de vecinos a promediar
+            feature_names: Nombres de las columnas, en orden
+            valid_mask: Columnas con al menos un valor en entrenamiento
+        """
+        self.fit_X = np.asarray(fit_X, dtype=np.float64)
+        self.n_neighbors = int(n_neighbors)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.n_features = self.fit_X.shape[1]
+        self._precompute(valid_mask)
+
+    def _precompute(self, valid_mask: Optional[np.ndarray]) -> None:
+        """Calcula todos los términos que dependen solo de la matriz de entrenamiento."""
+        self.mask_fit_X = np.isnan(self.fit_X)
+        if valid_mask is None:
+            valid_mask = ~self.mask_fit_X.all(axis=0)
+        self.valid_mask = np.asarray(valid_mask, dtype=bool)
+
+        # Términos del kernel nan-euclidean que solo dependen de la matriz de
+        # entrenamiento. Se conserva el orden en memoria de fit_X (Fortran en un
+        # KNNImputer ajustado), igual que la copia que hace sklearn: con otro orden
+        # BLAS redondea distinto los productos y con valores del orden de 1e23 eso
+        # basta para cambiar el vecino elegido.
+        fit_zeroed = np.array(self.fit_X, copy=True, order="K")
+        fit_zeroed[self.mask_fit_X] = 0.0
+        self._fit_zeroed = fit_zeroed
+        self._fit_norms = np.einsum("ij,ij->i", fit_zeroed, fit_zeroed)[None, :]
+        self._fit_squared = fit_zeroed * fit_zeroed
+        self._fit_missing = self.mask_fit_X.astype(np.float64)
+        self._fit_present = (~self.mask_fit_X).astype(np.float64)
+        self._fit_present_total = self._fit_present.sum(axis=1)
+
+        # Donantes potenciales, sus valores y la media de respaldo para cada columna
+        donors_idx_by_col = []
+        self._col_means = np.zeros(self.n_features)
+        for col in range(self.n_features):
+            (donors_idx,) = np.nonzero(~self.mask_fit_X[:, col])
+            donors_idx_by_col.append(donors_idx)
+            if self.valid_mask[col]:
+                self._col_means[col] = np.ma.array(
+                    self.fit_X[:, col], mask=self.mask_fit_X[:, col]
+                ).mean()
+        self._donors_flat = np.concatenate(donors_idx_by_col)
+        self._donor_values_flat = np.concatenate([
+            self.fit_X[donors_idx, col] for col, donors_idx in enumerate(donors_idx_by_col)
+        ])
+        self._donor_offsets = np.cumsum([0] + [len(idx) for idx in donors_idx_by_col])
+        self._split_donors()
+
+    def _split_donors(self) -> None:
+        """
+        Vistas por columna de los donantes concatenados (sin copiar) y grupo de
+        cada columna: las columnas con los mismos donantes (p. ej. un valor y sus
+        errores) comparten la selección de vecinos.
+        """
+        bounds = list(zip(self._donor_offsets[:-1], self._donor_offsets[1:]))
+        self._donors_idx = [self._donors_flat[start:end] for start, end in bounds]
+        self._donor_values = [self._donor_values_flat[start:end] for start, end in bounds]
+        groups: Dict[bytes, int] = {}
+        self._donor_group = [groups.setdefault(idx.tobytes(), len(groups)) for idx in self._donors_idx]
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Estado completo del motor como arrays con nombre (ENGINE_ARRAYS)."""
+        return {name: np.asarray(getattr(self, name)) for name in ENGINE_ARRAYS}
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        n_neighbors: int,
+        feature_names: Optional[List[str]] = None
+    ) -> "KNNImputationEngine":
+        """
+        Reconstruye el motor a partir de arrays() sin recalcular nada. Los arrays
+        pueden ser memory-maps de solo lectura: el motor nunca los modifica.
+
+        Args:
+            arrays: Arrays con los nombres de ENGINE_ARRAYS
+            n_neighbors: Número de vecinos a promediar
+            feature_names: Nombres de las columnas, en orden
+
+        Raises:
+            ValueError: Si falta algún array
+        """
+        missing = [name for name in ENGINE_ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f"Faltan arrays del motor de imputación: {missing}")
+
+        engine = cls.__new__(cls)
+        for name in ENGINE_ARRAYS:
+            # Vista ndarray (sin copiar) de cada memory-map: indexar un np.memmap
+            # pasa por su subclase en cada operación
+            setattr(engine, name, np.asarray(arrays[name]))
+        engine.n_neighbors = int(n_neighbors)
+        engine.feature_names = list(feature_names) if feature_names is not None else None
+        engine.n_features = engine.fit_X.shape[1]
+        engine._split_donors()
+        return engine
+
+    def save(self, directory: str) -> None:
+        """
+        Guarda cada array de arrays() como <directory>/<nombre>.npy, con su orden en
+        memoria (np.save registra fortran_order y np.load lo respeta): los productos
+        matriciales del motor cargado redondean igual que los del motor original.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name, array in self.arrays().items():
+            np.save(os.path.join(directory, f"{name.lstrip('_')}.npy"), array, allow_pickle=False)
+
+    @classmethod
+    def load(
+        cls,
+        directory: str,
+        n_neighbors: int,
+        feature_names: Optional[List[str]] = None,
+        mmap_mode: Optional[str] = "r"
+    ) -> "KNNImputationEngine":
+        """
+        Carga un motor guardado con save(); con mmap_mode="r" los arrays se leen
+        con memory-map (sin copiarlos y compartidos entre procesos por la caché de
+        páginas del sistema operativo).
+        """
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name.lstrip('_')}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in ENGINE_ARRAYS
+        }
+        return cls.from_arrays(arrays, n_neighbors, feature_names)
+
+    @classmethod
+    def from_sklearn(cls, imputer) -> "KNNImputationEngine":
+        """
+        Construye el motor a partir de un KNNImputer ya ajustado.
+
+        Args:
+            imputer: sklearn.impute.KNNImputer ajustado
+
+        Returns:
+            Motor equivalente
+
+        Raises:
+            ValueError: Si el imputer usa una configuración no soportada
+        """
+        if imputer.metric != "nan_euclidean" or imputer.weights != "uniform":
+            raise ValueError("Solo se soporta KNNImputer con metric='nan_euclidean' y weights='uniform'")
+        if imputer.add_indicator or imputer.keep_empty_features:
+            raise ValueError("No se soporta add_indicator ni keep_empty_features")
+        if not (isinstance(imputer.missing_values, float) and np.isnan(imputer.missing_values)):
+            raise ValueError("Solo se soporta missing_values=np.nan")
+
+        feature_names = getattr(imputer, "feature_names_in_", None)
+        return cls(imputer._fit_X, imputer.n_neighbors, feature_names, imputer._valid_mask)
+
+    def _distances(self, X: np.ndarray, missing_X: np.ndarray, dense: bool = False) -> np.ndarray:
+        """
+        Distancias nan-euclidean entre las filas de X y la matriz de entrenamiento,
+        con la misma secuencia de operaciones que
+        sklearn.metrics.pairwise.nan_euclidean_distances.
+
+        Por defecto los productos se calculan fila a fila (_row_products), como
+        KNNImputer.transform con cada fila sola, así que el resultado de una fila no
+        depende del resto del bloque. Con dense=True se usan los productos de todo el
+        bloque, como sklearn sobre ese mismo bloque.
+        """
+        product = np.dot if dense else _row_products
+        X = np.where(missing_X, 0.0, X)
+        X_squared = X * X
+
+        # euclidean_distances(X, fit_X, squared=True)
+        distances = product(X, self._fit_zeroed.T)
+        distances *= -2
+        distances += np.einsum("ij,ij->i", X, X)[:, None]
+        distances += self._fit_norms
+        np.maximum(distances, 0, out=distances)
+
+        # Corrección por las coordenadas faltantes de cada lado. En bloques grandes
+        # cada producto se calcula justo antes de usarlo, para no tener vivas a la
+        # vez varias matrices del tamaño de las distancias.
+        distances -= product(X_squared, self._fit_missing.T)
+        distances -= product(missing_X, self._fit_squared.T)
+        np.clip(distances, 0, None, out=distances)
+
+        # Coordenadas presentes en ambos lados, dot(1 - faltantes_X, presentes_fit.T):
+        # son sumas de enteros, exactas en cualquier orden, así que se restan solo
+        # las columnas que faltan en alguna fila del bloque
+        cols = np.flatnonzero(missing_X.any(axis=0))
+        present_count = self._fit_present_total - np.dot(missing_X[:, cols], self._fit_present.T[cols])
+        distances[present_count == 0] = np.nan
+        np.maximum(1, present_count, out=present_count)
+        distances /= present_count
+        distances *= self.n_features
+        np.sqrt(distances, out=distances)
+        return distances
+
+    def _select_neighbors(self, distances: np.ndarray, receivers: np.ndarray, donors_idx: np.ndarray):
+        """
+        Vecinos de los receptores entre los donantes de una columna, igual que
+        KNNImputer._calc_impute (argpartition sobre las distancias a los donantes).
+
+        Returns:
+            (receptores sin ninguna distancia definida, que se imputan con la media;
+             receptores restantes; índices de sus vecinos en donors_idx, o None si
+             no queda ninguno; pesos de cada vecino)
+        """
+        if len(receivers) == len(distances):
+            dist_subset = distances
+        else:
+            dist_subset = distances[receivers]
+        if len(donors_idx) != distances.shape[1]:
+            dist_subset = dist_subset.take(donors_idx, axis=1)
+
+        # Receptores sin ninguna distancia definida se imputan con la media
+        all_nan = np.isnan(dist_subset).all(axis=1)
+        with_mean = receivers[all_nan]
+        if all_nan.any():
+            if all_nan.all():
+                return with_mean, receivers[:0], None, None
+            receivers = receivers[~all_nan]
+            dist_subset = dist_subset[~all_nan]
+
+        n_neighbors = min(self.n_neighbors, len(donors_idx))
+        neighbors = np.argpartition(dist_subset, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        neighbors_dist = dist_subset[np.arange(neighbors.shape[0])[:, None], neighbors]
+
+        weights = np.ones_like(neighbors_dist)
+        weights[np.isnan(neighbors_dist)] = 0.0
+        return with_mean, receivers, neighbors, weights
+
+    def _impute_block(self, X: np.ndarray, rows: np.ndarray, mask: np.ndarray, dense: bool = False) -> None:
+        """Imputa en sitio las filas `rows` de X (todas tienen algún faltante)."""
+        block_mask = mask[rows]
+        distances = self._distances(X[rows], block_mask.astype(np.float64), dense)
+
+        # Las columnas con los mismos donantes y los mismos receptores reciben los
+        # mismos vecinos (mismas distancias, mismo argpartition)
+        selected = {}
+        for col in np.flatnonzero(block_mask.any(axis=0) & self.valid_mask):
+            receivers = np.flatnonzero(block_mask[:, col])
+            key = (self._donor_group[col], receivers.tobytes())
+            if key not in selected:
+                selected[key] = self._select_neighbors(distances, receivers, self._donors_idx[col])
+            with_mean, receivers, neighbors, weights = selected[key]
+
+            X[rows[with_mean], col] = self._col_means[col]
+            if neighbors is not None:
+                donors = self._donor_values[col].take(neighbors)
+                X[rows[receivers], col] = (donors * weights).sum(axis=1) / weights.sum(axis=1)
+
+    def transform(self, X) -> np.ndarray:
+        """
+        Imputa todos los valores faltantes (NaN) de X.
+
+        Args:
+            X: Matriz (n_filas, n_features) con las columnas en el orden de entrenamiento
+
+        Returns:
+            Nueva matriz float64 imputada (sin las columnas vacías en entrenamiento)
+        """
+        X = np.array(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Se esperaban {self.n_features} columnas, se recibió una matriz con forma {X.shape}"
+            )
+
+        mask = np.isnan(X)
+        row_missing_idx = np.flatnonzero(mask[:, self.valid_mask].any(axis=1))
+
+        for start in range(0, len(row_missing_idx), BLOCK_ROWS):
+            self._impute_block(X, row_missing_idx[start:start + BLOCK_ROWS], mask)
+
+        if self.valid_mask.all():
+            return X
+        return X[:, self.valid_mask]
+
+
+def _row_products(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """
+    Producto de cada fila de A por B con np.matmul sobre las filas apiladas
+    (n_filas, 1, k): un producto vector-matriz por fila, igual a np.dot(A[i:i + 1], B).
+    """
+    return np.matmul(A[:, None, :], B)[:, 0, :]
+
+
+def max_abs_difference(imputer, engine: KNNImputationEngine, X) -> float:
+    """
+    Compara la salida del motor con la del KNNImputer original sobre X.
+
+    Args:
+        imputer: KNNImputer ajustado de referencia
+        engine: Motor a comprobar
+        X: Datos de prueba (con faltantes)
+
+    Returns:
+        Máxima diferencia absoluta entre ambas salidas (0.0 si son idénticas)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    expected = imputer.transform(X)
+    actual = engine.transform(X)
+    return float(np.max(np.abs(expected - actual))) if expected.size else 0.0
+
+
+def working_memory_rows(n_train: int, n_rows: int, working_memory: Optional[float] = None) -> int:
+    """
+    Filas por bloque con las que sklearn trocea las distancias de KNNImputer.transform
+    (sklearn.utils._chunking.get_chunk_n_rows): las que caben en `working_memory` MiB
+    con una fila de distancias de 8 * n_train bytes.
+
+    Args:
+        n_train: Filas de la matriz de entrenamiento
+        n_rows: Filas a imputar (máximo del resultado)
+        working_memory: MiB por bloque (None = sklearn.get_config()["working_memory"])
+    """
+    if working_memory is None:
+        try:
+            from sklearn import get_config
+            working_memory = get_config()["working_memory"]
+        except ImportError:
+            working_memory = DEFAULT_WORKING_MEMORY
+    chunk_rows = int(working_memory * (2 ** 20) // (8 * max(n_train, 1)))
+    return max(1, min(chunk_rows, n_rows))
+
+
+# Estado que heredan los workers de parallel_transform (fork)
+_shared: Dict[str, object] = {}
+
+
+def _init_worker() -> None:
+    """Un hilo de BLAS por worker para que los procesos no compitan entre sí."""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _impute_rows(rows: np.ndarray) -> np.ndarray:
+    """Imputa (en un worker) las filas `rows` de la matriz compartida y las devuelve."""
+    engine, X, mask = _shared["engine"], _shared["X"], _shared["mask"]
+    block = X[rows]
+    engine._impute_block(block, np.arange(len(rows)), mask[rows], dense=True)
+    return block
+
+
+def parallel_transform(
+    engine: KNNImputationEngine,
+    X,
+    workers: Optional[int] = None,
+    working_memory: Optional[float] = None
+) -> np.ndarray:
+    """
+    Igual que KNNImputer.transform(X) con el mismo working_memory, con los bloques
+    de filas repartidos entre varios procesos. Cada bloque se imputa igual en
+    cualquier proceso, así que el resultado no depende del número de workers. Los
+    bloques usan siempre los productos matriciales completos (también el último,
+    aunque tenga pocas filas), igual que sklearn.
+
+    La memoria de cada worker la acota working_memory (la matriz de distancias del
+    bloque ocupa como mucho eso, más unas pocas matrices auxiliares del mismo
+    tamaño). Con el valor por defecto de sklearn (1024 MiB) los catálogos de hasta
+    ~130.000 filas de entrenamiento caben en un solo bloque; un working_memory menor
+    da más bloques que repartir y menos memoria por worker, y el resultado es el
+    de KNNImputer bajo sklearn.config_context(working_memory=...).
+
+    Args:
+        engine: Motor de imputación (los workers lo heredan por fork)
+        X: Matriz (n_filas, n_features) con las columnas en el orden de entrenamiento
+        workers: Procesos (None = uno por CPU; 1 = en el proceso actual)
+        working_memory: MiB por bloque (None = el working_memory configurado en sklearn)
+
+    Returns:
+        Nueva matriz float64 imputada (sin las columnas vacías en entrenamiento)
+    """
+    X = np.array(X, dtype=np.float64)
+    if X.ndim != 2 or X.shape[1] != engine.n_features:
+        raise ValueError(
+            f"Se esperaban {engine.n_features} columnas, se recibió una matriz con forma {X.shape}"
+        )
+
+    mask = np.isnan(X)
+    row_missing_idx = np.flatnonzero(mask[:, engine.valid_mask].any(axis=1))
+    workers = max(1, workers or os.cpu_count() or 1)
+    block_rows = working_memory_rows(engine.fit_X.shape[0], len(row_missing_idx), working_memory)
+    blocks = [row_missing_idx[start:start + block_rows] for start in range(0, len(row_missing_idx), block_rows)]
+
+    if workers == 1 or len(blocks) <= 1:
+        for rows in blocks:
+            engine._impute_block(X, rows, mask, dense=True)
+    else:
+        _shared.update(engine=engine, X=X, mask=mask)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(blocks)),
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker
+            ) as pool:
+                for rows, block in zip(blocks, pool.map(_impute_rows, blocks)):
+                    X[rows] = block
+        finally:
+            _shared.clear()
+
+    if engine.valid_mask.all():
+        return X
+    return X[:, engine.valid_mask]
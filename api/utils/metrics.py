@@ -0,0 +1,258 @@
+# api/utils/metrics.py
+
+"""
+Métricas de latencia del pipeline de predicción, en el formato de texto de
+Prometheus (GET /metrics).
+
+Etapas (exoplanet_stage_duration_seconds{stage="..."}):
+    parse                 cuerpo de la petición -> registros (JSON/NDJSON) o bloque CSV -> matriz cruda
+    to_matrix             registros -> matriz cruda (records_to_raw_matrix)
+    validate              validación de entrada (VALIDATION_SCHEMA.validate)
+    uncertainty_features  columnas _sigma/_snr/_rel_unc (generar_cols_incertidumbre vectorizado)
+    impute                imputación KNN (IMPUTATION_ENGINE.transform, el IMPUTER.transform de antes)
+    scale                 escalado (el SCALER.transform de antes)
+    specialists           forward de los 4 especialistas en el grafo fusionado (una sola pasada)
+    specialist_<nombre>   forward de un especialista en su propia ruta
+    judge                 regresión logística del juez
+
+Peticiones HTTP (MetricsMiddleware, middleware ASGI puro):
+    exoplanet_http_requests_total{method, route, status}
+    exoplanet_http_request_duration_seconds{route}
+    exoplanet_http_requests_in_flight
+    exoplanet_http_throughput_requests_per_second (últimos THROUGHPUT_WINDOW_SECONDS)
+
+Registrar una etapa cuesta un perf_counter, un bisect sobre los límites fijos de
+los buckets y dos sumas, sin locks: como los demás contadores del API (validation,
+batching) se confía en el GIL. Los buckets acumulados y el texto solo se calculan
+cuando se pide /metrics. METRICS_ENABLED=0 desactiva el registro.
+
+Las métricas son de cada proceso y todas las series llevan la etiqueta
+worker="<pid>": con api/server.py cada scrape lo responde un worker distinto, y la
+etiqueta evita que Prometheus mezcle sus contadores en una sola serie que salta
+(se agregan con sum without (worker) (...)). Con EXECUTOR_KIND="process" las etapas que corren en el pool de procesos no se
+registran (solo las peticiones HTTP).
+
+Uso:
+    started = time.perf_counter()
+    X = IMPUTATION_ENGINE.transform(X)
+    started = observe_stage("impute", started)    # devuelve el instante final
+"""
+
+import bisect
+import os
+import time
+from typing import Dict, List, Sequence, Tuple
+
+from api.config import METRICS_ENABLED
+
+SPECIALISTS = ['fotometria', 'orbital', 'estelar', 'falsos_positivos']
+
+STAGES = (
+    ["parse", "to_matrix", "validate", "uncertainty_features", "impute", "scale", "specialists"] +
+    [f"specialist_{name}" for name in SPECIALISTS] +
+    ["judge"]
+)
+
+# Límites superiores (segundos) de los buckets de latencia: de 10 µs a 10 s
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Ventana del throughput de peticiones
+THROUGHPUT_WINDOW_SECONDS = 10
+
+# Content-Type del formato de texto de Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Etiqueta de las peticiones que no corresponden a ninguna ruta
+UNMATCHED_ROUTE = "other"
+
+
+class Histogram:
+    """
+    Histograma de buckets fijos. observe() solo incrementa un contador y una suma;
+    los buckets acumulados (le) se calculan al publicar.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str) -> List[str]:
+        """Líneas _bucket/_sum/_count de Prometheus (labels: 'a="x",b="y"')."""
+        prefix = f"{labels}," if labels else ""
+        counts = list(self.counts)
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum!r}")
+        lines.append(f"{name}_count{suffix} {cumulative}")
+        return lines
+
+
+# Histograma de cada etapa (los de etapas desconocidas se crean al primer uso)
+_stages: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+
+
+def reset_stages() -> None:
+    """Vacía los histogramas de las etapas (p. ej. tras el calentamiento)."""
+    for histogram in list(_stages.values()):
+        histogram.counts = [0] * len(histogram.counts)
+        histogram.sum = 0.0
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Registra una duración ya medida de una etapa."""
+    if METRICS_ENABLED:
+        histogram = _stages.get(stage)
+        if histogram is None:
+            histogram = _stages.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+
+
+def observe_stage(stage: str, started: float) -> float:
+    """
+    Registra la duración de una etapa que empezó en `started` (time.perf_counter()).
+
+    Returns:
+        El instante final, para encadenar la etapa siguiente sin otra medición
+    """
+    now = time.perf_counter()
+    if METRICS_ENABLED:
+        histogram = _stages.get(stage)
+        if histogram is None:
+            histogram = _stages.setdefault(stage, Histogram())
+        histogram.observe(now - started)
+    return now
+
+
+class RequestMetrics:
+    """Peticiones por ruta: contador, duración, en curso y throughput reciente."""
+
+    def __init__(self, window: int = THROUGHPUT_WINDOW_SECONDS):
+        self.window = int(window)
+        self.in_flight = 0
+        self.totals: Dict[Tuple[str, str, int], int] = {}
+        self.durations: Dict[str, Histogram] = {}
+        # Peticiones terminadas en cada segundo de la ventana (anillo)
+        self._second = [0] * self.window
+        self._completed = [0] * self.window
+
+    def record(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, status)
+        self.totals[key] = self.totals.get(key, 0) + 1
+        histogram = self.durations.get(route)
+        if histogram is None:
+            histogram = self.durations.setdefault(route, Histogram())
+        histogram.observe(seconds)
+
+        second = int(time.monotonic())
+        slot = second % self.window
+        if self._second[slot] != second:
+            self._second[slot] = second
+            self._completed[slot] = 0
+        self._completed[slot] += 1
+
+    def throughput(self) -> float:
+        """Peticiones por segundo terminadas en los últimos `window` segundos completos."""
+        now = int(time.monotonic())
+        completed = sum(
+            count for second, count in zip(self._second, self._completed)
+            if now - self.window <= second < now
+        )
+        return completed / self.window
+
+
+REQUESTS = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware, que envuelve cada respuesta en
+    otra tarea): mide cada petición HTTP hasta enviar el último byte de la
+    respuesta. La ruta se etiqueta con su plantilla (p. ej. /catalog/{kepoi_name})
+    para que el número de series no crezca con los valores de la URL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS.in_flight -= 1
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            REQUESTS.record(scope["method"], route, status, time.perf_counter() - started)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)."""
+    # pid del proceso que responde (se lee aquí porque los workers se crean con fork)
+    worker = f'worker="{os.getpid()}"'
+    lines = [
+        "# HELP exoplanet_stage_duration_seconds Duración de cada etapa del pipeline de predicción.",
+        "# TYPE exoplanet_stage_duration_seconds histogram"
+    ]
+    for stage, histogram in list(_stages.items()):
+        lines += histogram.render("exoplanet_stage_duration_seconds", f'{worker},stage="{_escape(stage)}"')
+
+    lines += [
+        "# HELP exoplanet_http_requests_total Peticiones HTTP atendidas.",
+        "# TYPE exoplanet_http_requests_total counter"
+    ]
+    for (method, route, status), count in sorted(REQUESTS.totals.items()):
+        lines.append(
+            f'exoplanet_http_requests_total{{{worker},method="{_escape(method)}",route="{_escape(route)}",'
+            f'status="{status}"}} {count}'
+        )
+
+    lines += [
+        "# HELP exoplanet_http_request_duration_seconds Duración de las peticiones HTTP, hasta el último byte.",
+        "# TYPE exoplanet_http_request_duration_seconds histogram"
+    ]
+    for route, histogram in sorted(REQUESTS.durations.items()):
+        lines += histogram.render("exoplanet_http_request_duration_seconds", f'{worker},route="{_escape(route)}"')
+
+    lines += [
+        "# HELP exoplanet_http_requests_in_flight Peticiones HTTP en curso.",
+        "# TYPE exoplanet_http_requests_in_flight gauge",
+        f"exoplanet_http_requests_in_flight{{{worker}}} {REQUESTS.in_flight}",
+        f"# HELP exoplanet_http_throughput_requests_per_second Peticiones terminadas por segundo "
+        f"(media de los últimos {REQUESTS.window} s).",
+        "# TYPE exoplanet_http_throughput_requests_per_second gauge",
+        f"exoplanet_http_throughput_requests_per_second{{{worker}}} {REQUESTS.throughput()!r}"
+    ]
+    return "\n".join(lines) + "\n"
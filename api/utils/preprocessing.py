@@ -2,17 +2,88 @@
 
 import pandas as pd
 import numpy as np
-import joblib
+import logging
 import os
-from typing import Dict, Any, Tuple
+import time
+from typing import Dict, Any, List, Tuple, Union
+
+from api.config import PREPROCESSING_FORMAT
+from . import metrics, preprocessing_artifacts
+from .validation import VALIDATION_SCHEMA, ValidationError, mark_validated
 
 # Configuración de rutas
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 PROCESSED_PATH = os.path.join(BASE_DIR, "data", "processed")
 
+
+def load_artifacts() -> preprocessing_artifacts.PreprocessingArtifacts:
+    """
+    Carga el imputer y el scaler según PREPROCESSING_FORMAT.
+
+    Con "mmap" se lee el paquete de arrays (sin importar scikit-learn); si falta o no
+    corresponde a los .gz actuales se regenera primero. Si el paquete no se puede
+    usar se cae a los .gz.
+    """
+    if PREPROCESSING_FORMAT == "mmap":
+        try:
+            sources = preprocessing_artifacts.source_hashes()
+            if not preprocessing_artifacts.bundle_is_fresh(sources=sources):
+                logging.info("Generando el paquete memory-map de los artefactos de preprocesamiento")
+                imputer, scaler = preprocessing_artifacts.load_sklearn_artifacts()
+                preprocessing_artifacts.save_bundle(imputer, scaler, sources=sources)
+            return preprocessing_artifacts.load_bundle()
+        except Exception as e:
+            logging.warning(f"No se pudo usar el paquete memory-map, se cargan los .gz: {str(e)}")
+
+    imputer, scaler = preprocessing_artifacts.load_sklearn_artifacts()
+    return preprocessing_artifacts.from_sklearn(imputer, scaler)
+
+
 # Cargar artefactos de preprocesamiento
-IMPUTER = joblib.load(os.path.join(PROCESSED_PATH, "imputer.gz"))
-SCALER = joblib.load(os.path.join(PROCESSED_PATH, "scaler.gz"))
+ARTIFACTS = load_artifacts()
+
+# Motor de imputación con los términos de entrenamiento precalculados (mismos valores que el KNNImputer)
+IMPUTATION_ENGINE = ARTIFACTS.engine
+
+# Parámetros del escalado (StandardScaler.transform: (X - mean_) / scale_)
+SCALER_MEAN = ARTIFACTS.scaler_mean
+SCALER_SCALE = ARTIFACTS.scaler_scale
+
+# --- Mapas de columnas precalculados para el preprocesamiento vectorizado ---
+# Columnas de la matriz preprocesada, en el orden de entrenamiento
+TRAIN_COLUMNS = list(ARTIFACTS.feature_names)
+_TRAIN_INDEX = {col: i for i, col in enumerate(TRAIN_COLUMNS)}
+
+# Columnas con incertidumbre (las que tienen _sigma/_snr/_rel_unc en entrenamiento)
+UNCERTAINTY_COLUMNS = [col[:-len("_sigma")] for col in TRAIN_COLUMNS if col.endswith("_sigma")]
+_DERIVED_COLUMNS = {
+    f"{col}{suffix}" for col in UNCERTAINTY_COLUMNS for suffix in ("_sigma", "_snr", "_rel_unc")
+}
+
+# Columnas crudas de entrada: las de entrenamiento que no son derivadas, seguidas de
+# los errores (_err1, _err2) de cada columna con incertidumbre. Es el orden de las
+# columnas cuando preprocess_matrix recibe un array 2-D.
+RAW_COLUMNS = (
+    [col for col in TRAIN_COLUMNS if col not in _DERIVED_COLUMNS] +
+    [f"{col}_err{i}" for col in UNCERTAINTY_COLUMNS for i in (1, 2)]
+)
+_RAW_INDEX = {col: i for i, col in enumerate(RAW_COLUMNS)}
+
+# Copia directa crudo -> entrenamiento
+_PASSTHROUGH_SRC = np.array([_RAW_INDEX[col] for col in TRAIN_COLUMNS if col not in _DERIVED_COLUMNS])
+_PASSTHROUGH_DST = np.array([_TRAIN_INDEX[col] for col in TRAIN_COLUMNS if col not in _DERIVED_COLUMNS])
+
+# Entradas y salidas de las características de incertidumbre
+_UNCERTAINTY_BASE_SRC = np.array([_RAW_INDEX[col] for col in UNCERTAINTY_COLUMNS])
+_UNCERTAINTY_ERR1_SRC = np.array([_RAW_INDEX[f"{col}_err1"] for col in UNCERTAINTY_COLUMNS])
+_UNCERTAINTY_ERR2_SRC = np.array([_RAW_INDEX[f"{col}_err2"] for col in UNCERTAINTY_COLUMNS])
+_SIGMA_DST = np.array([_TRAIN_INDEX[f"{col}_sigma"] for col in UNCERTAINTY_COLUMNS])
+_SNR_DST = np.array([_TRAIN_INDEX[f"{col}_snr"] for col in UNCERTAINTY_COLUMNS])
+_REL_UNC_DST = np.array([_TRAIN_INDEX[f"{col}_rel_unc"] for col in UNCERTAINTY_COLUMNS])
+_ERROR_PAIRS = [(f"{col}_err1", f"{col}_err2") for col in UNCERTAINTY_COLUMNS]
+
+# Mismo epsilon que generar_cols_incertidumbre
+UNCERTAINTY_EPSILON = 1e-8
 
 # Intentar cargar columnas esperadas desde X_train.csv para validaciones más claras
 EXPECTED_COLUMNS = None
@@ -56,68 +127,126 @@ def generar_cols_incertidumbre(df: pd.DataFrame, cols: list) -> pd.DataFrame:
     return df
 
 
-def preprocess_input(data: Dict[str, Any]) -> pd.DataFrame:
+def records_to_raw_matrix(records: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Preprocesa los datos de entrada para predicción.
-    Garantiza la generación de todas las características necesarias para cada modelo.
+    Convierte una lista de registros a la matriz cruda (columnas en el orden de RAW_COLUMNS).
+    
+    Una clave ausente vale 0 (igual que una columna faltante en preprocess_input);
+    None o NaN se mantienen como NaN y se imputan.
     
     Args:
-        data: Diccionario con los datos de entrada
+        records: Lista de diccionarios con los datos de entrada
         
     Returns:
-        DataFrame preprocesado listo para predicción
+        (matriz float64 (n_filas, len(RAW_COLUMNS)),
+         máscara (n_filas, len(UNCERTAINTY_COLUMNS)) de filas que traen err1 y err2)
+        
+    Raises:
+        ValueError: Si algún valor no es numérico
     """
-    # Convertir el diccionario a DataFrame
-    df = pd.DataFrame([data])
-    
-    # Solo mantener columnas que están en los datos de entrenamiento
-    df = df[df.columns.intersection(IMPUTER.feature_names_in_)]
-    
-    # Obtener todas las características que requieren incertidumbre
-    from .feature_groups import UNCERTAINTY_FEATURES
+    raw = np.array(
+        [[row[col] if col in row else 0.0 for col in RAW_COLUMNS] for row in records],
+        dtype=np.float64
+    ).reshape(len(records), len(RAW_COLUMNS))
+    errors_present = np.array(
+        [[err1 in row and err2 in row for err1, err2 in _ERROR_PAIRS] for row in records],
+        dtype=bool
+    ).reshape(len(records), len(_ERROR_PAIRS))
+    return raw, errors_present
+
+
+def build_feature_matrix(raw: np.ndarray, errors_present: np.ndarray = None) -> np.ndarray:
+    """
+    Arma la matriz de características de entrenamiento (sin imputar ni escalar)
+    calculando _sigma/_snr/_rel_unc de todas las columnas en una sola pasada.
     
-    # Combinar todas las columnas que necesitan procesamiento de incertidumbre
-    cols_con_incertidumbre = list(set(
-        UNCERTAINTY_FEATURES['fotometria'] +
-        UNCERTAINTY_FEATURES['orbital'] +
-        UNCERTAINTY_FEATURES['estelar']
-    ))
+    Args:
+        raw: Matriz cruda (n_filas, len(RAW_COLUMNS))
+        errors_present: Filas que traen err1 y err2 de cada columna con incertidumbre;
+            donde faltan, las derivadas valen 0 (por defecto se asume que están)
+        
+    Returns:
+        Matriz float64 (n_filas, len(TRAIN_COLUMNS))
+    """
+    X = np.empty((raw.shape[0], len(TRAIN_COLUMNS)), dtype=np.float64)
+    X[:, _PASSTHROUGH_DST] = raw[:, _PASSTHROUGH_SRC]
     
-    # Generar columnas de incertidumbre
-    df = generar_cols_incertidumbre(df, cols_con_incertidumbre)
+    base = raw[:, _UNCERTAINTY_BASE_SRC]
+    # max(|err1|, |err2|) ignorando NaN, como DataFrame.abs().max(axis=1)
+    sigma = np.fmax(np.abs(raw[:, _UNCERTAINTY_ERR1_SRC]), np.abs(raw[:, _UNCERTAINTY_ERR2_SRC]))
+    snr = base / (sigma + UNCERTAINTY_EPSILON)
+    rel_unc = sigma / (np.abs(base) + UNCERTAINTY_EPSILON)
     
-    # Eliminar koi_ror y sus errores si existen (no se usan en entrenamiento)
-    cols_to_drop = ['koi_ror', 'koi_ror_err1', 'koi_ror_err2']
-    df = df.drop(columns=cols_to_drop, errors='ignore')
+    if errors_present is not None and not errors_present.all():
+        sigma[~errors_present] = 0.0
+        snr[~errors_present] = 0.0
+        rel_unc[~errors_present] = 0.0
     
-    # Reordenar columnas para que coincidan con el orden del transformador
-    train_columns = list(IMPUTER.feature_names_in_)
-    available_columns = [col for col in train_columns if col in df.columns]
-    df = df[available_columns]
+    X[:, _SIGMA_DST] = sigma
+    X[:, _SNR_DST] = snr
+    X[:, _REL_UNC_DST] = rel_unc
+    return X
+
+
+def preprocess_matrix(data: Union[Dict[str, Any], List[Dict[str, Any]], np.ndarray]) -> np.ndarray:
+    """
+    Preprocesa los datos de entrada sin pasar por DataFrames: características de
+    incertidumbre, imputación KNN y escalado sobre una sola matriz.
     
-    # Rellenar columnas faltantes con 0
-    missing_columns = set(train_columns) - set(available_columns)
-    for col in missing_columns:
-        df[col] = 0
+    Args:
+        data: Diccionario con los datos de un candidato, lista de diccionarios, o
+            array 2-D con las columnas en el orden de RAW_COLUMNS (NaN = faltante)
+        
+    Returns:
+        Matriz float32 contigua (n_filas, len(TRAIN_COLUMNS)) lista para predicción
         
-    # Asegurar el mismo orden que en entrenamiento
-    df = df[train_columns]
+    Raises:
+        ValueError: Si algún valor no es numérico o el array no tiene la forma esperada
+    """
+    started = time.perf_counter()
+    if isinstance(data, np.ndarray):
+        raw = np.asarray(data, dtype=np.float64)
+        if raw.ndim != 2 or raw.shape[1] != len(RAW_COLUMNS):
+            raise ValueError(
+                f"Se esperaba un array (n_filas, {len(RAW_COLUMNS)}) con las columnas de RAW_COLUMNS, "
+                f"se recibió forma {raw.shape}"
+            )
+        errors_present = None
+    else:
+        raw, errors_present = records_to_raw_matrix(data if isinstance(data, list) else [data])
+        started = metrics.observe_stage("to_matrix", started)
+    X = build_feature_matrix(raw, errors_present)
+    started = metrics.observe_stage("uncertainty_features", started)
     
-    # Aplicar imputación
-    df_imputed = pd.DataFrame(
-        IMPUTER.transform(df),
-        columns=df.columns,
-        index=df.index
-    )
+    # Imputación (devuelve una matriz nueva) y escalado en sitio
+    X = IMPUTATION_ENGINE.transform(X)
+    started = metrics.observe_stage("impute", started)
+    if SCALER_MEAN is not None:
+        X -= SCALER_MEAN
+    if SCALER_SCALE is not None:
+        X /= SCALER_SCALE
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    metrics.observe_stage("scale", started)
     
-    # Aplicar escalado
-    df_scaled = pd.DataFrame(
-        SCALER.transform(df_imputed),
-        columns=df_imputed.columns,
-        index=df_imputed.index
-    )
+    return X
+
+
+def preprocess_input(data: Union[Dict[str, Any], List[Dict[str, Any]]]) -> pd.DataFrame:
+    """
+    Preprocesa los datos de entrada para predicción.
+    Garantiza la generación de todas las características necesarias para cada modelo.
     
-    return df_scaled
+    Args:
+        data: Diccionario con los datos de entrada, o lista de diccionarios
+            para preprocesar varios candidatos en una sola pasada
+        
+    Returns:
+        DataFrame preprocesado listo para predicción (una fila por candidato); si
+        todas las filas son ValidatedRecord queda marcado como validado
+    """
+    frame = pd.DataFrame(preprocess_matrix(data), columns=TRAIN_COLUMNS)
+    mark_validated(frame, data if isinstance(data, list) else [data])
+    return frame
 
 
 def validate_features_for_model(df: pd.DataFrame, model_type: str) -> Tuple[bool, str]:
@@ -146,13 +275,16 @@ def validate_features_for_model(df: pd.DataFrame, model_type: str) -> Tuple[bool
     if missing_features:
         return False, f"Faltan características derivadas requeridas para el modelo {model_type}: {missing_features}"
     
-    logging.info(f"Características encontradas para {model_type}: {[f for f in df.columns if f in required_features]}")
+    logging.debug("Características encontradas para %s: %d", model_type, len(required_features))
     return True, ""
 
 def validate_input(data: Dict[str, Any], model_type: str = None) -> Tuple[bool, str]:
     """
     Valida los datos de entrada básicos y las características necesarias según el modelo.
     
+    Usa las reglas compiladas de VALIDATION_SCHEMA; las rutas validan con
+    validation.validate_payload, que además devuelve el registro validado.
+    
     Args:
         data: Diccionario con los datos de entrada
         model_type: Tipo de modelo para validar características específicas
@@ -165,101 +297,13 @@ def validate_input(data: Dict[str, Any], model_type: str = None) -> Tuple[bool,
     
     if "data" not in data:
         return False, "El campo 'data' es requerido"
-        
-    input_data = data["data"]
-        
-    # Importar los features requeridos
-    from .feature_groups import (
-        BASE_FEATURES,
-        UNCERTAINTY_FEATURES,
-        FOTOMETRIA_FEATURES,
-        ORBITAL_FEATURES,
-        ESTELAR_FEATURES,
-        FALSOS_POSITIVOS_FEATURES
-    )
     
     # Si no se especifica modelo, solo validar estructura básica
     if not model_type:
         return True, ""
-
-    # Obtener los features base requeridos para este modelo
-    model_base_features = BASE_FEATURES.get(model_type, [])
-    model_uncertainty_features = UNCERTAINTY_FEATURES.get(model_type, [])
-    
-    # 1. Validar features base del modelo específico
-    missing_base = []
-    invalid_type = []
-    
-    for feature in model_base_features:
-        if feature not in input_data:
-            missing_base.append(feature)
-        elif not isinstance(input_data[feature], (int, float)):
-            invalid_type.append(feature)
-    
-    if missing_base:
-        return False, f"Faltan features base requeridos por {model_type}: {missing_base}"
-    if invalid_type:
-        return False, f"Features con tipo inválido para {model_type} (deben ser numéricos): {invalid_type}"
-    
-    # 2. Validar incertidumbres requeridas por este modelo
-    missing_uncertainties = []
-    invalid_uncertainties = []
-    
-    for feature in model_uncertainty_features:
-        err1_key = f"{feature}_err1"
-        err2_key = f"{feature}_err2"
-        
-        # Verificar presencia
-        if err1_key not in input_data or err2_key not in input_data:
-            missing_uncertainties.append(f"{feature} (err1 y err2)")
-            continue
-        
-        # Verificar tipos
-        if not isinstance(input_data[err1_key], (int, float)) or not isinstance(input_data[err2_key], (int, float)):
-            invalid_uncertainties.append(f"{feature} (valores no numéricos)")
-            continue
-        
-        # Verificar signos
-        if input_data[err1_key] < 0:
-            invalid_uncertainties.append(f"{feature} (err1 debe ser positivo)")
-        if input_data[err2_key] > 0:
-            invalid_uncertainties.append(f"{feature} (err2 debe ser negativo)")
-    
-    if missing_uncertainties:
-        return False, f"Faltan incertidumbres requeridas por {model_type}: {missing_uncertainties}"
-    if invalid_uncertainties:
-        return False, f"Incertidumbres inválidas para {model_type}: {invalid_uncertainties}"
-    
-    # 3. Validar features específicos del modelo
-    if model_type == "ensemble" or model_type == "judge":
-        # Para ensemble y judge necesitamos validar los features de todos los modelos
-        for model_name, features in {
-            'fotometria': FOTOMETRIA_FEATURES,
-            'orbital': ORBITAL_FEATURES,
-            'estelar': ESTELAR_FEATURES,
-            'falsos_positivos': FALSOS_POSITIVOS_FEATURES
-        }.items():
-            missing_required = []
-            for feature in features:
-                if not feature.endswith(('_sigma', '_snr', '_rel_unc')) and feature not in input_data:
-                    missing_required.append(feature)
-            if missing_required:
-                return False, f"Features de {model_name} requeridos por {model_type}: {missing_required}"
-    else:
-        # Para modelos individuales, solo validar sus propios features
-        required_features = {
-            'fotometria': FOTOMETRIA_FEATURES,
-            'orbital': ORBITAL_FEATURES,
-            'estelar': ESTELAR_FEATURES,
-            'falsos_positivos': FALSOS_POSITIVOS_FEATURES
-        }.get(model_type, [])
-        
-        missing_required = []
-        for feature in required_features:
-            if not feature.endswith(('_sigma', '_snr', '_rel_unc')) and feature not in input_data:
-                missing_required.append(feature)
-        
-        if missing_required:
-            return False, f"Features requeridos por {model_type}: {missing_required}"
     
-    return True, ""  # Todo está válido
+    try:
+        VALIDATION_SCHEMA.validate(data["data"], model_type)
+    except ValidationError as e:
+        return False, e.message
+    return True, ""
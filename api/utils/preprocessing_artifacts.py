@@ -0,0 +1,205 @@
+# api/utils/preprocessing_artifacts.py
+
+"""
+Artefactos de preprocesamiento (imputer KNN + scaler) en formato memory-map.
+
+imputer.gz y scaler.gz son pickles de joblib comprimidos: cargarlos importa
+scikit-learn, descomprime y deserializa todo en cada proceso, y después el motor de
+imputación recalcula sus términos de entrenamiento (~25 MB por worker). El paquete
+guarda ese estado ya calculado como arrays .npy sin comprimir que se abren con
+np.load(mmap_mode="r"): cargar es solo abrir archivos y las páginas se comparten
+entre todos los procesos que leen el mismo paquete.
+
+Estructura del paquete (data/processed/preprocessing/):
+
+    manifest.json       versión, columnas, n_neighbors y huella de imputer.gz/scaler.gz
+    scaler_mean.npy     StandardScaler.mean_ (si with_mean)
+    scaler_scale.npy    StandardScaler.scale_ (si with_std)
+    <array>.npy         estado de KNNImputationEngine (imputation.ENGINE_ARRAYS)
+
+Los .gz siguen siendo la fuente: el paquete se regenera con
+scripts/convert_preprocessing_artifacts.py (o automáticamente al importar
+preprocessing si falta o quedó desactualizado).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .imputation import KNNImputationEngine
+
+# Configuración de rutas
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROCESSED_PATH = os.path.join(BASE_DIR, "data", "processed")
+IMPUTER_PATH = os.path.join(PROCESSED_PATH, "imputer.gz")
+SCALER_PATH = os.path.join(PROCESSED_PATH, "scaler.gz")
+BUNDLE_PATH = os.path.join(PROCESSED_PATH, "preprocessing")
+MANIFEST_FILENAME = "manifest.json"
+
+# Versión del formato del paquete (cambiarla invalida los paquetes existentes).
+# 2: los arrays conservan el orden en memoria (Fortran) de la matriz del imputer
+# 3: fit_present_total en lugar de los arrays por columna del cálculo fila a fila
+BUNDLE_FORMAT_VERSION = 3
+
+
+class PreprocessingArtifacts:
+    """Parámetros de imputación y escalado que usa el preprocesamiento."""
+
+    def __init__(
+        self,
+        engine: KNNImputationEngine,
+        feature_names: List[str],
+        scaler_mean: Optional[np.ndarray],
+        scaler_scale: Optional[np.ndarray],
+        source: str
+    ):
+        """
+        Args:
+            engine: Motor de imputación KNN
+            feature_names: Columnas de entrenamiento, en orden
+            scaler_mean: Media del StandardScaler (None si with_mean=False)
+            scaler_scale: Escala del StandardScaler (None si with_std=False)
+            source: Formato del que se cargó ("mmap" o "joblib")
+        """
+        self.engine = engine
+        self.feature_names = feature_names
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.source = source
+
+
+def file_sha1(path: str) -> str:
+    """SHA-1 del contenido de un archivo."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_hashes(imputer_path: str = IMPUTER_PATH, scaler_path: str = SCALER_PATH) -> Dict[str, str]:
+    """Huella de los artefactos joblib de los que se deriva el paquete."""
+    return {os.path.basename(path): file_sha1(path) for path in (imputer_path, scaler_path)}
+
+
+def load_sklearn_artifacts(imputer_path: str = IMPUTER_PATH, scaler_path: str = SCALER_PATH) -> Tuple:
+    """
+    Carga el KNNImputer y el StandardScaler originales (requiere scikit-learn).
+
+    Returns:
+        (imputer, scaler)
+    """
+    import joblib
+    return joblib.load(imputer_path), joblib.load(scaler_path)
+
+
+def from_sklearn(imputer, scaler) -> PreprocessingArtifacts:
+    """Artefactos en memoria a partir del imputer y el scaler ajustados."""
+    return PreprocessingArtifacts(
+        engine=KNNImputationEngine.from_sklearn(imputer),
+        feature_names=list(imputer.feature_names_in_),
+        scaler_mean=scaler.mean_ if scaler.with_mean else None,
+        scaler_scale=scaler.scale_ if scaler.with_std else None,
+        source="joblib"
+    )
+
+
+def save_bundle(
+    imputer,
+    scaler,
+    bundle_path: str = BUNDLE_PATH,
+    sources: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    Escribe el paquete memory-map a partir del imputer y el scaler ajustados.
+
+    Se escribe en un directorio temporal que luego reemplaza al anterior, así que
+    otro proceso nunca lee un paquete a medio escribir.
+
+    Args:
+        imputer: sklearn.impute.KNNImputer ajustado
+        scaler: sklearn.preprocessing.StandardScaler ajustado
+        bundle_path: Directorio del paquete
+        sources: Huella de los .gz de origen (por defecto, la de los archivos actuales)
+
+    Returns:
+        Ruta del paquete
+    """
+    artifacts = from_sklearn(imputer, scaler)
+    if list(scaler.feature_names_in_) != artifacts.feature_names:
+        raise ValueError("El imputer y el scaler no tienen las mismas columnas")
+
+    tmp_path = f"{bundle_path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    artifacts.engine.save(tmp_path)
+    if artifacts.scaler_mean is not None:
+        np.save(os.path.join(tmp_path, "scaler_mean.npy"), np.asarray(artifacts.scaler_mean, dtype=np.float64))
+    if artifacts.scaler_scale is not None:
+        np.save(os.path.join(tmp_path, "scaler_scale.npy"), np.asarray(artifacts.scaler_scale, dtype=np.float64))
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "feature_names": artifacts.feature_names,
+        "n_neighbors": artifacts.engine.n_neighbors,
+        "scaler_with_mean": artifacts.scaler_mean is not None,
+        "scaler_with_std": artifacts.scaler_scale is not None,
+        "sources": sources if sources is not None else source_hashes()
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILENAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Publicar: los lectores que ya tienen abiertos los arrays anteriores no se ven afectados
+    old_path = f"{bundle_path}.{os.getpid()}.old"
+    if os.path.exists(bundle_path):
+        os.rename(bundle_path, old_path)
+    os.rename(tmp_path, bundle_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return bundle_path
+
+
+def read_manifest(bundle_path: str = BUNDLE_PATH) -> Optional[Dict]:
+    """Manifiesto del paquete, o None si no existe."""
+    try:
+        with open(os.path.join(bundle_path, MANIFEST_FILENAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def bundle_is_fresh(bundle_path: str = BUNDLE_PATH, sources: Optional[Dict[str, str]] = None) -> bool:
+    """True si el paquete existe, tiene el formato actual y se generó a partir de los .gz actuales."""
+    manifest = read_manifest(bundle_path)
+    if manifest is None or manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        return False
+    return manifest.get("sources") == (sources if sources is not None else source_hashes())
+
+
+def load_bundle(bundle_path: str = BUNDLE_PATH, mmap_mode: Optional[str] = "r") -> PreprocessingArtifacts:
+    """
+    Carga el paquete con memory-map (no importa scikit-learn).
+
+    Raises:
+        FileNotFoundError: Si el paquete no existe
+        ValueError: Si el paquete tiene otro formato o está incompleto
+    """
+    manifest = read_manifest(bundle_path)
+    if manifest is None:
+        raise FileNotFoundError(f"No existe el paquete de preprocesamiento en {bundle_path}")
+    if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Formato de paquete no soportado: {manifest.get('format_version')}")
+
+    def load_array(name: str) -> np.ndarray:
+        return np.load(os.path.join(bundle_path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+
+    feature_names = manifest["feature_names"]
+    return PreprocessingArtifacts(
+        engine=KNNImputationEngine.load(bundle_path, manifest["n_neighbors"], feature_names, mmap_mode=mmap_mode),
+        feature_names=feature_names,
+        scaler_mean=load_array("scaler_mean") if manifest["scaler_with_mean"] else None,
+        scaler_scale=load_array("scaler_scale") if manifest["scaler_with_std"] else None,
+        source="mmap"
+    )
@@ -0,0 +1,260 @@
+# api/utils/raw_catalogs.py
+
+"""
+Caché columnar de los catálogos crudos del NASA Exoplanet Archive (data/raw/*.csv).
+
+Cada CSV se convierte una sola vez a un directorio con un .npy por columna, ligado
+al SHA-1 del contenido del archivo. Las siguientes lecturas no parsean el CSV: abren
+con memory-map solo las columnas pedidas.
+
+Tipos de cada columna (explícitos, sin pérdida respecto del CSV):
+
+    enteros sin faltantes      int8/int16/int32/int64 (el menor que cubre el rango)
+    números                    float32 si float32 representa exactamente todos los
+                               valores (p. ej. flags 0/1 con faltantes); si no, float64
+    texto                      category (códigos .npy + categorías en el manifiesto)
+
+Los valores que llegan al preprocesamiento son idénticos a los de
+pd.read_csv(comment="#"): float32 solo se usa cuando no cambia ningún valor.
+
+Estructura (data/processed/columnar/<nombre>-<sha1>/):
+
+    manifest.json       origen, SHA-1, filas, columnas con su tipo, descripciones
+                        de las líneas "# COLUMN" y el resto del encabezado del Archive
+    <columna>.npy       valores (o códigos de categoría) de cada columna
+
+Uso:
+    from api.utils.raw_catalogs import load_catalog
+    catalog = load_catalog("kepler", columns=["kepid", "kepoi_name", "koi_period"])
+"""
+
+import json
+import os
+import re
+import shutil
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .preprocessing_artifacts import file_sha1
+
+# Configuración de rutas
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RAW_DATA_PATH = os.path.join(BASE_DIR, "data", "raw")
+CACHE_PATH = os.path.join(BASE_DIR, "data", "processed", "columnar")
+MANIFEST_FILENAME = "manifest.json"
+
+# Versión del formato de la caché (cambiarla invalida las cachés existentes)
+CACHE_FORMAT_VERSION = 1
+
+# Catálogos conocidos: nombre corto -> archivo en data/raw
+CATALOGS = {
+    "kepler": "Kepler.csv",
+    "k2": "K2.csv",
+    "tess": "TESS.csv"
+}
+
+# "# COLUMN koi_period:     Orbital Period [days]"
+COLUMN_COMMENT = re.compile(r"^#\s*COLUMN\s+([^:]+):\s*(.*)$")
+
+INTEGER_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def catalog_path(source: str) -> str:
+    """Ruta del CSV: nombre de CATALOGS ("kepler", "k2", "tess") o ruta a un archivo."""
+    if source.lower() in CATALOGS:
+        return os.path.join(RAW_DATA_PATH, CATALOGS[source.lower()])
+    return os.path.abspath(source)
+
+
+def cache_dir(path: str, sha1: Optional[str] = None, cache_path: str = CACHE_PATH) -> str:
+    """Directorio de la caché de un CSV con un contenido dado."""
+    name = os.path.splitext(os.path.basename(path))[0].lower()
+    return os.path.join(cache_path, f"{name}-{sha1 or file_sha1(path)}")
+
+
+# --------------------------------------------------------------------------
+# 1. CONVERSIÓN
+# --------------------------------------------------------------------------
+def read_archive_header(path: str) -> Dict[str, Any]:
+    """
+    Encabezado de comentarios de un CSV del Archive.
+
+    Returns:
+        {"columns": {columna: descripción}, "comments": resto de líneas '#'}
+    """
+    descriptions, comments = {}, []
+    with open(path, encoding="utf-8-sig") as f:
+        for line in f:
+            if not line.startswith("#"):
+                break
+            line = line.rstrip("\r\n")
+            match = COLUMN_COMMENT.match(line)
+            if match:
+                descriptions[match.group(1).strip()] = match.group(2).strip()
+            else:
+                comments.append(line)
+    return {"columns": descriptions, "comments": comments}
+
+
+def compact_column(series: pd.Series):
+    """
+    Convierte una columna al tipo más compacto que conserva todos sus valores.
+
+    Returns:
+        (array a guardar, descripción del tipo para el manifiesto)
+    """
+    if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        categorical = pd.Categorical(series.astype(object).where(series.notna(), None))
+        categories = [str(value) for value in categorical.categories]
+        return np.asarray(categorical.codes), {"kind": "category", "categories": categories}
+
+    values = series.to_numpy(dtype=np.float64)
+    present = values[~np.isnan(values)]
+    if len(present) == len(values) and np.array_equal(present, np.round(present)):
+        for dtype in INTEGER_DTYPES:
+            info = np.iinfo(dtype)
+            if len(present) == 0 or (present.min() >= info.min and present.max() <= info.max):
+                return values.astype(dtype), {"kind": "numeric", "dtype": np.dtype(dtype).name}
+
+    as_float32 = values.astype(np.float32)
+    if np.array_equal(as_float32.astype(np.float64), values, equal_nan=True):
+        return as_float32, {"kind": "numeric", "dtype": "float32"}
+    return values, {"kind": "numeric", "dtype": "float64"}
+
+
+def build_cache(source: str, cache_path: str = CACHE_PATH) -> str:
+    """
+    Convierte un CSV del Archive a su caché columnar (si no existe ya para su contenido).
+
+    La caché se escribe en un directorio temporal y se publica con un rename, así que
+    nunca se lee a medio escribir; las cachés de versiones anteriores del mismo
+    archivo se borran.
+
+    Args:
+        source: Nombre de CATALOGS o ruta del CSV
+        cache_path: Directorio raíz de las cachés
+
+    Returns:
+        Directorio de la caché
+    """
+    path = catalog_path(source)
+    sha1 = file_sha1(path)
+    target = cache_dir(path, sha1, cache_path)
+    if os.path.exists(os.path.join(target, MANIFEST_FILENAME)):
+        return target
+
+    frame = pd.read_csv(path, comment="#")
+    header = read_archive_header(path)
+
+    tmp = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columns = []
+    for name in frame.columns:
+        values, spec = compact_column(frame[name])
+        filename = f"{name}.npy"
+        np.save(os.path.join(tmp, filename), values)
+        columns.append(dict(spec, name=name, file=filename, description=header["columns"].get(name, "")))
+
+    manifest = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "source": os.path.basename(path),
+        "sha1": sha1,
+        "rows": len(frame),
+        "columns": columns,
+        "comments": header["comments"]
+    }
+    with open(os.path.join(tmp, MANIFEST_FILENAME), "w") as f:
+        json.dump(manifest, f)
+
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Otro proceso publicó la misma caché primero
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    prefix = os.path.basename(target).rsplit("-", 1)[0] + "-"
+    for name in os.listdir(cache_path):
+        old = os.path.join(cache_path, name)
+        if name.startswith(prefix) and old != target and not name.endswith(".tmp") and os.path.isdir(old):
+            shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+# --------------------------------------------------------------------------
+# 2. LECTURA
+# --------------------------------------------------------------------------
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILENAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format_version") != CACHE_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def catalog_manifest(source: str, cache_path: str = CACHE_PATH) -> Dict[str, Any]:
+    """Manifiesto de la caché vigente de un catálogo (la construye si falta o quedó desactualizada)."""
+    directory = cache_dir(catalog_path(source), cache_path=cache_path)
+    manifest = read_manifest(directory)
+    if manifest is None:
+        if os.path.isdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+        directory = build_cache(source, cache_path)
+        manifest = read_manifest(directory)
+    manifest["directory"] = directory
+    return manifest
+
+
+def load_catalog(
+    source: str = "kepler",
+    columns: Optional[List[str]] = None,
+    cache_path: str = CACHE_PATH,
+    mmap_mode: Optional[str] = "r",
+    upcast_floats: bool = False
+) -> pd.DataFrame:
+    """
+    Carga un catálogo crudo desde su caché columnar.
+
+    Args:
+        source: Nombre de CATALOGS ("kepler", "k2", "tess") o ruta del CSV
+        columns: Columnas a cargar, en ese orden (None = todas, en el orden del CSV)
+        cache_path: Directorio raíz de las cachés
+        mmap_mode: Modo de np.load para las columnas (None = leerlas a memoria)
+        upcast_floats: Devolver las columnas float32 como float64, para cálculos que
+            deben dar lo mismo que con pd.read_csv (p. ej. las características de
+            incertidumbre)
+
+    Returns:
+        DataFrame con los tipos de la caché (numéricos compactos y category)
+
+    Raises:
+        KeyError: Si alguna columna pedida no existe en el catálogo
+    """
+    manifest = catalog_manifest(source, cache_path)
+    specs = {spec["name"]: spec for spec in manifest["columns"]}
+    names = list(specs) if columns is None else list(columns)
+    missing = [name for name in names if name not in specs]
+    if missing:
+        raise KeyError(f"Columnas inexistentes en {manifest['source']}: {missing}")
+
+    data = {}
+    for name in names:
+        spec = specs[name]
+        values = np.load(os.path.join(manifest["directory"], spec["file"]), mmap_mode=mmap_mode)
+        if spec["kind"] == "category":
+            data[name] = pd.Categorical.from_codes(values, categories=spec["categories"])
+        elif upcast_floats and values.dtype == np.float32:
+            data[name] = values.astype(np.float64)
+        else:
+            data[name] = values
+    return pd.DataFrame(data, columns=names)
+
+
+def column_descriptions(source: str = "kepler", cache_path: str = CACHE_PATH) -> Dict[str, str]:
+    """Descripciones de las columnas (líneas "# COLUMN" del encabezado del Archive)."""
+    return {spec["name"]: spec["description"] for spec in catalog_manifest(source, cache_path)["columns"]}
@@ -0,0 +1,315 @@
+# api/utils/validation.py
+
+"""
+Esquema de validación compilado a partir de feature_groups.py.
+
+Las reglas de validate_input (features base numéricos, pares err1/err2 con sus
+signos, features requeridos por el modelo) se compilan una sola vez por combinación
+de modelos en listas planas de claves. Una petición al juez se valida así con una
+sola pasada sobre el payload en lugar de cuatro llamadas a validate_input, y el
+resultado es un ValidatedRecord: al preprocesarlo, el DataFrame queda marcado como
+validado y los servicios no vuelven a validar sus columnas.
+
+Los mensajes de error son los mismos que los de validate_input.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple, Union
+
+from api.config import VALIDATION_BUDGET_US
+from . import metrics
+from .feature_groups import (
+    BASE_FEATURES,
+    UNCERTAINTY_FEATURES,
+    FOTOMETRIA_FEATURES,
+    ORBITAL_FEATURES,
+    ESTELAR_FEATURES,
+    FALSOS_POSITIVOS_FEATURES
+)
+
+SPECIALISTS = ['fotometria', 'orbital', 'estelar', 'falsos_positivos']
+
+MODEL_FEATURES = {
+    'fotometria': FOTOMETRIA_FEATURES,
+    'orbital': ORBITAL_FEATURES,
+    'estelar': ESTELAR_FEATURES,
+    'falsos_positivos': FALSOS_POSITIVOS_FEATURES
+}
+
+# Modelos agregadores: solo exigen la presencia de los features de los 4 especialistas
+AGGREGATORS = ('ensemble', 'judge')
+
+DERIVED_SUFFIXES = ('_sigma', '_snr', '_rel_unc')
+
+# Atributo del DataFrame preprocesado con los modelos ya validados
+VALIDATED_ATTR = "validated_models"
+
+# Número de mediciones recientes guardadas para los percentiles
+TIMING_SAMPLES = 1000
+
+
+class ValidationError(ValueError):
+    """Error de validación de la entrada, con el modelo cuya regla falló."""
+
+    def __init__(self, message: str, model_type: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.model_type = model_type
+
+
+class ValidatedRecord(dict):
+    """
+    Características de un candidato que ya pasaron la validación.
+
+    Es un diccionario (se usa igual que la entrada original); los valores validados
+    quedan convertidos a float y `models` indica para qué modelos se validó.
+    """
+
+    __slots__ = ("models",)
+
+    def __init__(self, features: Dict[str, Any], models: FrozenSet[str]):
+        super().__init__(features)
+        self.models = models
+
+
+class _CompiledRules:
+    """Reglas de una combinación de modelos, aplanadas en tuplas de claves."""
+
+    def __init__(self, model_types: Sequence[str]):
+        self.model_types = tuple(model_types)
+        for model_type in self.model_types:
+            if model_type not in MODEL_FEATURES and model_type not in AGGREGATORS:
+                raise ValueError(f"Tipo de modelo no soportado: '{model_type}'")
+
+        # Unión de todas las claves, en orden y sin repetir, para la pasada rápida
+        numeric, err1, err2, present = [], [], [], []
+        for model_type in self.model_types:
+            if model_type in AGGREGATORS:
+                present += [f for name in SPECIALISTS for f in self._required(name)]
+                continue
+            numeric += BASE_FEATURES.get(model_type, [])
+            for feature in UNCERTAINTY_FEATURES.get(model_type, []):
+                err1.append(f"{feature}_err1")
+                err2.append(f"{feature}_err2")
+            present += self._required(model_type)
+
+        self.numeric_keys = tuple(dict.fromkeys(numeric + err1 + err2))
+        self.err1_keys = tuple(dict.fromkeys(err1))
+        self.err2_keys = tuple(dict.fromkeys(err2))
+        self.present_keys = tuple(k for k in dict.fromkeys(present) if k not in self.numeric_keys)
+
+        # Especialistas cubiertos (para que los servicios no vuelvan a validar)
+        self.models = frozenset(
+            name for model_type in self.model_types
+            for name in (SPECIALISTS if model_type in AGGREGATORS else [model_type])
+        )
+
+    @staticmethod
+    def _required(model_type: str) -> List[str]:
+        """Features no derivados del grupo del modelo."""
+        return [f for f in MODEL_FEATURES.get(model_type, []) if not f.endswith(DERIVED_SUFFIXES)]
+
+    def passes(self, features: Dict[str, Any]) -> bool:
+        """Pasada rápida: True si el payload cumple todas las reglas."""
+        for key in self.numeric_keys:
+            if not isinstance(features.get(key), (int, float)):
+                return False
+        for key in self.err1_keys:
+            if features[key] < 0:
+                return False
+        for key in self.err2_keys:
+            if features[key] > 0:
+                return False
+        for key in self.present_keys:
+            if key not in features:
+                return False
+        return True
+
+    def first_error(self, features: Dict[str, Any]) -> ValidationError:
+        """Error del primer modelo que no cumple sus reglas (como validate_input)."""
+        for model_type in self.model_types:
+            message = _model_error(features, model_type)
+            if message:
+                return ValidationError(message, model_type)
+        return ValidationError("Datos de entrada inválidos")
+
+
+def _model_error(input_data: Dict[str, Any], model_type: str) -> str:
+    """Mensaje de error de validate_input para un modelo, o "" si es válido."""
+    # 1. Features base del modelo
+    missing_base = []
+    invalid_type = []
+    for feature in BASE_FEATURES.get(model_type, []):
+        if feature not in input_data:
+            missing_base.append(feature)
+        elif not isinstance(input_data[feature], (int, float)):
+            invalid_type.append(feature)
+    if missing_base:
+        return f"Faltan features base requeridos por {model_type}: {missing_base}"
+    if invalid_type:
+        return f"Features con tipo inválido para {model_type} (deben ser numéricos): {invalid_type}"
+
+    # 2. Incertidumbres: presencia, tipo y signo
+    missing_uncertainties = []
+    invalid_uncertainties = []
+    for feature in UNCERTAINTY_FEATURES.get(model_type, []):
+        err1_key = f"{feature}_err1"
+        err2_key = f"{feature}_err2"
+        if err1_key not in input_data or err2_key not in input_data:
+            missing_uncertainties.append(f"{feature} (err1 y err2)")
+            continue
+        if not isinstance(input_data[err1_key], (int, float)) or not isinstance(input_data[err2_key], (int, float)):
+            invalid_uncertainties.append(f"{feature} (valores no numéricos)")
+            continue
+        if input_data[err1_key] < 0:
+            invalid_uncertainties.append(f"{feature} (err1 debe ser positivo)")
+        if input_data[err2_key] > 0:
+            invalid_uncertainties.append(f"{feature} (err2 debe ser negativo)")
+    if missing_uncertainties:
+        return f"Faltan incertidumbres requeridas por {model_type}: {missing_uncertainties}"
+    if invalid_uncertainties:
+        return f"Incertidumbres inválidas para {model_type}: {invalid_uncertainties}"
+
+    # 3. Features requeridos (no derivados)
+    if model_type in AGGREGATORS:
+        for model_name in SPECIALISTS:
+            missing_required = [f for f in _CompiledRules._required(model_name) if f not in input_data]
+            if missing_required:
+                return f"Features de {model_name} requeridos por {model_type}: {missing_required}"
+    else:
+        missing_required = [f for f in _CompiledRules._required(model_type) if f not in input_data]
+        if missing_required:
+            return f"Features requeridos por {model_type}: {missing_required}"
+    return ""
+
+
+class ValidationSchema:
+    """
+    Reglas de validación compiladas, con medición del tiempo de cada validación
+    contra un presupuesto fijo (VALIDATION_BUDGET_US).
+    """
+
+    def __init__(self, budget_us: float = VALIDATION_BUDGET_US):
+        """
+        Args:
+            budget_us: Tiempo máximo esperado por validación, en microsegundos
+        """
+        self.budget_us = budget_us
+        self._compiled: Dict[Tuple[str, ...], _CompiledRules] = {}
+        self._lock = threading.Lock()
+
+        # Métricas
+        self._count = 0
+        self._failures = 0
+        self._over_budget = 0
+        self._total_us = 0.0
+        self._max_us = 0.0
+
+        # Compilar de antemano las combinaciones que usan las rutas
+        for model_types in [[name] for name in SPECIALISTS] + [SPECIALISTS, ['ensemble']]:
+            self.rules(model_types)
+
+    def rules(self, model_types: Union[str, Sequence[str]]) -> _CompiledRules:
+        """Reglas compiladas de una combinación de modelos (se compilan una sola vez)."""
+        key = (model_types,) if isinstance(model_types, str) else tuple(model_types)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.setdefault(key, _CompiledRules(key))
+        return compiled
+
+    def validate(self, features: Any, model_types: Union[str, Sequence[str]]) -> ValidatedRecord:
+        """
+        Valida las características de un candidato para uno o varios modelos.
+
+        Args:
+            features: Diccionario plano con las características
+            model_types: Modelo o lista de modelos (en el orden en que se reportan los errores)
+
+        Returns:
+            ValidatedRecord con las características
+
+        Raises:
+            ValidationError: Si los datos no cumplen las reglas de algún modelo
+        """
+        started = time.perf_counter()
+        compiled = self.rules(model_types)
+        try:
+            if not features or not isinstance(features, dict):
+                raise ValidationError("No se proporcionaron datos")
+            if not compiled.passes(features):
+                raise compiled.first_error(features)
+
+            record = ValidatedRecord(features, compiled.models)
+            for key in compiled.numeric_keys:
+                record[key] = float(record[key])
+            return record
+        except ValidationError:
+            self._failures += 1
+            raise
+        finally:
+            self._record((time.perf_counter() - started) * 1e6)
+
+    def _record(self, elapsed_us: float) -> None:
+        self._count += 1
+        self._total_us += elapsed_us
+        self._max_us = max(self._max_us, elapsed_us)
+        metrics.observe("validate", elapsed_us * 1e-6)
+        if elapsed_us > self.budget_us:
+            self._over_budget += 1
+            logging.debug(f"Validación de {elapsed_us:.0f} µs supera el presupuesto de {self.budget_us:.0f} µs")
+
+    def stats(self) -> Dict[str, Any]:
+        """Validaciones realizadas, fallidas y su tiempo frente al presupuesto."""
+        return {
+            "budget_us": self.budget_us,
+            "validations": self._count,
+            "failures": self._failures,
+            "over_budget": self._over_budget,
+            "mean_us": round(self._total_us / self._count, 2) if self._count else 0.0,
+            "max_us": round(self._max_us, 2)
+        }
+
+
+# Esquema compartido por todas las rutas
+VALIDATION_SCHEMA = ValidationSchema()
+
+
+def extract_features(payload: Any) -> Any:
+    """
+    Características del campo `data` de la petición.
+
+    Acepta también la forma anidada {"data": {...}} que exigían versiones anteriores
+    del API.
+    """
+    if isinstance(payload, dict) and len(payload) == 1 and isinstance(payload.get("data"), dict):
+        return payload["data"]
+    return payload
+
+
+def validate_payload(payload: Any, model_types: Union[str, Sequence[str]]) -> ValidatedRecord:
+    """
+    Valida el campo `data` de una petición para uno o varios modelos.
+
+    Raises:
+        ValidationError: Si los datos no cumplen las reglas de algún modelo
+    """
+    return VALIDATION_SCHEMA.validate(extract_features(payload), model_types)
+
+
+def mark_validated(frame, records: Iterable[Any]) -> None:
+    """Marca el DataFrame preprocesado con los modelos validados en todas sus filas."""
+    models = None
+    for record in records:
+        if not isinstance(record, ValidatedRecord):
+            return
+        models = record.models if models is None else models & record.models
+    if models:
+        frame.attrs[VALIDATED_ATTR] = models
+
+
+def is_validated(frame, model_type: str) -> bool:
+    """True si las filas del DataFrame ya se validaron para el modelo."""
+    return model_type in frame.attrs.get(VALIDATED_ATTR, ())
@@ -0,0 +1,142 @@
+# api/utils/warmup.py
+
+"""
+Calentamiento del API al arrancar.
+
+Los load_model() de los servicios son perezosos, así que sin calentamiento la primera
+predicción después de un despliegue paga la deserialización de los 5 modelos, la
+construcción del grafo fusionado y las primeras reservas de memoria de torch/NumPy.
+warm_up() carga todo una vez y pasa un lote sintético por el pipeline completo
+(preprocesamiento, especialistas, juez y ensemble) con los mismos tamaños de lote que
+usan las rutas; hasta que termina, /ready responde 503.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from api.config import BATCH_MAX_ROWS, WARMUP_ROUNDS
+from api.utils import metrics
+from api.utils.executor import executor
+
+# Estado de preparación que reporta /ready
+_state: Dict[str, Any] = {
+    "ready": False,
+    "started_at": None,
+    "duration_s": None,
+    "steps_s": {},
+    "error": None
+}
+
+
+def synthetic_records(n_rows: int) -> List[Dict[str, Any]]:
+    """
+    Candidatos sintéticos para el calentamiento: valores medios de entrenamiento y, en
+    filas alternas, la mitad de las características faltantes (para pasar también por
+    la imputación KNN).
+    """
+    from api.utils.preprocessing import RAW_COLUMNS, TRAIN_COLUMNS, SCALER_MEAN, UNCERTAINTY_COLUMNS
+
+    means = dict(zip(TRAIN_COLUMNS, SCALER_MEAN if SCALER_MEAN is not None else np.zeros(len(TRAIN_COLUMNS))))
+    base = {col: float(means[col]) for col in RAW_COLUMNS if col in means}
+    for col in UNCERTAINTY_COLUMNS:
+        sigma = abs(float(means[f"{col}_sigma"]))
+        base[f"{col}_err1"] = sigma
+        base[f"{col}_err2"] = -sigma
+
+    records = []
+    for i in range(n_rows):
+        record = dict(base)
+        if i % 2:
+            for col in RAW_COLUMNS[::2]:
+                record[col] = None
+        records.append(record)
+    return records
+
+
+def load_models() -> None:
+    """
+    Carga los 5 modelos, el grafo fusionado y el almacén del catálogo, sin ejecutar
+    ninguna predicción (el imputer y el scaler se cargan al importar preprocessing).
+    """
+    from api.services import (
+        fotometria_service, orbital_service, estelar_service, falsos_positivos_service,
+        judge_service, inference_graph, catalog_service
+    )
+
+    for service in (fotometria_service, orbital_service, estelar_service, falsos_positivos_service, judge_service):
+        service.load_model()
+    inference_graph.load_graph()
+    catalog_service.load_store()
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Carga los modelos y ejecuta el pipeline completo sobre lotes sintéticos.
+
+    Returns:
+        Segundos de cada paso
+    """
+    from api.services import (
+        fotometria_service, orbital_service, estelar_service, falsos_positivos_service,
+        judge_service, ensemble_service
+    )
+    from api.utils.preprocessing import preprocess_input
+
+    steps = {}
+    started = time.perf_counter()
+
+    # 1. Modelos (en el servidor pre-fork ya vienen cargados del proceso padre)
+    load_models()
+    steps["models"] = time.perf_counter() - started
+
+    # 2. Pipeline completo con un candidato y con un lote del tamaño máximo del micro-batching
+    for n_rows in (1, max(BATCH_MAX_ROWS, 2)):
+        step_started = time.perf_counter()
+        records = synthetic_records(n_rows)
+        for _ in range(max(WARMUP_ROUNDS, 1)):
+            data = preprocess_input(records)
+            judge_service.predict_batch(data)
+            ensemble_service.predict_ensemble_batch(data)
+            for service in (fotometria_service, orbital_service, estelar_service, falsos_positivos_service):
+                service.predict_batch(data)
+        steps[f"pipeline_{n_rows}_rows"] = time.perf_counter() - step_started
+
+    # Las pasadas del calentamiento no cuentan en /metrics
+    metrics.reset_stages()
+    return steps
+
+
+async def run_warm_up() -> None:
+    """
+    Calienta el API en el ejecutor de inferencia y marca el servicio como listo.
+
+    Con EXECUTOR_KIND=process cada proceso del pool tiene sus propios modelos, así que
+    se lanza un calentamiento por worker.
+    """
+    _state["started_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    started = time.perf_counter()
+    try:
+        runs = executor.max_workers if executor.kind == "process" else 1
+        results = await asyncio.gather(*[executor.run(warm_up) for _ in range(runs)])
+        _state["steps_s"] = {step: round(seconds, 3) for step, seconds in results[0].items()}
+        _state["ready"] = True
+        logging.info(f"API lista: calentamiento completado en {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        _state["error"] = str(e)
+        logging.error(f"Error en el calentamiento del API: {str(e)}")
+    finally:
+        _state["duration_s"] = round(time.perf_counter() - started, 3)
+
+
+def mark_ready() -> None:
+    """Marca el servicio como listo sin calentamiento (WARMUP_ON_STARTUP=0)."""
+    _state["ready"] = True
+
+
+def readiness() -> Dict[str, Any]:
+    """Estado del calentamiento."""
+    return dict(_state)
@@ -0,0 +1,24 @@
+# model/architecture/m_common.py
+
+"""
+Utilidades comunes de las arquitecturas de los especialistas.
+"""
+
+# Neuronas de las dos capas ocultas de los especialistas por defecto
+DEFAULT_HIDDEN_SIZES = (16, 8)
+
+
+def hidden_sizes_from_state_dict(state_dict):
+    """
+    Anchos de las capas ocultas de un especialista a partir de sus pesos, para
+    construir la red con la forma con la que se entrenó.
+    Args:
+        state_dict (dict): Pesos de la red (claves network.<i>.weight).
+    Returns:
+        tuple[int, ...]: Neuronas de cada capa oculta, en orden.
+    """
+    layers = sorted(
+        (int(key.split(".")[1]), tensor) for key, tensor in state_dict.items()
+        if key.startswith("network.") and key.endswith(".weight")
+    )
+    return tuple(int(tensor.shape[0]) for _, tensor in layers[:-1])
@@ -2,25 +2,28 @@
 import torch
 import torch.nn as nn
 
+from model.architecture.m_common import DEFAULT_HIDDEN_SIZES
+
 class FalsosPositivosNet(nn.Module):
     """
     Red Neuronal detector especializado en firmas conocidas
     que indican un falso positivo de origen instrumental o por contaminación de otras estrellas.
     """
-    def __init__(self, input_features):
+    def __init__(self, input_features, hidden_sizes=DEFAULT_HIDDEN_SIZES):
         """
         Inicializa las capas de la red.
         Args:
             input_features (int): El número de columnas de entrada para esta red.
+            hidden_sizes (tuple[int, int]): Neuronas de las dos capas ocultas.
         """
         super(FalsosPositivosNet, self).__init__()
         # Definimos la arquitectura
         self.network = nn.Sequential(
-            nn.Linear(input_features, 16),
+            nn.Linear(input_features, hidden_sizes[0]),
             nn.ReLU(),
-            nn.Linear(16, 8),
+            nn.Linear(hidden_sizes[0], hidden_sizes[1]),
             nn.ReLU(),
-            nn.Linear(8, 1),
+            nn.Linear(hidden_sizes[1], 1),
             nn.Sigmoid() # Sigmoid para una salida de probabilidad (0 a 1)
         )
 
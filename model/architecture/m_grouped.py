@@ -0,0 +1,107 @@
+# model/architecture/m_grouped.py
+
+import torch
+import torch.nn as nn
+
+from model.architecture.m_common import DEFAULT_HIDDEN_SIZES
+
+
+class GroupedSpecialistNet(nn.Module):
+    """
+    Varias redes especialistas (Linear -> ReLU -> Linear -> ReLU -> Linear) apiladas
+    en un solo modelo, para entrenarlas juntas con un único paso hacia adelante y
+    hacia atrás por lote.
+
+    Cada capa guarda los pesos de todos los modelos en un tensor (n_modelos, entrada,
+    salida) y se evalúa con un producto matricial por lotes (baddbmm). Las entradas se
+    rellenan con ceros hasta la más ancha; los pesos de esas columnas de relleno
+    empiezan en cero y su gradiente es siempre cero, así que no cambian. Los modelos no
+    comparten ningún peso: cada uno aprende como si se entrenara por separado.
+    """
+    def __init__(self, input_sizes, hidden_sizes=DEFAULT_HIDDEN_SIZES, output_sigmoid=None):
+        """
+        Inicializa los pesos de todos los modelos.
+        Args:
+            input_sizes (list[int]): Número de columnas de entrada de cada modelo.
+            hidden_sizes (tuple[int, int]): Neuronas de las dos capas ocultas.
+            output_sigmoid (list[bool]): Modelos cuya red termina en nn.Sigmoid
+                (p. ej. FalsosPositivosNet). Por defecto ninguno.
+        """
+        super(GroupedSpecialistNet, self).__init__()
+        self.input_sizes = [int(size) for size in input_sizes]
+        self.hidden_sizes = tuple(int(size) for size in hidden_sizes)
+        self.n_models = len(self.input_sizes)
+        self.max_input = max(self.input_sizes)
+
+        widths = [self.max_input, *self.hidden_sizes, 1]
+        self.weights = nn.ParameterList()
+        self.biases = nn.ParameterList()
+        for fan_in, fan_out in zip(widths[:-1], widths[1:]):
+            self.weights.append(nn.Parameter(torch.zeros(self.n_models, fan_in, fan_out)))
+            self.biases.append(nn.Parameter(torch.zeros(self.n_models, 1, fan_out)))
+
+        sigmoid = output_sigmoid or [False] * self.n_models
+        self.register_buffer("output_sigmoid", torch.tensor(sigmoid, dtype=torch.bool).view(-1, 1, 1))
+        self.reset_parameters()
+
+    def reset_parameters(self):
+        """Misma inicialización que nn.Linear para cada modelo, con su ancho de entrada real."""
+        with torch.no_grad():
+            for i, size in enumerate(self.input_sizes):
+                fan_ins = [size, *self.hidden_sizes]
+                for weight, bias, fan_in in zip(self.weights, self.biases, fan_ins):
+                    layer = nn.Linear(fan_in, weight.shape[2])
+                    weight[i].zero_()
+                    weight[i, :fan_in] = layer.weight.T
+                    bias[i, 0] = layer.bias
+
+    @classmethod
+    def from_models(cls, models, input_sizes, output_sigmoid=None):
+        """
+        Construye el modelo agrupado con los pesos de especialistas ya creados.
+        Args:
+            models (list[nn.Module]): Redes con un atributo `network` (nn.Sequential).
+            input_sizes (list[int]): Columnas de entrada de cada red.
+            output_sigmoid (list[bool]): Redes que terminan en nn.Sigmoid.
+        """
+        linears = [[layer for layer in model.network if isinstance(layer, nn.Linear)] for model in models]
+        hidden_sizes = tuple(layer.out_features for layer in linears[0][:-1])
+        grouped = cls(input_sizes, hidden_sizes, output_sigmoid)
+        with torch.no_grad():
+            for i, layers in enumerate(linears):
+                for weight, bias, layer in zip(grouped.weights, grouped.biases, layers):
+                    weight[i].zero_()
+                    weight[i, :layer.in_features] = layer.weight.T
+                    bias[i, 0] = layer.bias
+        return grouped
+
+    def state_dicts(self):
+        """
+        Pesos de cada modelo con las claves de su red original (network.0, network.2,
+        network.4), listos para model.load_state_dict / torch.save.
+        """
+        state_dicts = []
+        for i, size in enumerate(self.input_sizes):
+            state = {}
+            fan_ins = [size, *self.hidden_sizes]
+            for layer, (weight, bias, fan_in) in enumerate(zip(self.weights, self.biases, fan_ins)):
+                state[f"network.{2 * layer}.weight"] = weight[i, :fan_in].T.detach().clone().contiguous()
+                state[f"network.{2 * layer}.bias"] = bias[i, 0].detach().clone()
+            state_dicts.append(state)
+        return state_dicts
+
+    def forward(self, x):
+        """
+        Args:
+            x (Tensor): (lote, n_modelos, max_input) con las columnas de cada modelo
+                rellenas con ceros hasta max_input.
+        Returns:
+            Tensor (n_modelos, lote, 1) con la salida de cada modelo.
+        """
+        h = x.transpose(0, 1)
+        last = len(self.weights) - 1
+        for layer, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            h = torch.baddbmm(bias, h, weight)
+            if layer < last:
+                h = torch.relu(h)
+        return torch.where(self.output_sigmoid, torch.sigmoid(h), h)
@@ -0,0 +1,280 @@
+# model/prediction/build_catalog.py
+
+"""
+Precalcula los scores de todo el catálogo Kepler (entrenamiento y candidatos) y los
+guarda en un almacén indexado que el API lee con memory-map (GET /catalog/...).
+
+Sigue el mismo flujo que predict_1.py (especialistas -> juez), pero parte de las filas
+crudas de data/raw/Kepler.csv y usa el mismo pipeline que /judge/predict
+(preprocess_matrix + grafo fusionado), así que cada resultado del catálogo es el que
+devolvería el API para esa fila: antes de publicar una versión se compara con la
+evaluación fila a fila y, si alguna fila supera la tolerancia (SPECIALIST_TOLERANCE,
+JUDGE_TOLERANCE), la construcción falla.
+
+Estructura del almacén:
+
+    outputs/catalog/CURRENT                  nombre de la versión vigente
+    outputs/catalog/<versión>/specialists.npy  float64 (n_filas, 4) scores de especialistas
+    outputs/catalog/<versión>/judge_score.npy  float64 (n_filas,) probabilidad de CONFIRMED
+    outputs/catalog/<versión>/judge_class.npy  int8 (n_filas,) clase del juez
+    outputs/catalog/<versión>/meta.json        IDs, disposición, versión del pipeline y huella de los artefactos
+
+Cada construcción escribe una versión nueva y después reemplaza CURRENT de forma
+atómica, así que los lectores nunca ven un almacén a medio escribir. Las
+construcciones se serializan con el lock de archivo de catalog_service
+(outputs/catalog/build.lock), y al terminar solo se borran las versiones terminadas
+anteriores a la publicada.
+
+Uso:
+    python model/prediction/build_catalog.py
+    python model/prediction/build_catalog.py --if-stale --no-wait   (lo que usa el API)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# --- Añadir la ruta del proyecto al path ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+from api.utils.preprocessing import preprocess_matrix, RAW_COLUMNS
+from api.utils.cache import artifacts_fingerprint
+from api.utils.raw_catalogs import load_catalog
+from api.services import inference_graph
+from api.services.catalog_service import CATALOG_FORMAT_VERSION, build_lock, meta_is_stale
+
+# --------------------------------------------------------------------------
+# 1. CONFIGURACIÓN DE RUTAS
+# --------------------------------------------------------------------------
+RAW_CATALOG_PATH = os.path.join(BASE_DIR, "data", "raw", "Kepler.csv")
+CATALOG_PATH = os.path.join(BASE_DIR, "outputs", "catalog")
+CURRENT_FILENAME = "CURRENT"
+
+# Filas por pasada del pipeline (acota la memoria de la imputación)
+CHUNK_ROWS = 1024
+
+# Diferencia máxima tolerada entre el almacén y /judge/predict evaluando fila a fila.
+# La imputación no depende del tamaño del bloque, pero el forward float32 del grafo
+# puede cambiar el último bit y, al redondear a SCORE_DECIMALS, mover un score de
+# especialista en una unidad del último decimal
+SPECIALIST_TOLERANCE = 1.5 * 10 ** -inference_graph.SCORE_DECIMALS
+JUDGE_TOLERANCE = 1e-3
+
+
+def source_signature(path: str = RAW_CATALOG_PATH) -> str:
+    """Tamaño y fecha de modificación del catálogo crudo."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+# --------------------------------------------------------------------------
+# 2. PUNTUACIÓN DEL CATÁLOGO
+# --------------------------------------------------------------------------
+def catalog_matrix(catalog: pd.DataFrame) -> np.ndarray:
+    """Matriz cruda (columnas de RAW_COLUMNS) de las filas del catálogo."""
+    return catalog.reindex(columns=RAW_COLUMNS).to_numpy(dtype=np.float64)
+
+
+def score_catalog(catalog: pd.DataFrame, chunk_rows: int = CHUNK_ROWS):
+    """
+    Evalúa especialistas y juez sobre todas las filas del catálogo.
+
+    Returns:
+        (scores de especialistas (n_filas, 4), probabilidad del juez, clase del juez)
+    """
+    graph = inference_graph.load_graph()
+    raw = catalog_matrix(catalog)
+
+    specialist_scores, judge_scores, judge_classes = [], [], []
+    for start in range(0, len(raw), chunk_rows):
+        X = preprocess_matrix(raw[start:start + chunk_rows])
+        scores, probabilities, classes = graph.run(X)
+        specialist_scores.append(scores.astype(np.float64))
+        judge_scores.append(probabilities.astype(np.float64))
+        judge_classes.append(classes.astype(np.int8))
+        print(f"  {min(start + chunk_rows, len(raw))}/{len(raw)} filas")
+
+    return (
+        np.concatenate(specialist_scores),
+        np.concatenate(judge_scores),
+        np.concatenate(judge_classes)
+    )
+
+
+def check_single_row(catalog: pd.DataFrame, specialist_scores: np.ndarray, judge_scores: np.ndarray) -> None:
+    """
+    Compara los scores del almacén con los de /judge/predict, que evalúa una fila
+    por pasada.
+
+    Raises:
+        ValueError: Si alguna fila difiere más que SPECIALIST_TOLERANCE / JUDGE_TOLERANCE
+    """
+    graph = inference_graph.load_graph()
+    raw = catalog_matrix(catalog)
+    single_specialists = np.empty_like(specialist_scores)
+    single_judge = np.empty_like(judge_scores)
+    for i in range(len(raw)):
+        scores, probabilities, _ = graph.run(preprocess_matrix(raw[i:i + 1]))
+        single_specialists[i] = scores[0]
+        single_judge[i] = probabilities[0]
+
+    specialist_diff = np.abs(single_specialists - specialist_scores).max(axis=1)
+    judge_diff = np.abs(single_judge - judge_scores)
+    print(f"  Fila a fila: {int((specialist_diff > 0).sum())} filas con algún score distinto, "
+          f"máx. diferencia {specialist_diff.max():.1e} (especialistas), {judge_diff.max():.1e} (juez)")
+
+    bad = np.flatnonzero((specialist_diff > SPECIALIST_TOLERANCE) | (judge_diff > JUDGE_TOLERANCE))
+    if len(bad):
+        names = catalog["kepoi_name"].iloc[bad[:5]].tolist()
+        raise ValueError(
+            f"{len(bad)} filas del catálogo no coinciden con la evaluación fila a fila "
+            f"(tolerancia {SPECIALIST_TOLERANCE:.1e} / {JUDGE_TOLERANCE:.1e}), p. ej. {names}"
+        )
+
+
+# --------------------------------------------------------------------------
+# 3. ESCRITURA DEL ALMACÉN
+# --------------------------------------------------------------------------
+def build_catalog(
+    output_path: str = CATALOG_PATH,
+    raw_path: str = RAW_CATALOG_PATH,
+    if_stale: bool = False,
+    wait: bool = True
+) -> Optional[str]:
+    """
+    Construye una versión nueva del almacén y la deja como vigente, con el lock de
+    construcción tomado.
+
+    Args:
+        output_path: Directorio del almacén
+        raw_path: Catálogo crudo (CSV de la NASA, con comentarios '#')
+        if_stale: Solo construir si la versión vigente está desactualizada
+        wait: Esperar si otro proceso está construyendo; con False no se construye
+
+    Returns:
+        Ruta de la versión construida, o None si no se construyó
+    """
+    with build_lock(output_path, wait=wait) as acquired:
+        if not acquired:
+            print("Otro proceso está construyendo el almacén; no se construye")
+            return None
+        if if_stale and not current_is_stale(output_path, raw_path):
+            print("El almacén vigente está actualizado; no se construye")
+            return None
+        return _build_version(output_path, raw_path)
+
+
+def current_is_stale(output_path: str = CATALOG_PATH, raw_path: str = RAW_CATALOG_PATH) -> bool:
+    """True si no hay versión vigente o si no corresponde a los artefactos y el CSV actuales."""
+    try:
+        with open(os.path.join(output_path, CURRENT_FILENAME)) as f:
+            version = f.read().strip()
+        with open(os.path.join(output_path, version, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return True
+    return meta_is_stale(meta, raw_path)
+
+
+def _build_version(output_path: str, raw_path: str) -> str:
+    """Evalúa el catálogo, escribe la versión y la publica (el llamador tiene el lock)."""
+    fingerprint = artifacts_fingerprint()
+    signature = source_signature(raw_path)
+
+    catalog = load_catalog(raw_path, columns=["kepid", "kepoi_name", "koi_disposition"] + RAW_COLUMNS)
+    print(f"Catálogo cargado: {len(catalog)} filas desde {raw_path}")
+
+    started = time.time()
+    specialist_scores, judge_scores, judge_classes = score_catalog(catalog)
+    print(f"✅ Catálogo evaluado en {time.time() - started:.1f}s")
+    check_single_row(catalog, specialist_scores, judge_scores)
+
+    # La huella que se guarda debe ser la de los pesos y artefactos con que se evaluó
+    if artifacts_fingerprint() != fingerprint:
+        raise ValueError("Los pesos o artefactos cambiaron durante la construcción; vuelva a ejecutarla")
+
+    version = f"{fingerprint}-{int(time.time() * 1000)}-{os.getpid()}"
+    version_path = os.path.join(output_path, version)
+    os.makedirs(version_path)
+
+    np.save(os.path.join(version_path, "specialists.npy"), specialist_scores)
+    np.save(os.path.join(version_path, "judge_score.npy"), judge_scores)
+    np.save(os.path.join(version_path, "judge_class.npy"), judge_classes)
+
+    meta = {
+        "format_version": CATALOG_FORMAT_VERSION,
+        "rows": len(catalog),
+        "specialists": inference_graph.SPECIALISTS,
+        "kepoi_name": catalog["kepoi_name"].tolist(),
+        "kepid": catalog["kepid"].astype(int).tolist(),
+        "koi_disposition": catalog["koi_disposition"].astype(object).fillna("").tolist(),
+        "artifacts_fingerprint": fingerprint,
+        "source_signature": signature,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    with open(os.path.join(version_path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    # Publicar la versión: reemplazo atómico de CURRENT
+    current_tmp = os.path.join(output_path, f"{CURRENT_FILENAME}.{os.getpid()}.tmp")
+    with open(current_tmp, "w") as f:
+        f.write(version)
+    os.replace(current_tmp, os.path.join(output_path, CURRENT_FILENAME))
+
+    remove_old_versions(output_path, keep=version)
+    return version_path
+
+
+def version_time(name: str) -> Optional[int]:
+    """Milisegundos de construcción codificados en el nombre <huella>-<ms>-<pid>, o None."""
+    parts = name.split("-")
+    if len(parts) != 3 or not parts[1].isdigit():
+        return None
+    return int(parts[1])
+
+
+def remove_old_versions(output_path: str, keep: str) -> None:
+    """
+    Borra las versiones terminadas (con meta.json) anteriores a `keep`. Las
+    posteriores o a medio escribir no se tocan (los lectores con mmap de una versión
+    borrada no se ven afectados).
+    """
+    keep_time = version_time(keep)
+    for name in os.listdir(output_path):
+        path = os.path.join(output_path, name)
+        built_at = version_time(name)
+        if name == keep or built_at is None or not os.path.isdir(path):
+            continue
+        if built_at < keep_time and os.path.exists(os.path.join(path, "meta.json")):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# --------------------------------------------------------------------------
+# 4. SCRIPT PRINCIPAL
+# --------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Precalcula los scores del catálogo Kepler para GET /catalog")
+    parser.add_argument("--output", default=CATALOG_PATH, help="Directorio del almacén")
+    parser.add_argument("--input", default=RAW_CATALOG_PATH, help="Catálogo crudo (CSV de la NASA)")
+    parser.add_argument("--if-stale", action="store_true",
+                        help="Solo construir si la versión vigente está desactualizada")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="Si otro proceso está construyendo, terminar sin construir")
+    args = parser.parse_args()
+
+    print("\n--- CONSTRUYENDO ALMACÉN DE SCORES DEL CATÁLOGO ---")
+    path = build_catalog(args.output, args.input, if_stale=args.if_stale, wait=not args.no_wait)
+    if path:
+        print(f"\n🎉 ¡Proceso completado! Almacén guardado en '{path}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ sys.path.append(BASE_DIR)
 
 # --- Importar arquitecturas y configuración ---
 from model.train.train_specialists import SPECIALIST_CONFIG
+from model.architecture.m_common import hidden_sizes_from_state_dict
 
 # --------------------------------------------------------------------------
 # 1. CONFIGURACIÓN DE RUTAS
@@ -36,9 +37,10 @@ def load_all_models():
         model_filename = config['output_filename']
         input_features = len(config['feature_columns'])
         
-        model = model_class(input_features=input_features)
         model_path = os.path.join(WEIGHTS_PATH, model_filename)
-        model.load_state_dict(torch.load(model_path))
+        state = torch.load(model_path)
+        model = model_class(input_features=input_features, hidden_sizes=hidden_sizes_from_state_dict(state))
+        model.load_state_dict(state)
         model.eval()
         specialist_models[name] = model
     
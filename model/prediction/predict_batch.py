@@ -0,0 +1,408 @@
+# model/prediction/predict_batch.py
+
+"""
+Evaluación por lotes de catálogos crudos (CSV del NASA Exoplanet Archive o Parquet),
+en reemplazo de predict_1.py.
+
+predict_1.py necesita el X_predict.csv que genera scripts/preprocess.py, lo carga
+entero en memoria y escribe el resultado de una sola vez. Este script parte de las
+columnas crudas (las mismas que /judge/predict) y usa el mismo pipeline que el API
+(preprocess_matrix + grafo fusionado):
+
+- La entrada se lee por bloques de --chunk-rows filas; la memoria no depende del
+  tamaño del catálogo.
+- Los bloques se reparten entre --workers procesos (fork después de cargar los
+  modelos, que se comparten copy-on-write). Cada worker parsea, preprocesa, evalúa y
+  formatea su bloque; el proceso principal solo corta la entrada y escribe.
+- El resultado se escribe en orden a medida que termina cada bloque. Tras cada bloque
+  se guarda el progreso en <salida>.progress.json; si el proceso se interrumpe, la
+  siguiente ejecución con la misma entrada continúa desde el último bloque escrito.
+
+Las filas con valores no numéricos o con un número de campos incorrecto se escriben
+con la columna `error` y sin scores; los valores vacíos se imputan.
+
+Uso:
+    python model/prediction/predict_batch.py data/raw/Kepler.csv
+    python model/prediction/predict_batch.py catalogo.parquet -o outputs/predictions/catalogo.csv --workers 8
+    python model/prediction/predict_batch.py data/raw/Kepler.csv --restart   # ignora el progreso guardado
+"""
+
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# --- Añadir la ruta del proyecto al path ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+from api.config import INFERENCE_BACKEND
+from api.utils.preprocessing import preprocess_matrix, RAW_COLUMNS
+from api.utils.csv_stream import missing_raw_columns, parse_block
+from api.services import inference_graph
+
+# --------------------------------------------------------------------------
+# 1. CONFIGURACIÓN
+# --------------------------------------------------------------------------
+FINAL_OUTPUT_PATH = os.path.join(BASE_DIR, "outputs", "predictions")
+
+# Filas por bloque (acota la memoria de la imputación en cada worker)
+CHUNK_ROWS = 4096
+
+# Bloques en vuelo por worker: mantiene a todos ocupados sin acumular la entrada
+PENDING_PER_WORKER = 2
+
+# Columnas que se copian tal cual de la entrada a la salida
+ID_FIELDS = ["kepid", "kepoi_name"]
+
+PROGRESS_SUFFIX = ".progress.json"
+
+VERDICTS = {1: 'Planeta Potencial', 0: 'Falso Positivo Probable'}
+
+
+def output_columns(id_fields: List[str]) -> List[str]:
+    """Columnas del CSV de salida (las mismas de final_predictions.csv, más `error`)."""
+    return (
+        id_fields +
+        [f"score_{name}" for name in inference_graph.SPECIALISTS] +
+        ["confianza_planeta", "veredicto_final_code", "veredicto_final", "error"]
+    )
+
+
+def source_signature(path: str) -> str:
+    """Tamaño y fecha de modificación de la entrada (detecta cambios entre ejecuciones)."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+# --------------------------------------------------------------------------
+# 2. LECTURA POR BLOQUES
+# --------------------------------------------------------------------------
+class CSVChunkSource:
+    """CSV crudo (con comentarios '#'): bloques de líneas que parsea cada worker."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                if line.strip() and not line.startswith("#"):
+                    self.header = [name.strip() for name in next(csv.reader([line]))]
+                    break
+            else:
+                raise ValueError(f"{path} está vacío o solo contiene comentarios")
+        self.id_fields = [field for field in ID_FIELDS if field in self.header]
+
+    def missing_columns(self) -> List[str]:
+        return missing_raw_columns(self.header)
+
+    def chunks(self, chunk_rows: int, skip: int = 0) -> Iterator[Tuple[str, Any]]:
+        """Bloques ("csv", (encabezado, líneas, id_fields)); los `skip` primeros solo se cuentan."""
+        lines: List[str] = []
+        index = 0
+        seen_header = False
+        with open(self.path, encoding="utf-8-sig", newline="") as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                if not line.strip() or line.startswith("#"):
+                    continue
+                if not seen_header:
+                    seen_header = True
+                    continue
+                lines.append(line)
+                if len(lines) == chunk_rows:
+                    if index >= skip:
+                        yield "csv", (self.header, lines, self.id_fields)
+                    lines = []
+                    index += 1
+        if lines and index >= skip:
+            yield "csv", (self.header, lines, self.id_fields)
+
+
+class ParquetChunkSource:
+    """Parquet (requiere pyarrow): lotes de filas convertidos a la matriz cruda."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Leer Parquet requiere pyarrow (pip install pyarrow)")
+        self.path = path
+        self.file = pq.ParquetFile(path)
+        self.header = list(self.file.schema_arrow.names)
+        self.id_fields = [field for field in ID_FIELDS if field in self.header]
+
+    def missing_columns(self) -> List[str]:
+        return missing_raw_columns(self.header)
+
+    def chunks(self, chunk_rows: int, skip: int = 0) -> Iterator[Tuple[str, Any]]:
+        """Bloques ("raw", (ids, matriz cruda, errores)); los `skip` primeros se descartan."""
+        columns = self.id_fields + RAW_COLUMNS
+        batches = self.file.iter_batches(batch_size=chunk_rows, columns=columns)
+        for index, batch in enumerate(batches):
+            if index < skip:
+                continue
+            frame = batch.to_pandas()
+            values = frame[RAW_COLUMNS].apply(pd.to_numeric, errors="coerce")
+            # Un valor que no es número ni nulo es un error de la fila, no un faltante
+            bad = values.isna() & frame[RAW_COLUMNS].notna()
+            errors = [
+                f"Valores no numéricos en: {list(values.columns[row])}" if row.any() else None
+                for row in bad.to_numpy()
+            ]
+            raw = values.to_numpy(dtype=np.float64)
+            ids = frame[self.id_fields].to_dict("records")
+            yield "raw", (ids, raw, errors)
+
+
+def open_source(path: str):
+    """Fuente de bloques según la extensión del archivo."""
+    if path.lower().endswith((".parquet", ".pq")):
+        return ParquetChunkSource(path)
+    return CSVChunkSource(path)
+
+
+# --------------------------------------------------------------------------
+# 3. EVALUACIÓN DE UN BLOQUE (en los workers)
+# --------------------------------------------------------------------------
+def init_worker(torch_threads: int) -> None:
+    """Inicializa un worker: un hilo de torch por worker para que no compitan entre sí."""
+    if INFERENCE_BACKEND == "torch":
+        import torch
+        torch.set_num_threads(torch_threads)
+
+
+def score_chunk(task: Tuple[str, Any]) -> Tuple[int, int, str]:
+    """
+    Parsea, preprocesa y evalúa un bloque, y lo formatea como CSV (sin encabezado).
+
+    Returns:
+        (filas, filas con error, texto CSV)
+    """
+    kind, payload = task
+    if kind == "csv":
+        header, lines, id_fields = payload
+        ids, raw, errors = parse_block(header, lines, id_fields)
+    else:
+        ids, raw, errors = payload
+        id_fields = list(ids[0]) if ids else []
+
+    n_rows = len(errors)
+    valid = np.array([error is None for error in errors], dtype=bool)
+    specialist_scores = np.full((n_rows, len(inference_graph.SPECIALISTS)), np.nan)
+    judge_scores = np.full(n_rows, np.nan)
+    judge_classes = np.zeros(n_rows, dtype=np.int64)
+    if valid.any():
+        scores, probabilities, classes = inference_graph.load_graph().run(preprocess_matrix(raw[valid]))
+        specialist_scores[valid] = scores
+        judge_scores[valid] = probabilities
+        judge_classes[valid] = classes
+
+    frame = pd.DataFrame(ids, columns=id_fields, index=range(n_rows))
+    for i, name in enumerate(inference_graph.SPECIALISTS):
+        frame[f"score_{name}"] = specialist_scores[:, i]
+    frame["confianza_planeta"] = judge_scores
+    frame["veredicto_final_code"] = pd.Series(judge_classes).where(valid).astype("Int64")
+    frame["veredicto_final"] = frame["veredicto_final_code"].map(VERDICTS)
+    frame["error"] = errors
+    return n_rows, int((~valid).sum()), frame.to_csv(header=False, index=False)
+
+
+# --------------------------------------------------------------------------
+# 4. PROGRESO Y REANUDACIÓN
+# --------------------------------------------------------------------------
+def progress_path(output_path: str) -> str:
+    return output_path + PROGRESS_SUFFIX
+
+
+def read_progress(output_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(progress_path(output_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_progress(output_path: str, progress: Dict[str, Any]) -> None:
+    """Guarda el progreso de forma atómica (nunca queda un archivo a medio escribir)."""
+    path = progress_path(output_path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(progress, f)
+    os.replace(tmp, path)
+
+
+def resume_point(output_path: str, progress: Dict[str, Any], restart: bool) -> Tuple[int, int, int]:
+    """
+    Desde dónde continuar.
+
+    Returns:
+        (bloques ya escritos, filas ya escritas, bytes válidos de la salida)
+
+    Raises:
+        ValueError: Si la salida ya existe y no hay un progreso compatible que continuar
+    """
+    if restart or not os.path.exists(output_path):
+        return 0, 0, 0
+
+    saved = read_progress(output_path)
+    if saved is None:
+        raise ValueError(f"{output_path} ya existe y está completo; use --restart para regenerarlo")
+    for key in ("input", "signature", "chunk_rows", "columns"):
+        if saved.get(key) != progress[key]:
+            raise ValueError(
+                f"El progreso guardado corresponde a otra ejecución ({key} distinto); "
+                "use --restart para empezar de nuevo"
+            )
+    return saved["chunks_done"], saved["rows_done"], saved["output_bytes"]
+
+
+# --------------------------------------------------------------------------
+# 5. EJECUCIÓN
+# --------------------------------------------------------------------------
+def predict_file(
+    input_path: str,
+    output_path: str,
+    workers: int,
+    chunk_rows: int = CHUNK_ROWS,
+    restart: bool = False
+) -> Dict[str, Any]:
+    """
+    Evalúa un catálogo crudo por bloques y escribe el CSV de resultados.
+
+    Args:
+        input_path: CSV del Archive (comentarios '#' permitidos) o Parquet
+        output_path: CSV de salida
+        workers: Procesos que evalúan bloques (1 = en el proceso actual)
+        chunk_rows: Filas por bloque
+        restart: Ignorar el progreso guardado y empezar desde el principio
+
+    Returns:
+        Resumen de la ejecución (filas, errores, tiempo)
+
+    Raises:
+        ValueError: Si la entrada no es válida o no se puede continuar la salida
+    """
+    if workers < 1 or chunk_rows < 1:
+        raise ValueError("workers y chunk_rows deben ser >= 1")
+    input_path = os.path.abspath(input_path)
+    source = open_source(input_path)
+    missing = source.missing_columns()
+    if missing:
+        raise ValueError(f"Faltan columnas en {input_path}: {missing}")
+
+    progress = {
+        "input": input_path,
+        "signature": source_signature(input_path),
+        "chunk_rows": chunk_rows,
+        "columns": output_columns(source.id_fields)
+    }
+    chunks_done, rows_done, output_bytes = resume_point(output_path, progress, restart)
+    if chunks_done:
+        print(f"Reanudando desde el bloque {chunks_done} ({rows_done} filas ya escritas)")
+
+    # Cargar los modelos antes del fork: los workers los heredan sin volver a cargarlos
+    inference_graph.load_graph()
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    output = open(output_path, "r+b" if output_bytes else "wb")
+    output.truncate(output_bytes)
+    output.seek(output_bytes)
+    if not output_bytes:
+        output.write((",".join(progress["columns"]) + "\n").encode("utf-8"))
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=init_worker,
+            initargs=(max(1, (os.cpu_count() or 1) // workers),)
+        )
+
+    started = time.time()
+    rows_new = errors = 0
+
+    def write(result: Tuple[int, int, str]) -> None:
+        nonlocal chunks_done, rows_done, rows_new, errors
+        n_rows, n_errors, text = result
+        output.write(text.encode("utf-8"))
+        output.flush()
+        os.fsync(output.fileno())
+        chunks_done += 1
+        rows_done += n_rows
+        rows_new += n_rows
+        errors += n_errors
+        write_progress(output_path, dict(
+            progress, chunks_done=chunks_done, rows_done=rows_done, output_bytes=output.tell()
+        ))
+        elapsed = time.time() - started
+        print(f"  {rows_done} filas ({rows_new / max(elapsed, 1e-9):.0f} filas/s)", flush=True)
+
+    try:
+        if pool is None:
+            for task in source.chunks(chunk_rows, skip=chunks_done):
+                write(score_chunk(task))
+        else:
+            # Resultados en el orden de la entrada; como mucho PENDING_PER_WORKER bloques por worker en memoria
+            pending = deque()
+            for task in source.chunks(chunk_rows, skip=chunks_done):
+                pending.append(pool.submit(score_chunk, task))
+                if len(pending) >= workers * PENDING_PER_WORKER:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    finally:
+        output.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    # Terminado: sin archivo de progreso, la salida se considera completa
+    os.remove(progress_path(output_path))
+    elapsed = time.time() - started
+    return {
+        "rows": rows_done,
+        "rows_scored_now": rows_new,
+        "errors": errors,
+        "seconds": elapsed,
+        "rows_per_second": rows_new / elapsed if elapsed > 0 else math.inf
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluación por lotes de catálogos crudos (CSV o Parquet)")
+    parser.add_argument("input", help="CSV del NASA Exoplanet Archive o archivo Parquet")
+    parser.add_argument("-o", "--output", help="CSV de salida (por defecto outputs/predictions/<entrada>_predictions.csv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos de evaluación")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Filas por bloque")
+    parser.add_argument("--restart", action="store_true", help="Ignorar el progreso guardado y empezar de nuevo")
+    args = parser.parse_args()
+
+    output_path = args.output or os.path.join(
+        FINAL_OUTPUT_PATH, os.path.splitext(os.path.basename(args.input))[0] + "_predictions.csv"
+    )
+
+    print("\n--- EVALUACIÓN POR LOTES ---")
+    print(f"Entrada: {args.input} | salida: {output_path} | {args.workers} workers, bloques de {args.chunk_rows} filas")
+    try:
+        summary = predict_file(args.input, output_path, args.workers, args.chunk_rows, args.restart)
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
+
+    print(f"\n🎉 ¡Proceso completado! {summary['rows']} filas ({summary['errors']} con error) "
+          f"en '{output_path}' ({summary['rows_per_second']:.0f} filas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# model/train/controller.py
+
+"""
+Control de una ejecución de entrenamiento: early stopping por pérdida de
+validación, seguimiento del mejor estado, checkpoints en disco para reanudar y
+registro de métricas por época.
+
+Archivos de una ejecución (run_dir):
+
+    checkpoint.pt   modelo, optimizador, estado del RNG de torch, mejores pesos y
+                    contadores de paciencia; se escribe cada `checkpoint_every`
+                    épocas (de forma atómica) y se borra al terminar
+    metrics.csv     una fila por época: pérdida de entrenamiento, pérdida y
+                    precisión de validación (de cada modelo, si es agrupado)
+
+Si la ejecución se interrumpe, la siguiente con la misma configuración continúa
+desde el último checkpoint con el mismo RNG, así que el resultado es el mismo que
+sin la interrupción.
+
+Con un modelo agrupado (métricas por modelo) cada modelo tiene su propia paciencia
+y su mejor estado; el entrenamiento termina cuando todos se detuvieron.
+
+Sin run_dir (run_dir=None) el entrenamiento es solo en memoria: early stopping y
+mejor estado, sin checkpoint ni metrics.csv (p. ej. los modelos por partición de
+scripts/preprocess_judge.py).
+"""
+
+import csv
+import os
+from typing import Any, Dict, List, Optional
+
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from model.train.engine import TensorBatches, evaluate, train_epoch
+
+CHECKPOINT_FILENAME = "checkpoint.pt"
+METRICS_FILENAME = "metrics.csv"
+
+
+def _per_model(value) -> List[float]:
+    return list(value) if isinstance(value, list) else [value]
+
+
+class TrainingController:
+    """
+    Bucle de épocas con early stopping, checkpoints y registro de métricas.
+    """
+
+    def __init__(
+        self,
+        run_dir: Optional[str],
+        names: Optional[List[str]] = None,
+        max_epochs: int = 100,
+        patience: int = 10,
+        min_delta: float = 0.0,
+        checkpoint_every: int = 1,
+        log_every: int = 10,
+        signature: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            run_dir: Directorio de la ejecución (checkpoint y métricas); None = sin archivos
+            names: Nombre de cada modelo (para las columnas y los mensajes)
+            max_epochs: Máximo de épocas
+            patience: Épocas sin mejorar la pérdida de validación antes de detener
+                un modelo (0 = sin early stopping)
+            min_delta: Mejora mínima de la pérdida de validación para contar como mejora
+            checkpoint_every: Épocas entre checkpoints
+            log_every: Épocas entre mensajes de progreso (0 = sin mensajes)
+            signature: Configuración de la ejecución (datos, columnas...); un
+                checkpoint con otra configuración no se reanuda
+        """
+        if max_epochs < 1 or checkpoint_every < 1 or patience < 0:
+            raise ValueError("max_epochs y checkpoint_every deben ser >= 1 y patience >= 0")
+        self.run_dir = run_dir
+        self.names = list(names) if names else [""]
+        self.max_epochs = int(max_epochs)
+        self.patience = int(patience)
+        self.min_delta = float(min_delta)
+        self.checkpoint_every = int(checkpoint_every)
+        self.log_every = int(log_every)
+        self.signature = signature or {}
+        self.checkpoint_path = os.path.join(run_dir, CHECKPOINT_FILENAME) if run_dir else None
+        self.metrics_path = os.path.join(run_dir, METRICS_FILENAME) if run_dir else None
+
+    # ----------------------------------------------------------------------
+    # Checkpoints y métricas
+    # ----------------------------------------------------------------------
+    def _save_checkpoint(self, state: Dict[str, Any]) -> None:
+        tmp = f"{self.checkpoint_path}.tmp"
+        torch.save(state, tmp)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """
+        Raises:
+            ValueError: Si el checkpoint es de otra configuración
+        """
+        if self.checkpoint_path is None or not os.path.exists(self.checkpoint_path):
+            return None
+        checkpoint = torch.load(self.checkpoint_path, map_location="cpu", weights_only=False)
+        if checkpoint.get("signature") != self.signature:
+            raise ValueError(
+                f"{self.checkpoint_path} es de otra configuración de entrenamiento; "
+                "bórrelo o ejecute con --restart"
+            )
+        return checkpoint
+
+    def _metric_columns(self) -> List[str]:
+        columns = ["epoch"]
+        for name in self.names:
+            prefix = f"{name}_" if len(self.names) > 1 else ""
+            columns += [f"{prefix}train_loss", f"{prefix}val_loss", f"{prefix}val_accuracy"]
+        return columns
+
+    def _open_metrics(self, epochs_done: int):
+        """Abre metrics.csv para añadir filas, sin las épocas posteriores al checkpoint."""
+        if self.metrics_path is None:
+            return None, None
+        rows = []
+        if epochs_done and os.path.exists(self.metrics_path):
+            with open(self.metrics_path, newline="") as f:
+                rows = [row for row in csv.reader(f)][1:epochs_done + 1]
+        f = open(self.metrics_path, "w", newline="")
+        writer = csv.writer(f)
+        writer.writerow(self._metric_columns())
+        writer.writerows(rows)
+        f.flush()
+        return f, writer
+
+    # ----------------------------------------------------------------------
+    # Bucle de entrenamiento
+    # ----------------------------------------------------------------------
+    def fit(
+        self,
+        model: nn.Module,
+        optimizer: optim.Optimizer,
+        train_batches: TensorBatches,
+        loss_fn: nn.Module,
+        X_val: torch.Tensor,
+        y_val: torch.Tensor,
+        restart: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Entrena hasta max_epochs o hasta que todos los modelos agoten su paciencia.
+
+        Args:
+            model: Modelo (o modelo agrupado) a entrenar
+            optimizer: Optimizador de sus parámetros
+            train_batches: Lotes de entrenamiento
+            loss_fn: Pérdida (un escalar, o un vector con una por modelo)
+            X_val: Características de validación
+            y_val: Etiquetas de validación
+            restart: Ignorar el checkpoint existente y empezar desde cero
+
+        Returns:
+            Resumen: épocas entrenadas, si se detuvo antes, y por modelo la mejor
+            época, su pérdida y precisión de validación y su estado (best_states)
+
+        Raises:
+            ValueError: Si el checkpoint existente es de otra configuración
+        """
+        if self.run_dir:
+            os.makedirs(self.run_dir, exist_ok=True)
+        n_models = len(self.names)
+        checkpoint = None if restart else self._load_checkpoint()
+
+        if checkpoint is None:
+            epochs_done = 0
+            best_loss = [float("inf")] * n_models
+            best_accuracy = [0.0] * n_models
+            best_epoch = [0] * n_models
+            stale = [0] * n_models
+            best_states = [None] * n_models
+        else:
+            model.load_state_dict(checkpoint["model"])
+            optimizer.load_state_dict(checkpoint["optimizer"])
+            torch.set_rng_state(checkpoint["rng"])
+            if train_batches.generator is not None:
+                train_batches.generator.set_state(checkpoint["generator"])
+            epochs_done = checkpoint["epoch"]
+            best_loss, best_accuracy = checkpoint["best_loss"], checkpoint["best_accuracy"]
+            best_epoch, stale, best_states = checkpoint["best_epoch"], checkpoint["stale"], checkpoint["best_states"]
+            print(f"Reanudando desde la época {epochs_done} ({self.checkpoint_path})")
+
+        metrics_file, metrics_writer = self._open_metrics(epochs_done)
+
+        def checkpoint_state(epoch):
+            return {
+                "signature": self.signature,
+                "epoch": epoch,
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "rng": torch.get_rng_state(),
+                "generator": train_batches.generator.get_state() if train_batches.generator is not None else None,
+                "best_loss": best_loss,
+                "best_accuracy": best_accuracy,
+                "best_epoch": best_epoch,
+                "stale": stale,
+                "best_states": best_states
+            }
+
+        def stopped():
+            return self.patience > 0 and all(count >= self.patience for count in stale)
+
+        epoch = epochs_done
+        try:
+            while epoch < self.max_epochs and not stopped():
+                epoch += 1
+                train_loss = _per_model(train_epoch(model, train_batches, loss_fn, optimizer))
+                metrics = evaluate(model, X_val, y_val, loss_fn)
+                val_loss, val_accuracy = _per_model(metrics["loss"]), _per_model(metrics["accuracy"])
+
+                for i in range(n_models):
+                    if val_loss[i] < best_loss[i] - self.min_delta:
+                        best_loss[i], best_accuracy[i], best_epoch[i], stale[i] = val_loss[i], val_accuracy[i], epoch, 0
+                        best_states[i] = {key: value.detach().clone() for key, value in model.state_dict().items()}
+                    else:
+                        stale[i] += 1
+
+                row = [epoch]
+                for i in range(n_models):
+                    row += [train_loss[i], val_loss[i], val_accuracy[i]]
+                if metrics_writer is not None:
+                    metrics_writer.writerow(row)
+                    metrics_file.flush()
+
+                if self.log_every and epoch % self.log_every == 0:
+                    for i, name in enumerate(self.names):
+                        prefix = f"[{name}] " if name else ""
+                        print(f'{prefix}Época [{epoch}/{self.max_epochs}], Pérdida: {train_loss[i]:.4f}, '
+                              f'Pérdida en Validación: {val_loss[i]:.4f}, Precisión en Validación: {val_accuracy[i]:.2f}%')
+
+                if self.checkpoint_path is not None and epoch % self.checkpoint_every == 0:
+                    self._save_checkpoint(checkpoint_state(epoch))
+        finally:
+            if metrics_file is not None:
+                metrics_file.close()
+
+        early = stopped() and epoch < self.max_epochs
+        if early and self.log_every:
+            print(f"Early stopping en la época {epoch}: la pérdida de validación no mejoró en {self.patience} épocas")
+        if self.checkpoint_path is not None and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+        return {
+            "epochs": epoch,
+            "stopped_early": early,
+            "best_epoch": best_epoch,
+            "best_val_loss": best_loss,
+            "best_val_accuracy": best_accuracy,
+            "best_states": [state if state is not None else model.state_dict() for state in best_states]
+        }
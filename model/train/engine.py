@@ -0,0 +1,189 @@
+# model/train/engine.py
+
+"""
+Motor de entrenamiento de los especialistas con los datos residentes en memoria.
+
+Las redes son MLPs de pocas decenas de pesos: con Dataset + DataLoader casi todo el
+tiempo de una época se iba en indexar fila a fila (__getitem__) y en unir los lotes
+en Python. Aquí las características y las etiquetas se convierten una sola vez a
+tensores; en cada época se baraja con una permutación de índices (un único gather
+de todo el conjunto) y los lotes son cortes contiguos de esos tensores. La
+validación es una sola pasada hacia adelante sobre todo el conjunto.
+
+Las mismas funciones entrenan un modelo agrupado (model/architecture/m_grouped.py):
+sus salidas son (n_modelos, lote, 1), GroupedBCEWithLogitsLoss devuelve una pérdida
+por modelo, train_epoch optimiza su suma y las métricas salen por modelo.
+
+Uso:
+    train_batches = TensorBatches(*to_tensors(X_train, y_train), batch_size=32)
+    optimizer = make_optimizer(model.parameters(), lr=0.0001)
+    for epoch in range(epochs):
+        train_loss = train_epoch(model, train_batches, loss_fn, optimizer)
+        metrics = evaluate(model, X_val_t, y_val_t, loss_fn)
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torch.optim as optim
+
+
+def to_tensors(features, labels) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Convierte características y etiquetas a los tensores del entrenamiento.
+
+    Returns:
+        (características float32 (n, f), etiquetas float32 (n, 1))
+    """
+    features = torch.as_tensor(np.asarray(features, dtype=np.float32))
+    labels = torch.as_tensor(np.asarray(labels, dtype=np.float32)).reshape(-1, 1)
+    return features, labels
+
+
+def stack_features(feature_sets: List[np.ndarray]) -> torch.Tensor:
+    """
+    Características de varios modelos sobre las mismas filas, para un modelo agrupado.
+
+    Args:
+        feature_sets: Una matriz (n, f_i) por modelo
+
+    Returns:
+        Tensor float32 (n, n_modelos, max f_i), con ceros en las columnas de relleno
+    """
+    n_rows = len(feature_sets[0])
+    stacked = np.zeros((n_rows, len(feature_sets), max(f.shape[1] for f in feature_sets)), dtype=np.float32)
+    for i, features in enumerate(feature_sets):
+        stacked[:, i, :features.shape[1]] = features
+    return torch.as_tensor(stacked)
+
+
+class GroupedBCEWithLogitsLoss(nn.Module):
+    """
+    BCEWithLogitsLoss de cada modelo de un modelo agrupado, con su propio pos_weight.
+    Devuelve un vector con la pérdida media de cada modelo; como los modelos no
+    comparten pesos, optimizar la suma da a cada uno el gradiente de su propia pérdida.
+    """
+
+    def __init__(self, pos_weight: torch.Tensor):
+        """
+        Args:
+            pos_weight: pos_weight de cada modelo, (n_modelos,)
+        """
+        super().__init__()
+        self.register_buffer("pos_weight", torch.as_tensor(pos_weight, dtype=torch.float32).view(-1, 1, 1))
+
+    def forward(self, outputs: torch.Tensor, labels: torch.Tensor) -> torch.Tensor:
+        targets = labels.unsqueeze(0).expand_as(outputs)
+        losses = F.binary_cross_entropy_with_logits(outputs, targets, pos_weight=self.pos_weight, reduction="none")
+        return losses.mean(dim=(1, 2))
+
+
+class TensorBatches:
+    """
+    Lotes (características, etiquetas) cortados directamente de dos tensores.
+    Equivale a DataLoader(batch_size, shuffle) sin Dataset: el último lote puede
+    ser más pequeño.
+    """
+
+    def __init__(
+        self,
+        features: torch.Tensor,
+        labels: torch.Tensor,
+        batch_size: int = 32,
+        shuffle: bool = True,
+        generator: Optional[torch.Generator] = None
+    ):
+        """
+        Args:
+            features: Tensor (n, f), o (n, n_modelos, f) para un modelo agrupado
+            labels: Tensor (n, 1)
+            batch_size: Filas por lote
+            shuffle: Barajar las filas en cada época
+            generator: Generador de la permutación (None = el global de torch)
+        """
+        if len(features) != len(labels):
+            raise ValueError(f"{len(features)} filas de características y {len(labels)} etiquetas")
+        self.features = features
+        self.labels = labels
+        self.batch_size = int(batch_size)
+        self.shuffle = shuffle
+        self.generator = generator
+
+    def __len__(self) -> int:
+        return (len(self.labels) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self) -> Iterator[Tuple[torch.Tensor, torch.Tensor]]:
+        features, labels = self.features, self.labels
+        if self.shuffle:
+            order = torch.randperm(len(labels), generator=self.generator)
+            features, labels = features[order], labels[order]
+        for start in range(0, len(labels), self.batch_size):
+            yield features[start:start + self.batch_size], labels[start:start + self.batch_size]
+
+
+def make_optimizer(parameters, lr: float) -> optim.Optimizer:
+    """Adam con la implementación fusionada si esta versión de torch la tiene en CPU."""
+    parameters = list(parameters)
+    try:
+        return optim.Adam(parameters, lr=lr, fused=True)
+    except (RuntimeError, TypeError):
+        return optim.Adam(parameters, lr=lr)
+
+
+def _as_metric(values: torch.Tensor) -> Union[float, List[float]]:
+    """Un float para un modelo, una lista (uno por modelo) para un modelo agrupado."""
+    return values.item() if values.ndim == 0 else values.tolist()
+
+
+def train_epoch(
+    model: nn.Module,
+    batches: TensorBatches,
+    loss_fn: nn.Module,
+    optimizer: optim.Optimizer
+) -> Union[float, List[float]]:
+    """
+    Una época de entrenamiento. Si loss_fn devuelve una pérdida por modelo, se
+    optimiza su suma.
+
+    Returns:
+        Pérdida media de la época (ponderada por el tamaño de cada lote); una por
+        modelo si loss_fn devuelve un vector
+    """
+    model.train()
+    total = None
+    for features, labels in batches:
+        loss = loss_fn(model(features), labels)
+        optimizer.zero_grad()
+        loss.sum().backward()
+        optimizer.step()
+        batch_total = loss.detach() * len(labels)
+        total = batch_total if total is None else total + batch_total
+    return _as_metric(total / len(batches.labels))
+
+
+def evaluate(
+    model: nn.Module,
+    features: torch.Tensor,
+    labels: torch.Tensor,
+    loss_fn: Optional[nn.Module] = None
+) -> Dict[str, float]:
+    """
+    Pérdida y precisión (umbral 0.5) sobre un conjunto, en una sola pasada.
+
+    Returns:
+        {"accuracy": porcentaje de aciertos, "loss": pérdida (si se pasa loss_fn)};
+        con un modelo agrupado, listas con un valor por modelo
+    """
+    model.eval()
+    with torch.no_grad():
+        logits = model(features)
+        predicted = (torch.sigmoid(logits) > 0.5).float()
+        hits = (predicted == labels).float()
+        accuracy = hits.mean(dim=(1, 2)) if hits.ndim == 3 else hits.mean()
+        metrics = {"accuracy": _as_metric(100 * accuracy)}
+        if loss_fn is not None:
+            metrics["loss"] = _as_metric(loss_fn(logits, labels))
+    return metrics
@@ -0,0 +1,80 @@
+# model/train/hyperparams.py
+
+"""
+Hiperparámetros de entrenamiento de los especialistas y del juez.
+
+Los valores por defecto son los de siempre; model/train/search.py --export guarda
+los mejores de una búsqueda en model/train/hyperparams.json, y ese archivo tiene
+prioridad. train_specialists.py los incorpora a cada entrada de SPECIALIST_CONFIG
+(learning_rate, batch_size, hidden_sizes) y train_judge.py los usa para el
+LogisticRegression.
+
+Formato de hyperparams.json:
+    {
+      "specialists": {"orbital": {"learning_rate": 0.001, "batch_size": 64, "hidden_sizes": [32, 16]}},
+      "judge": {"C": 0.1, "class_weight": "balanced"}
+    }
+"""
+
+import json
+import os
+
+from model.architecture.m_common import DEFAULT_HIDDEN_SIZES
+
+HYPERPARAMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hyperparams.json")
+
+DEFAULT_SPECIALIST_HYPERPARAMS = {
+    "learning_rate": 0.0001,
+    "batch_size": 32,
+    "hidden_sizes": DEFAULT_HIDDEN_SIZES
+}
+
+DEFAULT_JUDGE_HYPERPARAMS = {
+    "C": 1.0,
+    "class_weight": "balanced"
+}
+
+
+def load_hyperparams(path=HYPERPARAMS_PATH):
+    """Contenido de hyperparams.json ({} si no existe)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def specialist_hyperparams(name, path=HYPERPARAMS_PATH):
+    """Hiperparámetros de un especialista: los guardados sobre los valores por defecto."""
+    params = dict(DEFAULT_SPECIALIST_HYPERPARAMS)
+    params.update(load_hyperparams(path).get("specialists", {}).get(name, {}))
+    params["hidden_sizes"] = tuple(params["hidden_sizes"])
+    return params
+
+
+def judge_hyperparams(path=HYPERPARAMS_PATH):
+    """Parámetros del LogisticRegression del juez: los guardados sobre los valores por defecto."""
+    params = dict(DEFAULT_JUDGE_HYPERPARAMS)
+    params.update(load_hyperparams(path).get("judge", {}))
+    return params
+
+
+def save_hyperparams(section, params, name=None, path=HYPERPARAMS_PATH):
+    """
+    Guarda hiperparámetros en hyperparams.json conservando el resto del archivo.
+
+    Args:
+        section: "specialists" o "judge"
+        params: Hiperparámetros a guardar
+        name: Especialista (solo para "specialists")
+        path: Archivo de destino
+    """
+    hyperparams = load_hyperparams(path)
+    params = {key: list(value) if isinstance(value, tuple) else value for key, value in params.items()}
+    if section == "specialists":
+        hyperparams.setdefault("specialists", {})[name] = params
+    else:
+        hyperparams[section] = params
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(hyperparams, f, indent=2)
+    os.replace(tmp, path)
@@ -0,0 +1,448 @@
+# model/train/search.py
+
+"""
+Búsqueda de hiperparámetros de los especialistas y del juez.
+
+Especialistas: learning_rate, batch_size y hidden_sizes (SEARCH_SPACE). Las
+configuraciones son la rejilla completa (--strategy grid) o una muestra aleatoria
+de --trials configuraciones de ella (--strategy random). Los ensayos se podan con
+successive halving: todos entrenan --min-epochs épocas, solo el mejor 1/--eta (por
+pérdida de validación) sigue hasta --eta veces más épocas, y así hasta
+--max-epochs; cada ronda continúa el entrenamiento de los supervivientes desde su
+estado (modelo, optimizador y generador), no desde cero. Además un ensayo se
+detiene si su pérdida de validación no mejora en --patience épocas. Con
+--no-prune todos los ensayos llegan a --max-epochs (solo con la paciencia).
+
+Los datos se cargan y se parten una vez (la misma partición que train_specialist)
+en tensores antes del fork; los ensayos de cada ronda se reparten en un pool de
+procesos que los heredan, con cpu_count // workers hilos de torch cada uno.
+
+Juez: C y class_weight del LogisticRegression (JUDGE_SEARCH_SPACE), evaluados con
+validación cruzada estratificada sobre judge_set; un ensayo por tarea del pool.
+
+Cada búsqueda escribe outputs/search/<objetivo>_<fecha>.csv con una fila por
+ensayo: configuración, épocas, mejor época, pérdida y precisión de validación,
+segundos y estado (completed / stopped / pruned). Con --export la mejor
+configuración se guarda en model/train/hyperparams.json (de donde la leen
+SPECIALIST_CONFIG y train_judge.py) y sus pesos en outputs/weights/.
+
+Uso:
+    python model/train/search.py orbital --trials 16 --workers 4
+    python model/train/search.py estelar --strategy grid --max-epochs 300 --export
+    python model/train/search.py orbital --hidden-sizes 16,8 32,16 --learning-rates 0.001 --export
+    python model/train/search.py judge --export
+"""
+
+import argparse
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_validate, train_test_split
+from sklearn.utils import class_weight
+
+# --- Añadir la ruta del proyecto al path ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+from model.train import train_specialists
+from model.train.engine import TensorBatches, to_tensors, make_optimizer, train_epoch, evaluate
+from model.train.hyperparams import save_hyperparams
+from api.services.runtime import export_numpy_bundle
+from model.train.train_specialists import SPECIALIST_CONFIG, MAX_EPOCHS, PATIENCE, init_worker, load_training_data
+
+# --------------------------------------------------------------------------
+# 1. CONFIGURACIÓN
+# --------------------------------------------------------------------------
+SEARCH_OUTPUT_PATH = os.path.join(BASE_DIR, "outputs", "search")
+JUDGE_DATA_PATH = os.path.join(BASE_DIR, "data", "processed", "judge_set")
+JUDGE_FILENAME = "judge_model.joblib"
+
+SEARCH_SPACE = {
+    "learning_rate": [0.0001, 0.0003, 0.001, 0.003],
+    "batch_size": [32, 64, 128, 256],
+    "hidden_sizes": [(8, 4), (16, 8), (32, 16), (64, 32)]
+}
+
+JUDGE_SEARCH_SPACE = {
+    "C": [0.001, 0.01, 0.1, 1.0, 10.0, 100.0],
+    "class_weight": ["balanced", None]
+}
+
+# Successive halving: épocas de la primera ronda y factor de reducción por ronda
+MIN_EPOCHS = 10
+ETA = 3
+
+# Particiones de la validación cruzada del juez
+JUDGE_FOLDS = 5
+
+
+# --------------------------------------------------------------------------
+# 2. CONFIGURACIONES
+# --------------------------------------------------------------------------
+def candidate_configs(space, strategy="random", trials=16, seed=0):
+    """
+    Configuraciones a evaluar.
+
+    Args:
+        space: {hiperparámetro: lista de valores}
+        strategy: "grid" (todas las combinaciones) o "random" (una muestra sin repetir)
+        trials: Configuraciones de la muestra aleatoria
+        seed: Semilla de la muestra
+
+    Returns:
+        Lista de dicts {hiperparámetro: valor}
+
+    Raises:
+        ValueError: Si la estrategia no existe
+    """
+    grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    if strategy == "grid":
+        return grid
+    if strategy == "random":
+        return random.Random(seed).sample(grid, min(trials, len(grid)))
+    raise ValueError(f"Estrategia desconocida: {strategy}. Opciones: grid, random")
+
+
+def format_value(value):
+    if value is None:
+        return "None"
+    return "x".join(str(v) for v in value) if isinstance(value, (tuple, list)) else value
+
+
+# --------------------------------------------------------------------------
+# 3. ENSAYOS DE UN ESPECIALISTA (en los workers)
+# --------------------------------------------------------------------------
+# Datos que heredan los workers (fork); solo se leen
+_shared = {}
+
+
+def _specialist_data(name, X_full, y_full):
+    """Tensores de entrenamiento y validación con la partición de train_specialist."""
+    config = SPECIALIST_CONFIG[name]
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_full[config['feature_columns']].values, y_full, test_size=0.2, random_state=42, stratify=y_full
+    )
+    weights = class_weight.compute_class_weight('balanced', classes=np.unique(y_train), y=y_train)
+    X_train_t, y_train_t = to_tensors(X_train, y_train)
+    X_val_t, y_val_t = to_tensors(X_val, y_val)
+    return {
+        "name": name,
+        "X_train": X_train_t,
+        "y_train": y_train_t,
+        "X_val": X_val_t,
+        "y_val": y_val_t,
+        "pos_weight": torch.tensor(weights[1], dtype=torch.float32)
+    }
+
+
+def _build(params, seed):
+    """Modelo, optimizador y lotes de un ensayo, con su propia semilla."""
+    config = SPECIALIST_CONFIG[_shared["name"]]
+    torch.manual_seed(seed)
+    model = config['model_class'](input_features=_shared["X_train"].shape[1], hidden_sizes=params["hidden_sizes"])
+    optimizer = make_optimizer(model.parameters(), lr=params["learning_rate"])
+    batches = TensorBatches(_shared["X_train"], _shared["y_train"], batch_size=params["batch_size"],
+                            shuffle=True, generator=torch.Generator().manual_seed(seed))
+    return model, optimizer, batches
+
+
+def run_trial(task):
+    """
+    Entrena un ensayo hasta `epochs` épocas en total, desde cero o desde su estado
+    de la ronda anterior, y devuelve su nuevo estado.
+
+    Args:
+        task: (trial, params, epochs, patience, seed, state)
+
+    Returns:
+        Estado del ensayo: pesos, optimizador y generador para continuar, épocas,
+        mejor época con su pérdida, precisión y pesos, y segundos acumulados
+    """
+    trial, params, epochs, patience, seed, state = task
+    started = time.time()
+    model, optimizer, batches = _build(params, seed + trial)
+    loss_fn = nn.BCEWithLogitsLoss(pos_weight=_shared["pos_weight"])
+
+    if state is None:
+        state = {"epochs": 0, "best_loss": float("inf"), "best_accuracy": 0.0, "best_epoch": 0,
+                 "stale": 0, "best_state": None, "seconds": 0.0}
+    else:
+        model.load_state_dict(state["model"])
+        optimizer.load_state_dict(state["optimizer"])
+        batches.generator.set_state(state["generator"])
+
+    while state["epochs"] < epochs and not (patience and state["stale"] >= patience):
+        train_epoch(model, batches, loss_fn, optimizer)
+        metrics = evaluate(model, _shared["X_val"], _shared["y_val"], loss_fn)
+        state["epochs"] += 1
+        if metrics["loss"] < state["best_loss"]:
+            state.update(best_loss=metrics["loss"], best_accuracy=metrics["accuracy"],
+                         best_epoch=state["epochs"], stale=0)
+            state["best_state"] = {key: value.clone() for key, value in model.state_dict().items()}
+        else:
+            state["stale"] += 1
+
+    state.update(model=model.state_dict(), optimizer=optimizer.state_dict(), generator=batches.generator.get_state())
+    state["seconds"] += time.time() - started
+    return state
+
+
+# --------------------------------------------------------------------------
+# 4. ENSAYOS DEL JUEZ (en los workers)
+# --------------------------------------------------------------------------
+def run_judge_trial(task):
+    """Validación cruzada de un LogisticRegression con los parámetros del ensayo."""
+    trial, params = task
+    started = time.time()
+    scores = cross_validate(
+        LogisticRegression(random_state=42, **params), _shared["X"], _shared["y"],
+        cv=StratifiedKFold(n_splits=JUDGE_FOLDS, shuffle=True, random_state=42),
+        scoring=("neg_log_loss", "accuracy")
+    )
+    return {
+        "best_loss": float(-scores["test_neg_log_loss"].mean()),
+        "best_accuracy": float(100 * scores["test_accuracy"].mean()),
+        "seconds": time.time() - started
+    }
+
+
+# --------------------------------------------------------------------------
+# 5. BÚSQUEDA
+# --------------------------------------------------------------------------
+def _map(pool, function, tasks):
+    return list(pool.map(function, tasks)) if pool is not None else [function(task) for task in tasks]
+
+
+def _pool(workers, torch_threads):
+    if workers == 1:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=init_worker,
+        initargs=(torch_threads,)
+    )
+
+
+def search_specialist(name, configs, X_full, y_full, workers=1, torch_threads=None, max_epochs=MAX_EPOCHS,
+                      min_epochs=MIN_EPOCHS, eta=ETA, patience=PATIENCE, prune=True, seed=0):
+    """
+    Evalúa configuraciones de un especialista con successive halving.
+
+    Args:
+        name: Especialista de SPECIALIST_CONFIG
+        configs: Configuraciones (learning_rate, batch_size, hidden_sizes)
+        X_full: Características de entrenamiento (todas las columnas)
+        y_full: Etiquetas de entrenamiento
+        workers: Procesos (1 = en el proceso actual)
+        torch_threads: Hilos de torch por worker (None = cpu_count // workers)
+        max_epochs: Épocas de los ensayos que llegan a la última ronda
+        min_epochs: Épocas de la primera ronda
+        eta: En cada ronda sigue el mejor 1/eta de los ensayos, con eta veces más épocas
+        patience: Épocas sin mejorar antes de detener un ensayo (0 = sin paciencia)
+        prune: Successive halving; si es False todos entrenan max_epochs
+        seed: Semilla base (cada ensayo usa seed + su número)
+
+    Returns:
+        (lista con el estado de cada ensayo, segundos de pared)
+
+    Raises:
+        ValueError: Si el especialista no existe o los parámetros no son válidos
+    """
+    if name not in SPECIALIST_CONFIG:
+        raise ValueError(f"Especialista desconocido: {name}. Opciones: {list(SPECIALIST_CONFIG)}")
+    if min_epochs < 1 or max_epochs < min_epochs or eta < 2:
+        raise ValueError("Se necesita 1 <= min_epochs <= max_epochs y eta >= 2")
+    workers = max(1, min(workers, len(configs)))
+    torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+
+    states = [None] * len(configs)
+    status = ["pruned"] * len(configs)
+    alive = list(range(len(configs)))
+    budget = min_epochs if prune else max_epochs
+
+    started = time.time()
+    _shared.update(_specialist_data(name, X_full, y_full))
+    pool = _pool(workers, torch_threads)
+    try:
+        while True:
+            print(f"Ronda de {budget} épocas: {len(alive)} ensayos")
+            tasks = [(trial, configs[trial], budget, patience, seed, states[trial]) for trial in alive]
+            for trial, state in zip(alive, _map(pool, run_trial, tasks)):
+                states[trial] = state
+            if budget >= max_epochs:
+                break
+            ranked = sorted(alive, key=lambda trial: states[trial]["best_loss"])
+            alive = ranked[:max(1, math.ceil(len(ranked) / eta))]
+            budget = min(budget * eta, max_epochs)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        _shared.clear()
+
+    for trial in alive:
+        status[trial] = "completed" if states[trial]["epochs"] >= max_epochs else "stopped"
+    for trial, state in enumerate(states):
+        state["status"] = status[trial]
+    return states, time.time() - started
+
+
+def search_judge(configs, X, y, workers=1):
+    """
+    Evalúa configuraciones del juez con validación cruzada (sin poda: cada ajuste
+    es de milisegundos).
+
+    Returns:
+        (lista con las métricas de cada ensayo, segundos de pared)
+    """
+    workers = max(1, min(workers, len(configs)))
+    started = time.time()
+    _shared.update(X=X, y=y)
+    pool = _pool(workers, 1)
+    try:
+        states = _map(pool, run_judge_trial, list(enumerate(configs)))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        _shared.clear()
+    for state in states:
+        state["status"] = "completed"
+    return states, time.time() - started
+
+
+def results_table(configs, states):
+    """Una fila por ensayo, de mejor a peor pérdida de validación."""
+    rows = []
+    for trial, (params, state) in enumerate(zip(configs, states)):
+        row = {"trial": trial}
+        row.update({key: format_value(value) for key, value in params.items()})
+        if "epochs" in state:
+            row.update(epochs=state["epochs"], best_epoch=state["best_epoch"])
+        row.update(val_loss=state["best_loss"], val_accuracy=state["best_accuracy"],
+                   seconds=state["seconds"], status=state["status"])
+        rows.append(row)
+    return pd.DataFrame(rows).sort_values("val_loss", kind="stable").reset_index(drop=True)
+
+
+def write_results(table, target, output_path=SEARCH_OUTPUT_PATH):
+    """Guarda la tabla en <output_path>/<objetivo>_<fecha>.csv."""
+    os.makedirs(output_path, exist_ok=True)
+    path = os.path.join(output_path, f"{target}_{time.strftime('%Y%m%d-%H%M%S')}.csv")
+    table.to_csv(path, index=False)
+    return path
+
+
+# --------------------------------------------------------------------------
+# 6. EXPORTACIÓN
+# --------------------------------------------------------------------------
+def export_specialist(name, params, state):
+    """Guarda la configuración en hyperparams.json y los pesos de su mejor época en outputs/weights."""
+    config = SPECIALIST_CONFIG[name]
+    model = config['model_class'](input_features=len(config['feature_columns']), hidden_sizes=params["hidden_sizes"])
+    model.load_state_dict(state["best_state"])
+    path = os.path.join(train_specialists.MODEL_OUTPUT_PATH, config['output_filename'])
+    torch.save(model.state_dict(), path)
+    export_numpy_bundle(model, path)
+    save_hyperparams("specialists", params, name)
+    config.update(params)
+    return path
+
+
+def export_judge(params, X, y):
+    """Guarda los parámetros en hyperparams.json y el juez ajustado con todo judge_set."""
+    model = LogisticRegression(random_state=42, **params).fit(X, y)
+    path = os.path.join(train_specialists.MODEL_OUTPUT_PATH, JUDGE_FILENAME)
+    joblib.dump(model, path)
+    export_numpy_bundle(model, path)
+    save_hyperparams("judge", params)
+    return path
+
+
+# --------------------------------------------------------------------------
+# 7. PROGRAMA PRINCIPAL
+# --------------------------------------------------------------------------
+def parse_hidden_sizes(value):
+    try:
+        return tuple(int(size) for size in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Capas ocultas no válidas: {value} (formato: 16,8)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Búsqueda de hiperparámetros de los especialistas y del juez")
+    parser.add_argument("target", choices=[*SPECIALIST_CONFIG, "judge"], help="Especialista o juez")
+    parser.add_argument("--strategy", choices=["grid", "random"], default="random")
+    parser.add_argument("--trials", type=int, default=16, help="Configuraciones de la búsqueda aleatoria")
+    parser.add_argument("--learning-rates", nargs="+", type=float, help="Sustituye a los de SEARCH_SPACE")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, help="Sustituye a los de SEARCH_SPACE")
+    parser.add_argument("--hidden-sizes", nargs="+", type=parse_hidden_sizes,
+                        help="Sustituye a los de SEARCH_SPACE, p. ej. 16,8 32,16")
+    parser.add_argument("--max-epochs", type=int, default=MAX_EPOCHS, help="Épocas de la última ronda")
+    parser.add_argument("--min-epochs", type=int, default=MIN_EPOCHS, help="Épocas de la primera ronda")
+    parser.add_argument("--eta", type=int, default=ETA, help="Factor de reducción del successive halving")
+    parser.add_argument("--patience", type=int, default=PATIENCE,
+                        help="Épocas sin mejorar antes de detener un ensayo (0 = sin paciencia)")
+    parser.add_argument("--no-prune", action="store_true", help="Entrenar todos los ensayos hasta --max-epochs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Ensayos en paralelo")
+    parser.add_argument("--torch-threads", type=int, default=None,
+                        help="Hilos de torch por worker (por defecto cpu_count // workers)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--export", action="store_true",
+                        help="Guardar la mejor configuración en hyperparams.json y sus pesos en outputs/weights")
+    args = parser.parse_args()
+
+    try:
+        if args.target == "judge":
+            X_judge = pd.read_csv(os.path.join(JUDGE_DATA_PATH, "X_judge.csv"))
+            y_judge = pd.read_csv(os.path.join(JUDGE_DATA_PATH, "y_judge.csv")).values.ravel()
+            configs = candidate_configs(JUDGE_SEARCH_SPACE, args.strategy, args.trials, args.seed)
+            print(f"\n🔎 Búsqueda para el juez: {len(configs)} configuraciones, {args.workers} workers")
+            states, seconds = search_judge(configs, X_judge, y_judge, args.workers)
+        else:
+            space = dict(SEARCH_SPACE)
+            for key, values in (("learning_rate", args.learning_rates), ("batch_size", args.batch_sizes),
+                                ("hidden_sizes", args.hidden_sizes)):
+                if values:
+                    space[key] = values
+            configs = candidate_configs(space, args.strategy, args.trials, args.seed)
+            X_train_full, y_train_full = load_training_data()
+            print(f"\n🔎 Búsqueda para '{args.target}': {len(configs)} configuraciones, {args.workers} workers")
+            states, seconds = search_specialist(
+                args.target, configs, X_train_full, y_train_full, args.workers, args.torch_threads,
+                args.max_epochs, args.min_epochs, args.eta, args.patience, not args.no_prune, args.seed
+            )
+    except (ValueError, FileNotFoundError) as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
+
+    table = results_table(configs, states)
+    path = write_results(table, args.target)
+    print(f"\n--- RESULTADOS ({seconds:.1f}s, suma de ensayos {sum(s['seconds'] for s in states):.1f}s) ---")
+    print(table.head(10).to_string(index=False))
+    print(f"\nTabla completa guardada en: {path}")
+
+    best = int(table.loc[0, "trial"])
+    print(f"\nMejor configuración: {configs[best]}")
+    if args.export:
+        if args.target == "judge":
+            output = export_judge(configs[best], X_judge, y_judge)
+        else:
+            output = export_specialist(args.target, configs[best], states[best])
+        print(f"✅ Configuración guardada en hyperparams.json y modelo en: {output} (y su .npz para el backend NumPy)")
+    print("\n🎉 ¡Búsqueda completada! 🎉")
+
+
+if __name__ == "__main__":
+    main()
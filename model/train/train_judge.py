@@ -4,6 +4,7 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
+import sys
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report
 
@@ -11,6 +12,11 @@ from sklearn.metrics import classification_report
 # 1. CONFIGURACIÓN Y RUTAS
 # --------------------------------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+from model.train.hyperparams import judge_hyperparams
+from api.services.runtime import export_numpy_bundle
+
 PROCESSED_BASE_PATH = os.path.join(BASE_DIR, "data", "processed")
 JUDGE_DATA_PATH = os.path.join(PROCESSED_BASE_PATH, "judge_set")
 WEIGHTS_PATH = os.path.join(BASE_DIR, "outputs", "weights")
@@ -30,9 +36,11 @@ if __name__ == "__main__":
     y_judge = pd.read_csv(y_judge_path).values.ravel() # .ravel() para convertirlo a un array 1D
 
     # Instanciar y entrenar el modelo de Regresión Logística
-    # Usamos class_weight='balanced' para manejar el desbalance de clases
-    print("\nEntrenando el modelo...")
-    judge_model = LogisticRegression(random_state=42, class_weight='balanced')
+    # Por defecto class_weight='balanced' para manejar el desbalance de clases;
+    # model/train/hyperparams.json (search.py --export) puede cambiar C y class_weight
+    params = judge_hyperparams()
+    print(f"\nEntrenando el modelo ({params})...")
+    judge_model = LogisticRegression(random_state=42, **params)
     judge_model.fit(X_judge, y_judge)
     
     print("¡Entrenamiento completado!")
@@ -45,5 +53,6 @@ if __name__ == "__main__":
     # Guardar el modelo entrenado
     model_save_path = os.path.join(WEIGHTS_PATH, "judge_model.joblib")
     joblib.dump(judge_model, model_save_path)
+    export_numpy_bundle(judge_model, model_save_path)
     
-    print(f"\n✅ Modelo del Juez guardado en: '{model_save_path}'")
\ No newline at end of file
+    print(f"\n✅ Modelo del Juez guardado en: '{model_save_path}' (y su .npz para el backend NumPy)")
\ No newline at end of file
@@ -1,11 +1,42 @@
 # nasaSpace2025/model/train/train_specialists.py
 
+"""
+Entrenamiento de las redes especialistas (SPECIALIST_CONFIG).
+
+Sin argumentos muestra el menú interactivo. Con argumentos entrena los especialistas
+indicados sin preguntar, en paralelo en un pool de procesos: los datos se cargan una
+vez antes del fork y los workers los heredan (solo lectura), y cada worker usa
+cpu_count // workers hilos de torch para que no compitan por los núcleos.
+
+Con --grouped los especialistas se entrenan juntos como un solo modelo agrupado
+(model/architecture/m_grouped.py): cada lote actualiza todos en una única pasada
+hacia adelante y hacia atrás, y los .pth resultantes son los de siempre.
+
+El entrenamiento se detiene cuando la pérdida de validación deja de mejorar
+(--patience épocas) y se guardan los pesos de la mejor época. Cada especialista (o
+el modelo agrupado) tiene su directorio en outputs/training/ con metrics.csv (una
+fila por época) y un checkpoint.pt mientras entrena: si la ejecución se interrumpe,
+la siguiente con los mismos especialistas continúa desde ahí (--restart para
+empezar de cero). Cada ejecución escribe además un resumen en outputs/training/.
+
+Uso:
+    python model/train/train_specialists.py                         # menú
+    python model/train/train_specialists.py --all                   # todos, en paralelo
+    python model/train/train_specialists.py orbital estelar --workers 2
+    python model/train/train_specialists.py --all --grouped         # un solo modelo agrupado
+    python model/train/train_specialists.py --all --patience 0      # 100 épocas, sin early stopping
+"""
+
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 import torch
 import torch.nn as nn
-import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
 from sklearn.model_selection import train_test_split
 from sklearn.utils import class_weight
 import os
@@ -21,11 +52,19 @@ from model.architecture.m_fotometria import FotometriaNet
 from model.architecture.m_orbital import OrbitalNet
 from model.architecture.m_estrella import PropiedadesEstelaresNet
 from model.architecture.m_falsospositivos import FalsosPositivosNet
+from model.architecture.m_grouped import GroupedSpecialistNet
+from model.train.controller import TrainingController
+from api.services.runtime import export_numpy_bundle
+from model.train.hyperparams import specialist_hyperparams
+from model.train.engine import (
+    TensorBatches, GroupedBCEWithLogitsLoss, to_tensors, stack_features, make_optimizer
+)
 
 # --- Configuración de Rutas ---
 PROCESSED_BASE_PATH = os.path.join(BASE_DIR, "data", "processed")
 TRAIN_PATH = os.path.join(PROCESSED_BASE_PATH, "train_set")
 MODEL_OUTPUT_PATH = os.path.join(BASE_DIR, "outputs", "weights")
+TRAINING_OUTPUT_PATH = os.path.join(BASE_DIR, "outputs", "training")
 os.makedirs(MODEL_OUTPUT_PATH, exist_ok=True)
 
 # --- CONFIGURACIÓN DE ESPECIALISTAS ---
@@ -73,18 +112,175 @@ SPECIALIST_CONFIG = {
     }
 }
 
-# --- Dataset de PyTorch (Sin cambios) ---
-class KeplerDataset(Dataset):
-    def __init__(self, features, labels):
-        self.features = torch.tensor(features, dtype=torch.float32)
-        self.labels = torch.tensor(labels, dtype=torch.float32)
-    def __len__(self):
-        return len(self.labels)
-    def __getitem__(self, idx):
-        return self.features[idx], self.labels[idx].unsqueeze(-1)
-
-# --- Función de Entrenamiento Reutilizable (Sin cambios) ---
-def train_specialist(name, config, X_full, y_full):
+# --- Hiperparámetros ---
+# learning_rate, batch_size y hidden_sizes de cada especialista: los de
+# model/train/hyperparams.json (model/train/search.py --export) o los de siempre
+for _name, _config in SPECIALIST_CONFIG.items():
+    _config.update(specialist_hyperparams(_name))
+
+# --- Parámetros de Entrenamiento ---
+# Máximo de épocas; el early stopping corta antes si la pérdida de validación deja de bajar
+MAX_EPOCHS = 100
+# Épocas sin mejorar la pérdida de validación antes de detener (0 = sin early stopping)
+PATIENCE = 10
+# Épocas entre checkpoints en outputs/training/<especialista>/checkpoint.pt
+CHECKPOINT_EVERY = 1
+
+
+def run_signature(names, configs, y_full):
+    """Configuración que debe coincidir para reanudar desde un checkpoint."""
+    return {
+        "names": list(names),
+        "feature_columns": [list(config['feature_columns']) for config in configs],
+        "rows": int(len(y_full)),
+        "hyperparams": [
+            [config['learning_rate'], config['batch_size'], list(config['hidden_sizes'])] for config in configs
+        ]
+    }
+
+def shared_hyperparams(configs):
+    """
+    (learning_rate, batch_size, hidden_sizes) comunes a todos los especialistas, o
+    None si difieren (el modelo agrupado entrena todos con los mismos).
+    """
+    shared = {(config['learning_rate'], config['batch_size'], tuple(config['hidden_sizes'])) for config in configs}
+    return shared.pop() if len(shared) == 1 else None
+
+# --- Funciones de Entrenamiento Reutilizables ---
+# Los datos se quedan en tensores completos (model/train/engine.py): sin Dataset ni
+# DataLoader, y la validación es una sola pasada por época. El bucle de épocas es el
+# de TrainingController (model/train/controller.py): early stopping, checkpoints para
+# reanudar y metrics.csv en outputs/training/<especialista>/.
+def fit_specialist(name, config, X_train, y_train, X_val, y_val, run_dir=None, max_epochs=MAX_EPOCHS,
+                   patience=PATIENCE, checkpoint_every=CHECKPOINT_EVERY, restart=False, log_every=10,
+                   signature=None):
+    """
+    Entrena un especialista con una partición ya hecha.
+
+    Args:
+        name: Especialista (para los mensajes)
+        config: Su configuración de SPECIALIST_CONFIG
+        X_train, y_train: Características (solo sus columnas) y etiquetas de entrenamiento
+        X_val, y_val: Lo mismo para la validación (early stopping y mejor época)
+        run_dir: Directorio de checkpoint y métricas (None = solo en memoria)
+        max_epochs, patience, checkpoint_every, restart, log_every, signature: Los
+            de TrainingController
+
+    Returns:
+        (modelo con los pesos de su mejor época, resultado de TrainingController.fit)
+    """
+    train_batches = TensorBatches(*to_tensors(X_train, y_train), batch_size=config['batch_size'], shuffle=True)
+    X_val_t, y_val_t = to_tensors(X_val, y_val)
+
+    input_size = X_train.shape[1]
+    model = config['model_class'](input_features=input_size, hidden_sizes=config['hidden_sizes'])
+    
+    weights = class_weight.compute_class_weight('balanced', classes=np.unique(y_train), y=y_train)
+    class_weights = torch.tensor(weights, dtype=torch.float32)
+    loss_fn = nn.BCEWithLogitsLoss(pos_weight=class_weights[1])
+    
+    optimizer = make_optimizer(model.parameters(), lr=config['learning_rate'])
+
+    controller = TrainingController(
+        run_dir,
+        names=[name],
+        max_epochs=max_epochs,
+        patience=patience,
+        checkpoint_every=checkpoint_every,
+        log_every=log_every,
+        signature=signature
+    )
+    result = controller.fit(model, optimizer, train_batches, loss_fn, X_val_t, y_val_t, restart=restart)
+    result["metrics"] = controller.metrics_path
+    model.load_state_dict(result["best_states"][0])
+    return model, result
+
+
+def fit_grouped(names, configs, features_train, y_train, features_val, y_val, run_dir=None,
+                max_epochs=MAX_EPOCHS, patience=PATIENCE, checkpoint_every=CHECKPOINT_EVERY, restart=False,
+                log_every=10, signature=None):
+    """
+    Entrena varios especialistas a la vez como un GroupedSpecialistNet, con una
+    partición ya hecha (las mismas filas para todos).
+
+    Args:
+        names: Especialistas
+        configs: Sus configuraciones de SPECIALIST_CONFIG
+        features_train: Características de entrenamiento de cada especialista (sus columnas)
+        y_train: Etiquetas de entrenamiento
+        features_val, y_val: Lo mismo para la validación
+        run_dir, max_epochs, patience, checkpoint_every, restart, log_every, signature:
+            Como en fit_specialist
+
+    Returns:
+        (un modelo por especialista con los pesos de su mejor época, resultado de
+        TrainingController.fit)
+
+    Raises:
+        ValueError: Si los especialistas no comparten learning_rate, batch_size y
+            hidden_sizes (el modelo agrupado entrena todos con los mismos)
+    """
+    shared = shared_hyperparams(configs)
+    if shared is None:
+        raise ValueError("El entrenamiento agrupado necesita los mismos learning_rate, batch_size y "
+                         "hidden_sizes en todos los especialistas; entrénelos por separado")
+    learning_rate, batch_size, hidden_sizes = shared
+
+    _, y_train_t = to_tensors(np.empty((len(y_train), 0)), y_train)
+    _, y_val_t = to_tensors(np.empty((len(y_val), 0)), y_val)
+    train_batches = TensorBatches(stack_features(features_train), y_train_t, batch_size=batch_size, shuffle=True)
+    X_val_t = stack_features(features_val)
+
+    input_sizes = [features.shape[1] for features in features_train]
+    models = [config['model_class'](input_features=size, hidden_sizes=hidden_sizes)
+              for config, size in zip(configs, input_sizes)]
+    output_sigmoid = [isinstance(model.network[-1], nn.Sigmoid) for model in models]
+    grouped = GroupedSpecialistNet.from_models(models, input_sizes, output_sigmoid)
+
+    weights = class_weight.compute_class_weight('balanced', classes=np.unique(y_train), y=y_train)
+    loss_fn = GroupedBCEWithLogitsLoss(torch.full((len(names),), float(weights[1])))
+
+    optimizer = make_optimizer(grouped.parameters(), lr=learning_rate)
+
+    controller = TrainingController(
+        run_dir,
+        names=names,
+        max_epochs=max_epochs,
+        patience=patience,
+        checkpoint_every=checkpoint_every,
+        log_every=log_every,
+        signature=signature
+    )
+    result = controller.fit(grouped, optimizer, train_batches, loss_fn, X_val_t, y_val_t, restart=restart)
+    result["metrics"] = controller.metrics_path
+    for i, model in enumerate(models):
+        # Cada modelo sale de la copia del modelo agrupado de su mejor época
+        grouped.load_state_dict(result["best_states"][i])
+        model.load_state_dict(grouped.state_dicts()[i])
+    return models, result
+
+
+def train_specialist(name, config, X_full, y_full, max_epochs=MAX_EPOCHS, patience=PATIENCE,
+                     checkpoint_every=CHECKPOINT_EVERY, restart=False):
+    """
+    Entrena un especialista y guarda en MODEL_OUTPUT_PATH los pesos de su mejor
+    época (menor pérdida de validación).
+
+    Args:
+        name: Especialista de SPECIALIST_CONFIG
+        config: Su configuración
+        X_full: Características de entrenamiento (todas las columnas)
+        y_full: Etiquetas de entrenamiento
+        max_epochs: Máximo de épocas
+        patience: Épocas sin mejorar antes de detener (0 = sin early stopping)
+        checkpoint_every: Épocas entre checkpoints
+        restart: Ignorar un checkpoint existente y empezar desde cero
+
+    Returns:
+        Resumen: nombre, segundos, épocas entrenadas, si hubo early stopping, mejor
+        época con su pérdida y precisión de validación, y rutas de los pesos y métricas
+    """
+    started = time.time()
     print(f"\n{'='*50}")
     print(f"🚀 Iniciando entrenamiento para el especialista: {name.upper()}")
     print(f"{'='*50}")
@@ -96,50 +292,212 @@ def train_specialist(name, config, X_full, y_full):
         X_specialist, y_full, test_size=0.2, random_state=42, stratify=y_full
     )
 
-    train_loader = DataLoader(KeplerDataset(X_train, y_train), batch_size=32, shuffle=True)
-    val_loader = DataLoader(KeplerDataset(X_val, y_val), batch_size=32)
-
-    input_size = X_train.shape[1]
-    model = config['model_class'](input_features=input_size)
-    
-    weights = class_weight.compute_class_weight('balanced', classes=np.unique(y_train), y=y_train)
-    class_weights = torch.tensor(weights, dtype=torch.float32)
-    loss_fn = nn.BCEWithLogitsLoss(pos_weight=class_weights[1])
-    
-    optimizer = optim.Adam(model.parameters(), lr=0.0001)
-    epochs = 100
-
-    for epoch in range(epochs):
-        model.train()
-        for features, labels in train_loader:
-            outputs = model(features)
-            loss = loss_fn(outputs, labels)
-            optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
-
-        model.eval()
-        correct, total = 0, 0
-        with torch.no_grad():
-            for features, labels in val_loader:
-                outputs = torch.sigmoid(model(features))
-                predicted = (outputs > 0.5).float()
-                total += labels.size(0)
-                correct += (predicted == labels).sum().item()
-        accuracy = 100 * correct / total
-        
-        if (epoch + 1) % 10 == 0:
-            print(f'Época [{epoch+1}/{epochs}], Pérdida: {loss.item():.4f}, Precisión en Validación: {accuracy:.2f}%')
+    model, result = fit_specialist(
+        name, config, X_train, y_train, X_val, y_val,
+        run_dir=os.path.join(TRAINING_OUTPUT_PATH, name),
+        max_epochs=max_epochs,
+        patience=patience,
+        checkpoint_every=checkpoint_every,
+        restart=restart,
+        signature=run_signature([name], [config], y_full)
+    )
 
-    print("\nEntrenamiento finalizado. Guardando modelo...")
+    print(f"\nEntrenamiento finalizado en la época {result['epochs']}. "
+          f"Guardando el modelo de la época {result['best_epoch'][0]}...")
     model_save_path = os.path.join(MODEL_OUTPUT_PATH, config['output_filename'])
     torch.save(model.state_dict(), model_save_path)
-    print(f"✅ Modelo '{name}' guardado en: {model_save_path}")
+    export_numpy_bundle(model, model_save_path)
+    print(f"✅ Modelo '{name}' guardado en: {model_save_path} (y su .npz para el backend NumPy)")
+    return {
+        "name": name,
+        "seconds": time.time() - started,
+        "epochs": result["epochs"],
+        "stopped_early": result["stopped_early"],
+        "best_epoch": result["best_epoch"][0],
+        "val_loss": result["best_val_loss"][0],
+        "val_accuracy": result["best_val_accuracy"][0],
+        "output": model_save_path,
+        "metrics": result["metrics"]
+    }
+
+# --- Entrenamiento Agrupado ---
+def train_grouped(names, X_full, y_full, max_epochs=MAX_EPOCHS, patience=PATIENCE,
+                  checkpoint_every=CHECKPOINT_EVERY, restart=False):
+    """
+    Entrena varios especialistas a la vez como un GroupedSpecialistNet: la misma
+    partición, la misma inicialización de cada red y la misma pérdida (con su
+    pos_weight) que train_specialist, pero cada lote actualiza todos los modelos
+    en una sola pasada. Cada modelo tiene su propia paciencia y se guarda en su
+    .pth de siempre con los pesos de su mejor época; la ejecución (checkpoint y
+    métricas) está en outputs/training/grouped/.
+
+    Args:
+        names: Especialistas de SPECIALIST_CONFIG
+        X_full, y_full, max_epochs, patience, checkpoint_every, restart: Como en
+            train_specialist
+
+    Returns:
+        Un resumen por especialista, como train_specialist (con el tiempo total)
+
+    Raises:
+        ValueError: Si los especialistas no comparten learning_rate, batch_size y
+            hidden_sizes
+    """
+    started = time.time()
+    configs = [SPECIALIST_CONFIG[name] for name in names]
+    print(f"\n{'='*50}")
+    print(f"🚀 Entrenamiento agrupado: {', '.join(name.upper() for name in names)}")
+    print(f"{'='*50}")
+
+    # Misma partición que train_specialist: solo depende de las etiquetas y de random_state
+    train_idx, val_idx = train_test_split(
+        np.arange(len(y_full)), test_size=0.2, random_state=42, stratify=y_full
+    )
+    feature_sets = [X_full[config['feature_columns']].values for config in configs]
+
+    models, result = fit_grouped(
+        names, configs,
+        [features[train_idx] for features in feature_sets], y_full[train_idx],
+        [features[val_idx] for features in feature_sets], y_full[val_idx],
+        run_dir=os.path.join(TRAINING_OUTPUT_PATH, "grouped"),
+        max_epochs=max_epochs,
+        patience=patience,
+        checkpoint_every=checkpoint_every,
+        restart=restart,
+        signature=run_signature(names, configs, y_full)
+    )
+
+    print(f"\nEntrenamiento finalizado en la época {result['epochs']}. Guardando modelos...")
+    results = []
+    for i, (name, config, model) in enumerate(zip(names, configs, models)):
+        model_save_path = os.path.join(MODEL_OUTPUT_PATH, config['output_filename'])
+        torch.save(model.state_dict(), model_save_path)
+        export_numpy_bundle(model, model_save_path)
+        print(f"✅ Modelo '{name}' (época {result['best_epoch'][i]}) guardado en: {model_save_path}")
+        results.append({
+            "name": name,
+            "seconds": time.time() - started,
+            "epochs": result["epochs"],
+            "stopped_early": result["stopped_early"],
+            "best_epoch": result["best_epoch"][i],
+            "val_loss": result["best_val_loss"][i],
+            "val_accuracy": result["best_val_accuracy"][i],
+            "output": model_save_path,
+            "metrics": result["metrics"]
+        })
+    return results
+
+# --------------------------------------------------------------------------
+# --- ENTRENAMIENTO DE VARIOS ESPECIALISTAS (EN PARALELO) ---
+# --------------------------------------------------------------------------
+def load_training_data(train_path=TRAIN_PATH):
+    """Carga X_train.csv / y_train.csv preprocesados."""
+    print("Cargando datos preprocesados...")
+    X_train_full = pd.read_csv(os.path.join(train_path, "X_train.csv"))
+    y_train_full = pd.read_csv(os.path.join(train_path, "y_train.csv")).values.flatten()
+    return X_train_full, y_train_full
+
+
+# Datos que heredan los workers (fork); solo se leen
+_shared = {}
+
+
+def init_worker(torch_threads):
+    """Fija los hilos de torch del worker para que los procesos no compitan por los núcleos."""
+    torch.set_num_threads(torch_threads)
+
+
+def _train_shared(name):
+    return train_specialist(name, SPECIALIST_CONFIG[name], _shared["X"], _shared["y"], **_shared["options"])
+
+
+def write_summary(summary, output_path=TRAINING_OUTPUT_PATH):
+    """Guarda el resumen de una ejecución en <output_path>/specialists_<fecha>.json."""
+    os.makedirs(output_path, exist_ok=True)
+    path = os.path.join(output_path, f"specialists_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+    return path
+
+
+def train_many(names, X_full, y_full, workers=1, torch_threads=None, grouped=False, max_epochs=MAX_EPOCHS,
+               patience=PATIENCE, checkpoint_every=CHECKPOINT_EVERY, restart=False):
+    """
+    Entrena varios especialistas, en paralelo si workers > 1 (o juntos en un modelo
+    agrupado si grouped), y escribe el resumen de la ejecución.
+
+    Args:
+        names: Especialistas de SPECIALIST_CONFIG a entrenar
+        X_full: Características de entrenamiento (todas las columnas)
+        y_full: Etiquetas de entrenamiento
+        workers: Procesos (1 = uno tras otro en el proceso actual)
+        torch_threads: Hilos de torch por worker (None = cpu_count // workers)
+        grouped: Entrenarlos juntos con train_grouped (en el proceso actual)
+        max_epochs: Máximo de épocas
+        patience: Épocas sin mejorar antes de detener (0 = sin early stopping)
+        checkpoint_every: Épocas entre checkpoints
+        restart: Ignorar los checkpoints existentes y empezar desde cero
+
+    Returns:
+        Resumen de la ejecución (también guardado en TRAINING_OUTPUT_PATH)
+
+    Raises:
+        ValueError: Si algún nombre no está en SPECIALIST_CONFIG, o si un checkpoint
+            existente es de otra configuración
+    """
+    unknown = [name for name in names if name not in SPECIALIST_CONFIG]
+    if unknown:
+        raise ValueError(f"Especialistas desconocidos: {unknown}. Opciones: {list(SPECIALIST_CONFIG)}")
+    workers = 1 if grouped else max(1, min(workers, len(names)))
+    torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+
+    options = dict(max_epochs=max_epochs, patience=patience, checkpoint_every=checkpoint_every, restart=restart)
+
+    started = time.time()
+    if grouped:
+        results = train_grouped(names, X_full, y_full, **options)
+    elif workers == 1:
+        results = [train_specialist(name, SPECIALIST_CONFIG[name], X_full, y_full, **options) for name in names]
+    else:
+        _shared.update(X=X_full, y=y_full, options=options)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=init_worker,
+                initargs=(torch_threads,)
+            ) as pool:
+                results = list(pool.map(_train_shared, names))
+        finally:
+            _shared.clear()
+
+    wall_seconds = time.time() - started
+    summary = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "mode": "grouped" if grouped else "separate",
+        "workers": workers,
+        "torch_threads": torch_threads if workers > 1 else torch.get_num_threads(),
+        "cpu_count": os.cpu_count(),
+        "max_epochs": max_epochs,
+        "patience": patience,
+        "wall_seconds": wall_seconds,
+        "sum_seconds": wall_seconds if grouped else sum(result["seconds"] for result in results),
+        "specialists": results
+    }
+    summary_path = write_summary(summary)
+
+    print(f"\n--- RESUMEN ({workers} workers, {summary['torch_threads']} hilos de torch por worker) ---")
+    for result in results:
+        print(f"  {result['name']:>17}: {result['seconds']:6.1f}s, {result['epochs']} épocas "
+              f"(mejor: {result['best_epoch']}), precisión en validación {result['val_accuracy']:.2f}%")
+    print(f"  Tiempo total: {summary['wall_seconds']:.1f}s (suma de especialistas: {summary['sum_seconds']:.1f}s)")
+    print(f"  Resumen guardado en: {summary_path}")
+    return summary
 
 # --------------------------------------------------------------------------
 # --- BUCLE PRINCIPAL CON MENÚ INTERACTIVO ---
 # --------------------------------------------------------------------------
-if __name__ == "__main__":
+def menu():
     specialist_names = list(SPECIALIST_CONFIG.keys())
     
     while True:
@@ -158,23 +516,16 @@ if __name__ == "__main__":
                 chosen_name = specialist_names[choice - 1]
                 print(f"\nHas elegido entrenar a '{chosen_name}'.")
                 
-                print("Cargando datos preprocesados...")
-                X_train_full = pd.read_csv(os.path.join(TRAIN_PATH, "X_train.csv"))
-                y_train_full = pd.read_csv(os.path.join(TRAIN_PATH, "y_train.csv")).values.flatten()
-                
-                train_specialist(chosen_name, SPECIALIST_CONFIG[chosen_name], X_train_full, y_train_full)
+                X_train_full, y_train_full = load_training_data()
+                train_many([chosen_name], X_train_full, y_train_full)
                 break
 
             elif choice == len(specialist_names) + 1:
                 # --- Opción: Entrenar todos ---
                 print("\nHas elegido entrenar a TODOS los especialistas.")
                 
-                print("Cargando datos preprocesados...")
-                X_train_full = pd.read_csv(os.path.join(TRAIN_PATH, "X_train.csv"))
-                y_train_full = pd.read_csv(os.path.join(TRAIN_PATH, "y_train.csv")).values.flatten()
-                
-                for name, config in SPECIALIST_CONFIG.items():
-                    train_specialist(name, config, X_train_full, y_train_full)
+                X_train_full, y_train_full = load_training_data()
+                train_many(specialist_names, X_train_full, y_train_full, workers=os.cpu_count() or 1)
                 
                 print("\n🎉 ¡Sistema de especialistas completo! Todos los modelos han sido entrenados. 🎉")
                 break
@@ -187,4 +538,41 @@ if __name__ == "__main__":
                 print("❌ Opción no válida. Por favor, intenta de nuevo.")
 
         except ValueError:
-            print("❌ Entrada no válida. Por favor, introduce un número.")
\ No newline at end of file
+            print("❌ Entrada no válida. Por favor, introduce un número.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrenamiento de las redes especialistas")
+    parser.add_argument("specialists", nargs="*", help=f"Especialistas a entrenar: {', '.join(SPECIALIST_CONFIG)}")
+    parser.add_argument("--all", action="store_true", help="Entrenar todos los especialistas")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Procesos de entrenamiento (1 = uno tras otro)")
+    parser.add_argument("--torch-threads", type=int, default=None,
+                        help="Hilos de torch por worker (por defecto cpu_count // workers)")
+    parser.add_argument("--grouped", action="store_true",
+                        help="Entrenarlos juntos como un solo modelo agrupado (ignora --workers)")
+    parser.add_argument("--max-epochs", type=int, default=MAX_EPOCHS, help="Máximo de épocas")
+    parser.add_argument("--patience", type=int, default=PATIENCE,
+                        help="Épocas sin mejorar la pérdida de validación antes de detener (0 = sin early stopping)")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY, help="Épocas entre checkpoints")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignorar los checkpoints de una ejecución interrumpida y empezar de cero")
+    args = parser.parse_args()
+
+    names = list(SPECIALIST_CONFIG) if args.all else args.specialists
+    if not names:
+        menu()
+        return
+
+    try:
+        X_train_full, y_train_full = load_training_data()
+        train_many(names, X_train_full, y_train_full, args.workers, args.torch_threads, args.grouped,
+                   args.max_epochs, args.patience, args.checkpoint_every, args.restart)
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
+    print("\n🎉 ¡Entrenamiento completado! 🎉")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# scripts/benchmark_imputation.py
+
+"""
+Compara el tiempo y la memoria de la imputación KNN offline de preprocess.py a
+medida que crece el catálogo:
+
+    sklearn    KNNImputer.fit_transform(X_train) + transform(X_predict) (lo de antes)
+    motor      parallel_transform con un solo proceso
+    paralelo   parallel_transform con --workers procesos
+
+Los catálogos sintéticos repiten las características numéricas de Kepler.csv
+(entrenamiento y predicción) `escala` veces; cada copia después de la primera
+multiplica los valores presentes por (1 + ruido gaussiano de JITTER), así que
+conserva el patrón de faltantes y no hay filas duplicadas.
+
+Cada configuración se ejecuta en un proceso aparte; mientras corre se muestrea la
+suma de PSS del proceso y de sus workers (/proc/<pid>/smaps_rollup), y al terminar
+se comprueba que el motor dio exactamente la misma salida que sklearn. Todas las
+configuraciones usan el mismo --working-memory (MiB por bloque de distancias).
+
+Uso:
+    python scripts/benchmark_imputation.py --scales 1 2 4 --workers 4
+    python scripts/benchmark_imputation.py --scales 1 --working-memory 64 --json bench.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# --- Añadir la ruta del proyecto al path ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+# --------------------------------------------------------------------------
+# 1. CONFIGURACIÓN
+# --------------------------------------------------------------------------
+MODES = ["sklearn", "motor", "paralelo"]
+
+# Ruido relativo de las copias sintéticas del catálogo
+JITTER = 1e-3
+
+# Segundos entre muestras de memoria
+SAMPLE_INTERVAL = 0.2
+
+N_NEIGHBORS = 5
+
+
+# --------------------------------------------------------------------------
+# 2. CATÁLOGOS SINTÉTICOS
+# --------------------------------------------------------------------------
+def kepler_features():
+    """Características numéricas de entrenamiento y predicción, como en preprocess.py."""
+    sys.path.append(os.path.join(BASE_DIR, "scripts"))
+    import preprocess
+
+    df = preprocess.cargar_catalogo()
+    es_train = (df['koi_disposition'] != 'CANDIDATE').to_numpy()
+    X = preprocess.preparar_features(df)
+    columnas_numericas = X.select_dtypes(include=[np.number]).columns.tolist()
+    X = X[columnas_numericas].to_numpy(dtype=np.float64)
+    return X[es_train], X[~es_train]
+
+
+def synthetic(X, scale, rng):
+    """Repite X `scale` veces; las copias llevan ruido multiplicativo de JITTER."""
+    copies = [X]
+    for _ in range(scale - 1):
+        copies.append(X * (1 + JITTER * rng.standard_normal(X.shape)))
+    return np.concatenate(copies)
+
+
+# --------------------------------------------------------------------------
+# 3. EJECUCIÓN DE UNA CONFIGURACIÓN (proceso hijo)
+# --------------------------------------------------------------------------
+def output_digest(*arrays):
+    digest = hashlib.sha1()
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def run_mode(mode, data_dir, workers, working_memory):
+    """Imputa el catálogo de `data_dir` con un modo y devuelve tiempo y huella de la salida."""
+    import sklearn
+    from sklearn.impute import KNNImputer
+    from api.utils.imputation import KNNImputationEngine, parallel_transform
+
+    X_train = np.load(os.path.join(data_dir, "X_train.npy"))
+    X_predict = np.load(os.path.join(data_dir, "X_predict.npy"))
+
+    started = time.perf_counter()
+    with sklearn.config_context(working_memory=working_memory):
+        if mode == "sklearn":
+            imputer = KNNImputer(n_neighbors=N_NEIGHBORS)
+            train = imputer.fit_transform(X_train)
+            predict = imputer.transform(X_predict)
+        else:
+            engine = KNNImputationEngine.from_sklearn(KNNImputer(n_neighbors=N_NEIGHBORS).fit(X_train))
+            n_workers = 1 if mode == "motor" else workers
+            train = parallel_transform(engine, X_train, n_workers, working_memory)
+            predict = parallel_transform(engine, X_predict, n_workers, working_memory)
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed, "digest": output_digest(train, predict)}
+
+
+# --------------------------------------------------------------------------
+# 4. PROCESOS Y MEMORIA
+# --------------------------------------------------------------------------
+def process_tree(pid):
+    """PID de un proceso y de todos sus descendientes."""
+    pids = [pid]
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                for child in f.read().split():
+                    pids += process_tree(int(child))
+    except OSError:
+        pass
+    return pids
+
+
+def pss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def benchmark(mode, data_dir, workers, working_memory):
+    """Ejecuta un modo en un proceso aparte y mide su pico de PSS (con los workers)."""
+    command = [sys.executable, os.path.abspath(__file__), "--run", mode, "--data", data_dir,
+               "--workers", str(workers), "--working-memory", str(working_memory)]
+    process = subprocess.Popen(command, cwd=BASE_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+
+    peak = 0.0
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, sum(pss_mb(pid) for pid in process_tree(process.pid)))
+            time.sleep(SAMPLE_INTERVAL)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    output, _ = process.communicate()
+    done.set()
+    sampler.join()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"{mode} terminó con código {process.returncode}")
+    return dict(json.loads(output.strip().splitlines()[-1]), mode=mode, peak_pss_mb=peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo y memoria de la imputación KNN offline")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 2, 4],
+                        help="Veces que se repite el catálogo Kepler")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos del modo paralelo")
+    parser.add_argument("--working-memory", type=float, default=256, help="MiB por bloque de distancias")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_mode(args.run, args.data, args.workers, args.working_memory)))
+        return
+
+    X_train, X_predict = kepler_features()
+    rng = np.random.default_rng(args.seed)
+    print(f"\n{os.cpu_count()} CPUs, {args.workers} workers en el modo paralelo, "
+          f"working_memory {args.working_memory:g} MiB\n")
+    print(f"{'escala':>6} {'train':>7} {'predict':>7} {'modo':>9} {'tiempo':>8} {'PSS pico':>9} {'salida':>10}")
+
+    results = []
+    work_dir = tempfile.mkdtemp(prefix="benchmark_imputation-")
+    try:
+        for scale in args.scales:
+            np.save(os.path.join(work_dir, "X_train.npy"), synthetic(X_train, scale, rng))
+            np.save(os.path.join(work_dir, "X_predict.npy"), synthetic(X_predict, scale, rng))
+            reference = None
+            for mode in args.modes:
+                result = dict(benchmark(mode, work_dir, args.workers, args.working_memory),
+                              scale=scale, train_rows=len(X_train) * scale, predict_rows=len(X_predict) * scale)
+                reference = reference or result["digest"]
+                result["identical"] = result["digest"] == reference
+                results.append(result)
+                print(f"{scale:>6} {result['train_rows']:>7} {result['predict_rows']:>7} {mode:>9} "
+                      f"{result['seconds']:>7.2f}s {result['peak_pss_mb']:>6.0f} MB "
+                      f"{'idéntica' if result['identical'] else 'DISTINTA':>10}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if not all(result["identical"] for result in results):
+        print("\n❌ Alguna configuración no reprodujo la salida del primer modo")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# scripts/benchmark_server.py
+
+"""
+Compara la memoria por worker y el throughput del servidor pre-fork (api/server.py)
+con `uvicorn --workers N` a medida que crece el número de workers.
+
+Para cada modo y número de workers levanta el servidor, espera a /ready, mide la
+memoria de cada worker (RSS, PSS y privada, de /proc/<pid>/smaps_rollup) y envía
+POST /judge/predict con filas de data/raw/Kepler.csv desde varios clientes
+concurrentes durante unos segundos. La caché de resultados se desactiva para que
+cada petición evalúe los modelos.
+
+PSS reparte las páginas compartidas entre los procesos que las usan: la suma de PSS
+es la memoria que realmente cuesta el servidor completo.
+
+Uso:
+    python scripts/benchmark_server.py --workers 1 2 4 --duration 10
+    python scripts/benchmark_server.py --modes prefork --workers 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import httpx
+import numpy as np
+
+# --- Añadir la ruta del proyecto al path ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+# --------------------------------------------------------------------------
+# 1. CONFIGURACIÓN
+# --------------------------------------------------------------------------
+RAW_CATALOG_PATH = os.path.join(BASE_DIR, "data", "raw", "Kepler.csv")
+HOST = "127.0.0.1"
+PORT = 8015
+
+# Segundos máximos de espera a que todos los workers estén listos
+STARTUP_TIMEOUT = 180
+
+# Respuestas 200 seguidas de /ready (conexiones nuevas) para dar por listos a todos los workers
+READY_STREAK = 20
+
+# Entorno de los servidores: sin caché de resultados ni reconstrucción del catálogo
+SERVER_ENV = {
+    "CACHE_MAX_ENTRIES": "0",
+    "CATALOG_AUTO_REBUILD": "0"
+}
+
+
+def server_command(mode, workers):
+    """Comando que levanta el servidor en el modo indicado."""
+    if mode == "prefork":
+        return [sys.executable, "-m", "api.server", "--workers", str(workers),
+                "--host", HOST, "--port", str(PORT), "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", "api.main:app", "--workers", str(workers),
+            "--host", HOST, "--port", str(PORT), "--log-level", "warning"]
+
+
+# --------------------------------------------------------------------------
+# 2. PROCESOS Y MEMORIA
+# --------------------------------------------------------------------------
+def child_pids(pid):
+    """PIDs de los hijos directos de un proceso."""
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children += [int(child) for child in f.read().split()]
+    return children
+
+
+def worker_pids(pid):
+    """Workers del servidor (los hijos, sin procesos auxiliares de multiprocessing)."""
+    workers = []
+    for child in child_pids(pid):
+        with open(f"/proc/{child}/cmdline", "rb") as f:
+            cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+        if "resource_tracker" not in cmdline:
+            workers.append(child)
+    return workers
+
+
+def memory_mb(pid):
+    """RSS, PSS y memoria privada de un proceso, en MB."""
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    kb = {name: int(value.split()[0]) for name, value in fields.items() if value.strip().endswith("kB")}
+    return {
+        "rss": kb["Rss"] / 1024,
+        "pss": kb["Pss"] / 1024,
+        "private": (kb["Private_Clean"] + kb["Private_Dirty"]) / 1024
+    }
+
+
+def wait_until_ready(process):
+    """Espera a que /ready responda 200 en varias conexiones seguidas (todos los workers listos)."""
+    deadline = time.time() + STARTUP_TIMEOUT
+    streak = 0
+    while streak < READY_STREAK:
+        if process.poll() is not None:
+            raise RuntimeError(f"El servidor terminó al arrancar (código {process.returncode})")
+        if time.time() > deadline:
+            raise RuntimeError("El servidor no estuvo listo a tiempo")
+        try:
+            with urllib.request.urlopen(f"http://{HOST}:{PORT}/ready", timeout=5) as response:
+                streak = streak + 1 if response.status == 200 else 0
+        except (urllib.error.URLError, ConnectionError, OSError):
+            streak = 0
+            time.sleep(0.5)
+
+
+# --------------------------------------------------------------------------
+# 3. CARGA
+# --------------------------------------------------------------------------
+def load_payloads():
+    """Un payload de /judge/predict por fila válida de Kepler.csv (con sus faltantes como null)."""
+    from api.utils.preprocessing import RAW_COLUMNS
+    from api.utils.validation import VALIDATION_SCHEMA, ValidationError, SPECIALISTS
+    from api.utils.raw_catalogs import load_catalog
+
+    catalog = load_catalog(RAW_CATALOG_PATH, columns=RAW_COLUMNS)
+    catalog = catalog.astype(object).where(catalog.notna(), None)
+    payloads = []
+    for row in catalog.to_dict("records"):
+        try:
+            VALIDATION_SCHEMA.validate(dict(row), SPECIALISTS)
+        except ValidationError:
+            continue
+        payloads.append({"data": row})
+    return payloads
+
+
+async def run_load(payloads, concurrency, duration):
+    """
+    Envía peticiones desde `concurrency` clientes durante `duration` segundos.
+
+    Returns:
+        (peticiones exitosas, errores, latencias en segundos)
+    """
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def client(offset):
+        nonlocal errors
+        i = offset
+        async with httpx.AsyncClient(base_url=f"http://{HOST}:{PORT}", timeout=30, limits=limits) as session:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await session.post("/judge/predict", json=payloads[i % len(payloads)])
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+                i += concurrency
+
+    await asyncio.gather(*[client(offset) for offset in range(concurrency)])
+    return len(latencies), errors, latencies
+
+
+def benchmark(mode, workers, payloads, concurrency, duration):
+    """Levanta el servidor, mide memoria y throughput, y lo detiene."""
+    env = dict(os.environ, **SERVER_ENV)
+    process = subprocess.Popen(
+        server_command(mode, workers), cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        started = time.perf_counter()
+        wait_until_ready(process)
+        startup = time.perf_counter() - started
+
+        ok, errors, latencies = asyncio.run(run_load(payloads, concurrency, duration))
+
+        # Con un solo worker uvicorn atiende en el mismo proceso, sin hijos
+        pids = worker_pids(process.pid) or [process.pid]
+        workers_memory = [memory_mb(pid) for pid in pids]
+        parent_memory = memory_mb(process.pid) if pids != [process.pid] else {"pss": 0.0}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    return {
+        "mode": mode,
+        "workers": len(pids),
+        "startup_s": startup,
+        "rps": ok / duration,
+        "errors": errors,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000) if latencies else None,
+        "p99_ms": float(np.percentile(latencies, 99) * 1000) if latencies else None,
+        "rss_per_worker_mb": float(np.mean([m["rss"] for m in workers_memory])),
+        "pss_per_worker_mb": float(np.mean([m["pss"] for m in workers_memory])),
+        "private_per_worker_mb": float(np.mean([m["private"] for m in workers_memory])),
+        "pss_total_mb": sum(m["pss"] for m in workers_memory) + parent_memory["pss"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria por worker y throughput del servidor pre-fork")
+    parser.add_argument("--modes", nargs="+", default=["prefork", "uvicorn"], choices=["prefork", "uvicorn"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes concurrentes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de carga por configuración")
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    args = parser.parse_args()
+
+    payloads = load_payloads()
+    print(f"{len(payloads)} payloads de {os.path.relpath(RAW_CATALOG_PATH, BASE_DIR)}; "
+          f"{os.cpu_count()} CPUs, {args.concurrency} clientes, {args.duration:.0f}s por configuración\n")
+    print(f"{'modo':>8} {'workers':>7} {'arranque':>9} {'req/s':>7} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'RSS/w':>7} {'PSS/w':>7} {'priv/w':>7} {'PSS tot':>8}")
+
+    results = []
+    for mode in args.modes:
+        for workers in args.workers:
+            result = benchmark(mode, workers, payloads, args.concurrency, args.duration)
+            results.append(result)
+            print(f"{result['mode']:>8} {result['workers']:>7} {result['startup_s']:>8.1f}s "
+                  f"{result['rps']:>7.1f} {result['p50_ms']:>7.1f} {result['p99_ms']:>7.1f} "
+                  f"{result['rss_per_worker_mb']:>7.0f} {result['pss_per_worker_mb']:>7.0f} "
+                  f"{result['private_per_worker_mb']:>7.0f} {result['pss_total_mb']:>8.0f}"
+                  + (f"  ({result['errors']} errores)" if result["errors"] else ""))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
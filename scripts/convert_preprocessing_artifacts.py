@@ -0,0 +1,211 @@
+# scripts/convert_preprocessing_artifacts.py
+
+"""
+Convierte los artefactos de preprocesamiento (imputer.gz, scaler.gz) al paquete de
+arrays que el API lee con memory-map (PREPROCESSING_FORMAT=mmap):
+
+    data/processed/imputer.gz + scaler.gz -> data/processed/preprocessing/
+
+Después de convertir comprueba que imputación + escalado con el paquete dan
+exactamente los mismos valores que KNNImputer.transform + StandardScaler.transform
+sobre las filas de data/raw/Kepler.csv, y termina con error si no coinciden. Con
+las magnitudes de algunas columnas (~1e23) un redondeo distinto en un producto
+matricial basta para cambiar el vecino elegido, así que se comprueban los dos
+caminos del motor:
+
+    parallel_transform (scripts/preprocess.py)   matriz completa, contra
+                                                 KNNImputer.transform de la matriz
+    transform (API)                              fila a fila y en bloques pequeños de
+                                                 las filas con faltantes, contra
+                                                 KNNImputer.transform de cada fila
+
+Uso:
+    python scripts/convert_preprocessing_artifacts.py              # convierte y verifica
+    python scripts/convert_preprocessing_artifacts.py --verify     # solo verifica el paquete existente
+    python scripts/convert_preprocessing_artifacts.py --benchmark  # además compara carga y memoria
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+# --- Añadir la ruta del proyecto al path ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from api.utils import preprocessing_artifacts
+from api.utils.imputation import parallel_transform
+from api.utils.raw_catalogs import load_catalog
+
+# --------------------------------------------------------------------------
+# 1. CONFIGURACIÓN
+# --------------------------------------------------------------------------
+RAW_CATALOG_PATH = os.path.join(BASE_DIR, "data", "raw", "Kepler.csv")
+
+# Máxima diferencia absoluta tolerada: el paquete debe reproducir los .gz exactamente
+TOLERANCE = 0.0
+
+# Tamaños de bloque de la comparación por bloques pequeños (1 = fila a fila)
+BLOCK_SIZES = (1, 8, 64)
+
+# Programa que mide, en un proceso limpio, la carga de preprocessing con un formato
+BENCHMARK_PROGRAM = """
+import json, sys, time
+sys.path.insert(0, {base_dir!r})
+started = time.perf_counter()
+import api.utils.preprocessing as preprocessing
+elapsed = time.perf_counter() - started
+memory = {{}}
+try:
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    memory = {{
+        "rss_mb": int(fields["Rss"].split()[0]) / 1024,
+        "private_mb": sum(int(fields[k].split()[0]) for k in ("Private_Clean", "Private_Dirty")) / 1024
+    }}
+except (OSError, KeyError, ValueError):
+    pass
+print(json.dumps(dict(
+    memory,
+    source=preprocessing.ARTIFACTS.source,
+    import_s=elapsed,
+    sklearn_imported="sklearn" in sys.modules
+)))
+"""
+
+
+# --------------------------------------------------------------------------
+# 2. CONVERSIÓN
+# --------------------------------------------------------------------------
+def convert():
+    """Genera el paquete memory-map a partir de los .gz actuales."""
+    imputer, scaler = preprocessing_artifacts.load_sklearn_artifacts()
+    path = preprocessing_artifacts.save_bundle(imputer, scaler)
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    print(f"  {os.path.relpath(path, BASE_DIR)} ({len(os.listdir(path))} archivos, {size / 1e6:.1f} MB)")
+
+
+# --------------------------------------------------------------------------
+# 3. VERIFICACIÓN CONTRA SKLEARN
+# --------------------------------------------------------------------------
+def load_verification_data():
+    """Matriz de características sin imputar de las filas de Kepler.csv (con sus faltantes)."""
+    from api.utils.preprocessing import build_feature_matrix, RAW_COLUMNS
+
+    raw = load_catalog(RAW_CATALOG_PATH, columns=RAW_COLUMNS).to_numpy(dtype=np.float64)
+    return build_feature_matrix(raw)
+
+
+def verify():
+    """
+    Compara imputación + escalado del paquete con los del imputer y el scaler originales.
+
+    Returns:
+        Máxima diferencia absoluta encontrada
+    """
+    if not preprocessing_artifacts.bundle_is_fresh():
+        print("❌ El paquete no existe o no corresponde a los .gz actuales")
+        sys.exit(1)
+
+    imputer, scaler = preprocessing_artifacts.load_sklearn_artifacts()
+    bundle = preprocessing_artifacts.load_bundle()
+    X = load_verification_data()
+    print(f"  {len(X)} filas de {os.path.relpath(RAW_CATALOG_PATH, BASE_DIR)}, "
+          f"{int(np.isnan(X).any(axis=1).sum())} con faltantes")
+
+    if bundle.feature_names != list(imputer.feature_names_in_):
+        print("❌ Las columnas del paquete no coinciden con las del imputer")
+        sys.exit(1)
+
+    frame = pd.DataFrame(X, columns=bundle.feature_names)
+    expected = scaler.transform(pd.DataFrame(imputer.transform(frame), columns=bundle.feature_names))
+
+    actual = parallel_transform(bundle.engine, X, workers=1)
+    if bundle.scaler_mean is not None:
+        actual -= bundle.scaler_mean
+    if bundle.scaler_scale is not None:
+        actual /= bundle.scaler_scale
+
+    diff = float(np.max(np.abs(expected - actual)))
+    print(f"  imputación + escalado (matriz completa): máx. diferencia {diff:.2e}")
+    return max(diff, verify_blocks(imputer, bundle, X))
+
+
+def verify_blocks(imputer, bundle, X, block_sizes=BLOCK_SIZES):
+    """
+    Compara la imputación del API (engine.transform), fila a fila y en bloques
+    pequeños de las filas con faltantes, con la del imputer original evaluando
+    cada fila por separado (lo que devolvía /judge/predict con sklearn).
+
+    Returns:
+        Máxima diferencia absoluta encontrada
+    """
+    rows = X[np.isnan(X).any(axis=1)]
+    expected = np.vstack([
+        imputer.transform(pd.DataFrame(rows[i:i + 1], columns=bundle.feature_names))
+        for i in range(len(rows))
+    ])
+    worst = 0.0
+    for block_size in block_sizes:
+        differing = 0
+        diff = 0.0
+        for start in range(0, len(rows), block_size):
+            block = rows[start:start + block_size]
+            block_diff = np.abs(expected[start:start + block_size] - bundle.engine.transform(block)).max(axis=1)
+            differing += int((block_diff > 0).sum())
+            diff = max(diff, float(block_diff.max()))
+        label = "fila a fila" if block_size == 1 else f"bloques de {block_size} filas"
+        print(f"  imputación {label}: {differing} de {len(rows)} filas distintas, máx. diferencia {diff:.2e}")
+        worst = max(worst, diff)
+    return worst
+
+
+# --------------------------------------------------------------------------
+# 4. COMPARACIÓN DE CARGA
+# --------------------------------------------------------------------------
+def benchmark():
+    """Tiempo de importación y memoria de api.utils.preprocessing con cada formato."""
+    program = BENCHMARK_PROGRAM.format(base_dir=BASE_DIR)
+    for fmt in ("joblib", "mmap"):
+        env = dict(os.environ, PREPROCESSING_FORMAT=fmt)
+        output = subprocess.run(
+            [sys.executable, "-c", program], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        memory = (
+            f"RSS {result['rss_mb']:.0f} MB (privada {result['private_mb']:.0f} MB), "
+            if "rss_mb" in result else ""
+        )
+        print(f"  {result['source']:>6}: importación {result['import_s']:.2f}s, {memory}"
+              f"scikit-learn {'importado' if result['sklearn_imported'] else 'no importado'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte imputer.gz/scaler.gz al paquete memory-map")
+    parser.add_argument("--verify", action="store_true", help="Solo verificar el paquete existente")
+    parser.add_argument("--benchmark", action="store_true", help="Comparar tiempo de carga y memoria de ambos formatos")
+    args = parser.parse_args()
+
+    if not args.verify:
+        print("Convirtiendo artefactos de preprocesamiento...")
+        convert()
+
+    print("Verificando contra KNNImputer/StandardScaler...")
+    worst = verify()
+    if worst > TOLERANCE:
+        print(f"❌ El paquete no reproduce los .gz (máx. diferencia {worst:.2e})")
+        sys.exit(1)
+    print(f"✅ Transformaciones idénticas (máx. diferencia {worst:.2e})")
+
+    if args.benchmark:
+        print("Comparando la carga de ambos formatos...")
+        benchmark()
+
+
+if __name__ == "__main__":
+    main()
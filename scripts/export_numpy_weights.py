@@ -0,0 +1,158 @@
+# scripts/export_numpy_weights.py
+
+"""
+Exporta los pesos de los modelos a paquetes NumPy (.npz) para el backend de inferencia
+"numpy" del API (INFERENCE_BACKEND=numpy), que así no necesita importar torch.
+
+    outputs/weights/<especialista>_net.pth -> outputs/weights/<especialista>_net.npz
+    outputs/weights/judge_model.joblib     -> outputs/weights/judge_model.npz
+
+Cada .npz guarda el SHA-1 de los pesos de los que se exportó; el API se niega a
+cargar un .npz que no coincide con su .pth / .joblib. Los scripts de entrenamiento
+(train_specialists.py, train_judge.py, search.py --export) ya regeneran el .npz al
+guardar los pesos; este script sirve para regenerarlos todos a mano.
+
+Después de exportar compara los scores (las probabilidades que devuelve el API) del
+runtime NumPy con los de PyTorch/sklearn sobre el set de predicción y termina con
+error si no coinciden.
+
+Uso:
+    python scripts/export_numpy_weights.py            # exporta y verifica
+    python scripts/export_numpy_weights.py --verify   # solo verifica los .npz existentes
+"""
+
+import argparse
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import torch
+
+# --- Añadir la ruta del proyecto al path ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from model.train.train_specialists import SPECIALIST_CONFIG
+from model.architecture.m_common import hidden_sizes_from_state_dict
+from api.services.runtime import NumpyMLP, NumpyJudge, export_numpy_bundle, numpy_bundle_path, sigmoid
+
+# --------------------------------------------------------------------------
+# 1. CONFIGURACIÓN
+# --------------------------------------------------------------------------
+WEIGHTS_PATH = os.path.join(BASE_DIR, "outputs", "weights")
+JUDGE_FILENAME = "judge_model.joblib"
+PREDICT_SET_PATH = os.path.join(BASE_DIR, "data", "processed", "prediction_set", "X_predict.csv")
+
+# Máxima diferencia absoluta tolerada entre los scores (probabilidades) de ambos backends
+TOLERANCE = 1e-5
+
+
+# --------------------------------------------------------------------------
+# 2. CARGA Y CONVERSIÓN
+# --------------------------------------------------------------------------
+def load_torch_specialist(name):
+    """Carga un especialista de PyTorch a partir de su .pth."""
+    config = SPECIALIST_CONFIG[name]
+    state = torch.load(os.path.join(WEIGHTS_PATH, config['output_filename']), map_location="cpu")
+    model = config['model_class'](input_features=len(config['feature_columns']),
+                                  hidden_sizes=hidden_sizes_from_state_dict(state))
+    model.load_state_dict(state)
+    model.eval()
+    return model
+
+
+def export_all():
+    """Exporta los 4 especialistas y el juez a .npz."""
+    for name, config in SPECIALIST_CONFIG.items():
+        weights_path = os.path.join(WEIGHTS_PATH, config['output_filename'])
+        output_path = export_numpy_bundle(load_torch_specialist(name), weights_path)
+        print(f"  '{name}' -> {os.path.relpath(output_path, BASE_DIR)}")
+
+    weights_path = os.path.join(WEIGHTS_PATH, JUDGE_FILENAME)
+    output_path = export_numpy_bundle(joblib.load(weights_path), weights_path)
+    print(f"  'judge' -> {os.path.relpath(output_path, BASE_DIR)}")
+
+
+# --------------------------------------------------------------------------
+# 3. VERIFICACIÓN CONTRA PYTORCH / SKLEARN
+# --------------------------------------------------------------------------
+def load_verification_data():
+    """Set de predicción preprocesado; si no existe, datos aleatorios con las mismas columnas."""
+    if os.path.exists(PREDICT_SET_PATH):
+        return pd.read_csv(PREDICT_SET_PATH)
+    columns = sorted({c for config in SPECIALIST_CONFIG.values() for c in config['feature_columns']})
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.normal(size=(1000, len(columns))), columns=columns)
+
+
+def verify_all():
+    """
+    Compara los .npz exportados con los modelos originales.
+
+    Returns:
+        Máxima diferencia absoluta encontrada entre ambos backends
+
+    Raises:
+        ValueError: Si algún .npz no corresponde a los pesos actuales
+    """
+    data = load_verification_data()
+    worst = 0.0
+    torch_scores, numpy_scores = [], []
+
+    for name, config in SPECIALIST_CONFIG.items():
+        X = data[config['feature_columns']].values.astype(np.float32)
+
+        torch_model = load_torch_specialist(name)
+        numpy_model = NumpyMLP.load(numpy_bundle_path(config['output_filename']),
+                                    source_path=os.path.join(WEIGHTS_PATH, config['output_filename']))
+        with torch.no_grad():
+            output = torch_model(torch.from_numpy(X))
+            if not numpy_model.final_sigmoid:
+                output = torch.sigmoid(output)
+            expected = output.numpy().reshape(-1)
+        actual = numpy_model(X).reshape(-1)
+        if not numpy_model.final_sigmoid:
+            actual = sigmoid(actual)
+
+        diff = float(np.max(np.abs(expected - actual)))
+        worst = max(worst, diff)
+        print(f"  '{name}': máx. diferencia {diff:.2e} en {len(X)} filas")
+        torch_scores.append(expected)
+        numpy_scores.append(actual)
+
+    sklearn_judge = joblib.load(os.path.join(WEIGHTS_PATH, JUDGE_FILENAME))
+    numpy_judge = NumpyJudge.load(numpy_bundle_path(JUDGE_FILENAME), source_path=os.path.join(WEIGHTS_PATH, JUDGE_FILENAME))
+    expected = sklearn_judge.predict_proba(np.column_stack(torch_scores).astype(np.float64))[:, 1]
+    actual = numpy_judge.predict_proba(np.column_stack(numpy_scores).astype(np.float64))[:, 1]
+    diff = float(np.max(np.abs(expected - actual)))
+    worst = max(worst, diff)
+    print(f"  'judge': máx. diferencia {diff:.2e}")
+
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta los modelos a paquetes .npz para el backend NumPy")
+    parser.add_argument("--verify", action="store_true", help="Solo verificar los .npz existentes")
+    args = parser.parse_args()
+
+    if not args.verify:
+        print("Exportando pesos a NumPy...")
+        export_all()
+
+    print("Verificando contra PyTorch/sklearn...")
+    try:
+        worst = verify_all()
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if worst > TOLERANCE:
+        print(f"❌ Los backends no coinciden (máx. diferencia {worst:.2e} > {TOLERANCE:.0e})")
+        sys.exit(1)
+    print(f"✅ Scores equivalentes (máx. diferencia {worst:.2e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# scripts/ingest_raw_catalogs.py
+
+"""
+Convierte los catálogos crudos del Archive (data/raw/Kepler.csv, K2.csv, TESS.csv) a
+su caché columnar (api/utils/raw_catalogs.py):
+
+    data/raw/<catálogo>.csv -> data/processed/columnar/<catálogo>-<sha1>/
+
+Un catálogo cuyo contenido no cambió no se vuelve a convertir. Después comprueba que
+cada columna cargada desde la caché tiene exactamente los mismos valores que
+pd.read_csv(comment="#"), y termina con error si alguna no coincide.
+
+Los scripts que leen los catálogos (preprocess.py, build_catalog.py, ...) construyen
+la caché solos si falta; este script solo la adelanta y la verifica.
+
+Uso:
+    python scripts/ingest_raw_catalogs.py                # convierte y verifica los tres
+    python scripts/ingest_raw_catalogs.py kepler tess    # solo esos catálogos
+    python scripts/ingest_raw_catalogs.py --benchmark    # además compara tiempos de carga
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- Añadir la ruta del proyecto al path ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from api.utils import raw_catalogs
+
+# Repeticiones de cada carga en la comparación de tiempos
+BENCHMARK_REPEATS = 5
+
+
+# --------------------------------------------------------------------------
+# 1. CONVERSIÓN
+# --------------------------------------------------------------------------
+def ingest(name):
+    """Construye (si hace falta) la caché de un catálogo y muestra su resumen."""
+    path = raw_catalogs.catalog_path(name)
+    started = time.perf_counter()
+    directory = raw_catalogs.build_cache(name)
+    elapsed = time.perf_counter() - started
+
+    manifest = raw_catalogs.read_manifest(directory)
+    size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+    dtypes = pd.Series([
+        spec["dtype"] if spec["kind"] == "numeric" else "category" for spec in manifest["columns"]
+    ]).value_counts()
+    print(f"  {os.path.basename(path)}: {manifest['rows']} filas, {len(manifest['columns'])} columnas "
+          f"-> {os.path.relpath(directory, BASE_DIR)} ({size / 1e6:.1f} MB, {elapsed:.2f}s)")
+    print("    " + ", ".join(f"{dtype}: {count}" for dtype, count in dtypes.items()))
+
+
+# --------------------------------------------------------------------------
+# 2. VERIFICACIÓN CONTRA EL CSV
+# --------------------------------------------------------------------------
+def verify(name):
+    """
+    Compara cada columna de la caché con la del CSV.
+
+    Returns:
+        Columnas que no coinciden
+    """
+    expected = pd.read_csv(raw_catalogs.catalog_path(name), comment="#")
+    actual = raw_catalogs.load_catalog(name)
+    if list(actual.columns) != list(expected.columns):
+        return ["<orden de columnas>"]
+
+    mismatched = []
+    for column in expected.columns:
+        if pd.api.types.is_numeric_dtype(expected[column]):
+            same = np.array_equal(
+                expected[column].to_numpy(dtype=np.float64),
+                actual[column].to_numpy(dtype=np.float64),
+                equal_nan=True
+            )
+        else:
+            same = (
+                expected[column].astype(object).where(expected[column].notna(), None).tolist() ==
+                actual[column].astype(object).where(actual[column].notna(), None).tolist()
+            )
+        if not same:
+            mismatched.append(column)
+    return mismatched
+
+
+# --------------------------------------------------------------------------
+# 3. COMPARACIÓN DE CARGA
+# --------------------------------------------------------------------------
+def best_time(load):
+    times = []
+    for _ in range(BENCHMARK_REPEATS):
+        started = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def benchmark(name):
+    """Tiempo de pd.read_csv frente a la caché (todas las columnas y solo dos)."""
+    path = raw_catalogs.catalog_path(name)
+    first_columns = raw_catalogs.load_catalog(name).columns[:2].tolist()
+    csv_s = best_time(lambda: pd.read_csv(path, comment="#"))
+    cache_s = best_time(lambda: raw_catalogs.load_catalog(name))
+    subset_s = best_time(lambda: raw_catalogs.load_catalog(name, columns=first_columns))
+    print(f"  {os.path.basename(path)}: read_csv {csv_s * 1000:.1f} ms, caché {cache_s * 1000:.1f} ms, "
+          f"caché con 2 columnas {subset_s * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte los catálogos crudos a la caché columnar")
+    parser.add_argument("catalogs", nargs="*", default=list(raw_catalogs.CATALOGS),
+                        help="Nombres de CATALOGS o rutas de CSV (por defecto todos)")
+    parser.add_argument("--benchmark", action="store_true", help="Comparar tiempos de carga con pd.read_csv")
+    args = parser.parse_args()
+
+    print("Convirtiendo catálogos crudos...")
+    for name in args.catalogs:
+        ingest(name)
+
+    print("Verificando contra pd.read_csv...")
+    failed = False
+    for name in args.catalogs:
+        mismatched = verify(name)
+        if mismatched:
+            failed = True
+            print(f"❌ {name}: columnas distintas del CSV: {mismatched}")
+    if failed:
+        sys.exit(1)
+    print("✅ Todas las columnas coinciden con el CSV")
+
+    if args.benchmark:
+        print("Comparando tiempos de carga...")
+        for name in args.catalogs:
+            benchmark(name)
+
+
+if __name__ == "__main__":
+    main()
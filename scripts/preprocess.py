@@ -1,48 +1,110 @@
+# scripts/preprocess.py
+
+"""
+Preprocesamiento del catálogo Kepler: limpieza, características de incertidumbre,
+imputación KNN y escalado, separado en entrenamiento (CONFIRMED / FALSE POSITIVE) y
+predicción (CANDIDATE).
+
+Además de los CSV de salida y de imputer.gz / scaler.gz, cada ejecución guarda las
+filas ya procesadas en data/processed/incremental/, identificadas por kepoi_name y un
+hash del contenido de la fila cruda. Cuando el Archive publica un Kepler.csv nuevo,
+solo las filas nuevas o modificadas pasan por características, imputación y escalado
+(con el imputer y el scaler ya ajustados); el resto se reutiliza del almacén.
+
+El imputer y el scaler solo se vuelven a ajustar (sobre todo el conjunto de
+entrenamiento, desde cero) según la política --refit:
+
+    auto     (por defecto) si no hay almacén, o si la población de entrenamiento
+             cambió más que los umbrales respecto de la del último ajuste: fracción
+             de filas nuevas, modificadas o eliminadas (--max-changed-fraction) o
+             desplazamiento de la media de alguna columna, en desviaciones estándar
+             del último ajuste (--max-mean-shift)
+    always   siempre (equivale al preprocesamiento completo de antes)
+    never    nunca; requiere un almacén previo
+
+La imputación usa el motor de api/utils/imputation.py en lugar de imputer.transform:
+da los mismos valores, reparte los bloques de filas entre procesos (--workers) y
+acota la memoria de cada bloque (--working-memory, en MiB, como el working_memory
+de sklearn; con otro valor el resultado es el de KNNImputer con ese working_memory).
+
+Uso:
+    python scripts/preprocess.py                  # incremental, con reajuste por deriva
+    python scripts/preprocess.py --refit always   # todo desde cero
+    python scripts/preprocess.py --refit always --workers 8 --working-memory 256
+"""
+
+import argparse
+import json
+import shutil
+import time
+
 import pandas as pd
 import numpy as np
 import os
+import sys
 import joblib
 from sklearn.preprocessing import StandardScaler
 from sklearn.impute import KNNImputer
 
 # --- 1. Configuración de Rutas ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+from api.utils.raw_catalogs import load_catalog
+from api.utils.preprocessing_artifacts import file_sha1
+from api.utils.imputation import KNNImputationEngine, parallel_transform
+
 RAW_DATA_PATH = os.path.join(BASE_DIR, "data", "raw", "Kepler.csv")
 PROCESSED_DATA_PATH = os.path.join(BASE_DIR, "data", "processed")
-os.makedirs(PROCESSED_DATA_PATH, exist_ok=True)
+TRAIN_SET_PATH = os.path.join(PROCESSED_DATA_PATH, "train_set")
+PREDICTION_SET_PATH = os.path.join(PROCESSED_DATA_PATH, "prediction_set")
+IMPUTER_PATH = os.path.join(PROCESSED_DATA_PATH, "imputer.gz")
+SCALER_PATH = os.path.join(PROCESSED_DATA_PATH, "scaler.gz")
+STORE_PATH = os.path.join(PROCESSED_DATA_PATH, "incremental")
+MANIFEST_FILENAME = "manifest.json"
 
-# --- 2. Carga y Limpieza Inicial ---
-print("Cargando datos crudos...")
-df = pd.read_csv(RAW_DATA_PATH, comment='#')
+# Versión del formato del almacén (cambiarla obliga a un reajuste completo)
+STORE_FORMAT_VERSION = 1
+
+# Umbrales por defecto de la política de reajuste "auto"
+MAX_CHANGED_FRACTION = 0.10
+MAX_MEAN_SHIFT = 0.10
 
-print("Realizando limpieza inicial...")
-columnas_a_eliminar = [
+COLUMNAS_A_ELIMINAR = [
     'kepler_name', 'koi_pdisposition',
     'koi_teq_err1', 'koi_teq_err2', 'koi_tce_delivname'
 ]
-df = df.drop(columns=columnas_a_eliminar, errors="ignore")
 
-# --- 3. Separación Lógica ---
-print("Separando datos en conjuntos de entrenamiento y predicción...")
-df_entrenamiento = df[df['koi_disposition'] != 'CANDIDATE'].copy()
-df_prediccion = df[df['koi_disposition'] == 'CANDIDATE'].copy()
+COLS_CON_INCERTIDUMBRE = [
+    "koi_period", "koi_time0bk", "koi_duration", "koi_depth", "koi_ror",
+    "koi_srad", "koi_steff", "koi_slogg", "koi_prad", "koi_insol"
+]
 
-# --- 4. Preparación de Datos (Separar IDs, Features y Target) ---
-print("Separando IDs, features y targets...")
+ETIQUETAS = {'CONFIRMED': 1, 'FALSE POSITIVE': 0}
 
-kepid_train = df_entrenamiento['kepid'].copy()
-y_train = df_entrenamiento['koi_disposition'].map({'CONFIRMED': 1, 'FALSE POSITIVE': 0})
-X_train = df_entrenamiento.drop(columns=['kepid', 'koi_disposition'])
 
-kepid_predict = df_prediccion['kepid'].copy()
-X_predict = df_prediccion.drop(columns=['kepid', 'koi_disposition'])
+# --- 2. Carga y Limpieza Inicial ---
+def cargar_catalogo(path=RAW_DATA_PATH):
+    print("Cargando datos crudos...")
+    df = load_catalog(path, upcast_floats=True)
 
-# --- 5. Ingeniería de Características (Incertidumbres) ---
-cols_con_incertidumbre = [
-    "koi_period", "koi_time0bk", "koi_duration", "koi_depth", "koi_ror",
-    "koi_srad", "koi_steff", "koi_slogg", "koi_prad", "koi_insol"
-]
+    print("Realizando limpieza inicial...")
+    df = df.drop(columns=COLUMNAS_A_ELIMINAR, errors="ignore")
+    return df.reset_index(drop=True)
 
+
+def hashes_de_filas(df):
+    """Hash (uint64) del contenido de cada fila cruda, independiente de los tipos de la caché."""
+    normalizado = pd.DataFrame({
+        col: (
+            df[col].to_numpy(dtype=np.float64) if pd.api.types.is_numeric_dtype(df[col])
+            else df[col].astype(object).where(df[col].notna(), None)
+        )
+        for col in df.columns
+    })
+    return pd.util.hash_pandas_object(normalizado, index=False).to_numpy()
+
+
+# --- 3. Ingeniería de Características (Incertidumbres) ---
 def generar_cols_incertidumbre(df, cols):
     for col in cols:
         err1 = f"{col}_err1"
@@ -55,61 +117,292 @@ def generar_cols_incertidumbre(df, cols):
             df.drop(columns=[err1, err2], inplace=True)
     return df
 
-print("Generando columnas de incertidumbre...")
-X_train = generar_cols_incertidumbre(X_train, cols_con_incertidumbre)
-X_predict = generar_cols_incertidumbre(X_predict, cols_con_incertidumbre)
 
-X_predict = X_predict[X_train.columns]
+def preparar_features(df):
+    """Features (sin kepid ni koi_disposition) con las columnas de incertidumbre."""
+    return generar_cols_incertidumbre(df.drop(columns=['kepid', 'koi_disposition']), COLS_CON_INCERTIDUMBRE)
 
-# --- 6. Preprocesamiento (Imputación y Escalado) ---
 
-# Seleccionar solo columnas numéricas para imputar
-columnas_numericas = X_train.select_dtypes(include=[np.number]).columns.tolist()
+# --- 4. Preprocesamiento (Imputación y Escalado) ---
+def imputar(X, columnas_numericas, engine, workers=None, working_memory=None):
+    """
+    Imputa las columnas numéricas de X con el motor del imputer: mismo resultado que
+    imputer.transform, repartido en `workers` procesos y con bloques de
+    `working_memory` MiB (ver api/utils/imputation.py).
+    """
+    return parallel_transform(engine, X[columnas_numericas].to_numpy(dtype=np.float64), workers, working_memory)
 
-imputer = KNNImputer(n_neighbors=5)
-print("Ajustando y aplicando KNN Imputer...")
 
-# Imputar solo en columnas numéricas
-X_train_num_imputed = imputer.fit_transform(X_train[columnas_numericas])
-X_predict_num_imputed = imputer.transform(X_predict[columnas_numericas])
+def ajustar(X_train, columnas_numericas, workers=None, working_memory=None):
+    """Ajusta el imputer y el scaler sobre todo el conjunto de entrenamiento."""
+    print("Ajustando KNN Imputer...")
+    imputer = KNNImputer(n_neighbors=5).fit(X_train[columnas_numericas])
+    engine = KNNImputationEngine.from_sklearn(imputer)
+    X_train_num_imputed = imputar(X_train, columnas_numericas, engine, workers, working_memory)
 
-# Reconstruir DataFrames imputados solo en columnas numéricas
-X_train_imputed = X_train.copy()
-X_train_imputed[columnas_numericas] = X_train_num_imputed
+    scaler = StandardScaler()
+    print("Ajustando StandardScaler...")
+    scaler.fit(pd.DataFrame(X_train_num_imputed, columns=columnas_numericas, index=X_train.index))
+    return imputer, engine, scaler
 
-X_predict_imputed = X_predict.copy()
-X_predict_imputed[columnas_numericas] = X_predict_num_imputed
 
-scaler = StandardScaler()
-print("Ajustando y aplicando StandardScaler...")
-X_train_scaled = scaler.fit_transform(X_train_imputed[columnas_numericas])
-X_predict_scaled = scaler.transform(X_predict_imputed[columnas_numericas])
+def transformar(X, columnas_numericas, engine, scaler, workers=None, working_memory=None):
+    """Imputa y escala las columnas numéricas de X (el resto se copia tal cual)."""
+    X_processed = X.copy()
+    if len(X) == 0:
+        return X_processed
+    X_imputed = pd.DataFrame(
+        imputar(X, columnas_numericas, engine, workers, working_memory),
+        columns=columnas_numericas, index=X.index
+    )
+    X_processed[columnas_numericas] = scaler.transform(X_imputed)
+    return X_processed
 
-X_train_processed = X_train_imputed.copy()
-X_train_processed[columnas_numericas] = X_train_scaled
 
-X_predict_processed = X_predict_imputed.copy()
-X_predict_processed[columnas_numericas] = X_predict_scaled
+# --- 5. Almacén de filas procesadas ---
+def leer_almacen(store_path=STORE_PATH):
+    """Almacén de la ejecución anterior, o None si no existe o su formato es otro."""
+    try:
+        with open(os.path.join(store_path, MANIFEST_FILENAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format_version") != STORE_FORMAT_VERSION:
+        return None
+    arrays = {
+        name: np.load(os.path.join(store_path, f"{name}.npy"))
+        for name in ("keys", "hashes", "kepid", "labels", "values", "fit_keys", "fit_hashes")
+    }
+    return dict(manifest, **arrays)
 
-# --- 7. Re-unir IDs ---
-print("Re-uniendo IDs a los datos procesados...")
-X_train_processed.insert(0, 'kepid', kepid_train.reset_index(drop=True))
-X_predict_processed.insert(0, 'kepid', kepid_predict.reset_index(drop=True))
 
-# --- 8. Guardar Archivos ---
-TRAIN_SET_PATH = os.path.join(PROCESSED_DATA_PATH, "train_set")
-PREDICTION_SET_PATH = os.path.join(PROCESSED_DATA_PATH, "prediction_set")
-os.makedirs(TRAIN_SET_PATH, exist_ok=True)
-os.makedirs(PREDICTION_SET_PATH, exist_ok=True)
+def guardar_almacen(store, store_path=STORE_PATH):
+    """Escribe el almacén en un directorio temporal y lo reemplaza de una vez."""
+    tmp_path = f"{store_path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    manifest = {}
+    for name, value in store.items():
+        if isinstance(value, np.ndarray):
+            np.save(os.path.join(tmp_path, f"{name}.npy"), value)
+        else:
+            manifest[name] = value
+    with open(os.path.join(tmp_path, MANIFEST_FILENAME), "w") as f:
+        json.dump(dict(manifest, format_version=STORE_FORMAT_VERSION), f)
+
+    old_path = f"{store_path}.{os.getpid()}.old"
+    if os.path.exists(store_path):
+        os.rename(store_path, old_path)
+    os.rename(tmp_path, store_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def columnas_de_deriva(df):
+    """Columnas numéricas crudas con las que se mide la deriva de la población."""
+    return [col for col in df.columns if col != 'kepid' and pd.api.types.is_numeric_dtype(df[col])]
+
+
+def estadisticas(df, columnas):
+    valores = df[columnas].to_numpy(dtype=np.float64)
+    return np.nanmean(valores, axis=0), np.nanstd(valores, axis=0)
+
+
+# --- 6. Política de reajuste ---
+def decidir_reajuste(policy, store, df, es_train, hashes, max_changed_fraction, max_mean_shift):
+    """
+    Decide si hay que volver a ajustar el imputer y el scaler.
+
+    Returns:
+        (reajustar, motivo)
+
+    Raises:
+        ValueError: Si la política es "never" y no hay un almacén válido
+    """
+    artefactos_vigentes = (
+        store is not None and
+        os.path.exists(IMPUTER_PATH) and os.path.exists(SCALER_PATH) and
+        store["imputer_sha1"] == file_sha1(IMPUTER_PATH) and
+        store["scaler_sha1"] == file_sha1(SCALER_PATH)
+    )
+    if policy == "always":
+        return True, "reajuste forzado (--refit always)"
+    if store is None:
+        if policy == "never":
+            raise ValueError("No hay almacén incremental previo; ejecute con --refit always o auto")
+        return True, "no hay almacén incremental previo"
+    if not artefactos_vigentes:
+        if policy == "never":
+            raise ValueError("imputer.gz / scaler.gz no son los del almacén; ejecute con --refit always o auto")
+        return True, "imputer.gz / scaler.gz cambiaron fuera de este script"
+    if policy == "never":
+        return False, "reajuste desactivado (--refit never)"
+
+    # Cambios en la población de entrenamiento respecto de la del último ajuste
+    ajuste = dict(zip(store["fit_keys"].tolist(), store["fit_hashes"].tolist()))
+    actual = dict(zip(df.loc[es_train, 'kepoi_name'].astype(str).tolist(), hashes[es_train].tolist()))
+    cambiadas = sum(1 for key, h in actual.items() if ajuste.get(key) != h)
+    eliminadas = sum(1 for key in ajuste if key not in actual)
+    fraccion = (cambiadas + eliminadas) / max(len(ajuste), 1)
+    if fraccion > max_changed_fraction:
+        return True, f"{fraccion:.1%} de la población de entrenamiento cambió (umbral {max_changed_fraction:.1%})"
+
+    media, _ = estadisticas(df[es_train], store["drift_columns"])
+    media_ajuste = np.asarray(store["fit_mean"], dtype=np.float64)
+    std_ajuste = np.asarray(store["fit_std"], dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        desplazamiento = np.where(std_ajuste > 0, np.abs(media - media_ajuste) / std_ajuste, 0.0)
+    desplazamiento = np.nan_to_num(desplazamiento)
+    peor = int(np.argmax(desplazamiento))
+    if desplazamiento[peor] > max_mean_shift:
+        return True, (
+            f"la media de {store['drift_columns'][peor]} se desplazó {desplazamiento[peor]:.2f} "
+            f"desviaciones estándar (umbral {max_mean_shift:.2f})"
+        )
+    return False, (
+        f"población de entrenamiento estable ({fraccion:.1%} de filas cambiadas, "
+        f"desplazamiento máximo {desplazamiento[peor]:.2f} desviaciones estándar)"
+    )
+
+
+# --- 7. Ejecución ---
+def preprocesar(
+    policy="auto",
+    max_changed_fraction=MAX_CHANGED_FRACTION,
+    max_mean_shift=MAX_MEAN_SHIFT,
+    workers=None,
+    working_memory=None
+):
+    started = time.time()
+    df = cargar_catalogo()
+
+    print("Separando datos en conjuntos de entrenamiento y predicción...")
+    es_train = (df['koi_disposition'] != 'CANDIDATE').to_numpy()
+    keys = df['kepoi_name'].astype(str).to_numpy(dtype=str)
+    if len(set(keys)) != len(keys):
+        raise ValueError("kepoi_name no es único en el catálogo; no se pueden identificar las filas")
+    hashes = hashes_de_filas(df)
+
+    store = leer_almacen()
+    reajustar, motivo = decidir_reajuste(
+        policy, store, df, es_train, hashes, max_changed_fraction, max_mean_shift
+    )
+    print(f"{'Reajuste completo' if reajustar else 'Modo incremental'}: {motivo}")
+
+    # Filas que hay que procesar: todas si se reajusta; si no, solo las nuevas o modificadas
+    previa = np.full(len(df), -1, dtype=np.int64)
+    eliminadas = 0
+    if not reajustar:
+        anteriores = {
+            key: (i, h) for i, (key, h) in enumerate(zip(store["keys"].tolist(), store["hashes"].tolist()))
+        }
+        for i, (key, h) in enumerate(zip(keys.tolist(), hashes.tolist())):
+            anterior = anteriores.get(key)
+            if anterior is not None and anterior[1] == h:
+                previa[i] = anterior[0]
+        eliminadas = len(set(anteriores) - set(keys.tolist()))
+    pendientes = previa < 0
+    print(f"Filas: {len(df)} | a procesar: {int(pendientes.sum())} | "
+          f"reutilizadas: {int((~pendientes).sum())} | eliminadas: {eliminadas}")
+
+    print("Generando columnas de incertidumbre...")
+    X_nuevas = preparar_features(df[pendientes])
+    if reajustar:
+        X_train = X_nuevas[es_train[pendientes]]
+        columnas = X_train.columns.tolist()
+        columnas_numericas = X_train.select_dtypes(include=[np.number]).columns.tolist()
+        imputer, engine, scaler = ajustar(X_train, columnas_numericas, workers, working_memory)
+    else:
+        columnas = store["columns"]
+        columnas_numericas = store["numeric_columns"]
+        imputer = joblib.load(IMPUTER_PATH)
+        scaler = joblib.load(SCALER_PATH)
+        engine = KNNImputationEngine.from_sklearn(imputer)
+        X_nuevas = X_nuevas[columnas]
+
+    print("Aplicando KNN Imputer y StandardScaler...")
+    X_nuevas_processed = transformar(X_nuevas, columnas_numericas, engine, scaler, workers, working_memory)
+
+    # Valores procesados de todas las filas: nuevas + reutilizadas del almacén
+    valores = np.empty((len(df), len(columnas_numericas)), dtype=np.float64)
+    valores[pendientes] = X_nuevas_processed[columnas_numericas].to_numpy(dtype=np.float64)
+    if (~pendientes).any():
+        valores[~pendientes] = store["values"][previa[~pendientes]]
+
+    etiquetas = df['koi_disposition'].astype(str).map(ETIQUETAS)
+    X_processed = pd.DataFrame(valores, columns=columnas_numericas)
+    X_processed['kepoi_name'] = keys
+    X_processed = X_processed[columnas]
+    X_processed.insert(0, 'kepid', df['kepid'].to_numpy())
+
+    # --- 8. Guardar Archivos ---
+    os.makedirs(TRAIN_SET_PATH, exist_ok=True)
+    os.makedirs(PREDICTION_SET_PATH, exist_ok=True)
+
+    print("Guardando archivos procesados...")
+    X_train_processed = X_processed[es_train].reset_index(drop=True)
+    y_train = df.loc[es_train, 'koi_disposition'].astype(str).map(ETIQUETAS).reset_index(drop=True)
+    X_predict_processed = X_processed[~es_train].reset_index(drop=True)
+    X_train_processed.to_csv(os.path.join(TRAIN_SET_PATH, "X_train.csv"), index=False)
+    y_train.to_csv(os.path.join(TRAIN_SET_PATH, "y_train.csv"), index=False)
+    X_predict_processed.to_csv(os.path.join(PREDICTION_SET_PATH, "X_predict.csv"), index=False)
+
+    if reajustar:
+        joblib.dump(scaler, SCALER_PATH)
+        joblib.dump(imputer, IMPUTER_PATH)
+        drift_columns = columnas_de_deriva(df)
+        fit_mean, fit_std = estadisticas(df[es_train], drift_columns)
+        ajuste = {
+            "fit_keys": keys[es_train],
+            "fit_hashes": hashes[es_train],
+            "drift_columns": drift_columns,
+            "fit_mean": fit_mean.tolist(),
+            "fit_std": fit_std.tolist(),
+            "fitted_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }
+    else:
+        ajuste = {name: store[name] for name in (
+            "fit_keys", "fit_hashes", "drift_columns", "fit_mean", "fit_std", "fitted_at"
+        )}
+
+    guardar_almacen(dict(
+        ajuste,
+        keys=keys,
+        hashes=hashes,
+        kepid=df['kepid'].to_numpy(dtype=np.int64),
+        labels=etiquetas.fillna(-1).to_numpy(dtype=np.int8),
+        values=valores,
+        columns=columnas,
+        numeric_columns=columnas_numericas,
+        imputer_sha1=file_sha1(IMPUTER_PATH),
+        scaler_sha1=file_sha1(SCALER_PATH)
+    ))
+
+    print("\n✅ Preprocesamiento completado!")
+    print(f"Archivos de entrenamiento guardados: {X_train_processed.shape}, {y_train.shape}")
+    print(f"Archivos de predicción guardados: {X_predict_processed.shape}")
+    print(f"Tiempo total: {time.time() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocesamiento (incremental) del catálogo Kepler")
+    parser.add_argument("--refit", choices=["auto", "always", "never"], default="auto",
+                        help="Cuándo volver a ajustar imputer y scaler")
+    parser.add_argument("--max-changed-fraction", type=float, default=MAX_CHANGED_FRACTION,
+                        help="Fracción de la población de entrenamiento cambiada que provoca un reajuste (auto)")
+    parser.add_argument("--max-mean-shift", type=float, default=MAX_MEAN_SHIFT,
+                        help="Desplazamiento de media, en desviaciones estándar, que provoca un reajuste (auto)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos para la imputación KNN (por defecto uno por CPU)")
+    parser.add_argument("--working-memory", type=float, default=None,
+                        help="MiB por bloque de distancias de la imputación (por defecto el de sklearn, 1024)")
+    args = parser.parse_args()
 
-print("Guardando archivos procesados...")
-X_train_processed.to_csv(os.path.join(TRAIN_SET_PATH, "X_train.csv"), index=False)
-y_train.to_csv(os.path.join(TRAIN_SET_PATH, "y_train.csv"), index=False)
-X_predict_processed.to_csv(os.path.join(PREDICTION_SET_PATH, "X_predict.csv"), index=False)
+    try:
+        preprocesar(args.refit, args.max_changed_fraction, args.max_mean_shift, args.workers, args.working_memory)
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
 
-joblib.dump(scaler, os.path.join(PROCESSED_DATA_PATH, "scaler.gz"))
-joblib.dump(imputer, os.path.join(PROCESSED_DATA_PATH, "imputer.gz"))
 
-print("\n✅ Preprocesamiento completado!")
-print(f"Archivos de entrenamiento guardados: {X_train_processed.shape}, {y_train.shape}")
-print(f"Archivos de predicción guardados: {X_predict_processed.shape}")
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,55 @@
-# model/train/generate_judge_data.py
+# scripts/preprocess_judge.py
+
+"""
+Genera el conjunto de entrenamiento del Juez (judge_set) con scores fuera de la
+partición (out-of-fold).
+
+Antes el juez aprendía de los scores que los especialistas finales dan a las mismas
+filas con las que se entrenaron, que son demasiado optimistas. Ahora las filas de
+X_train.csv se reparten en --folds particiones estratificadas; para cada una se
+entrenan los especialistas con el resto de filas (con la receta de
+train_specialists.py: 20% de validación para el early stopping y la mejor época) y
+se puntúan las filas de la partición. Cada fila recibe el score de modelos que no
+la vieron.
+
+Las particiones se entrenan en paralelo en un pool de procesos (fork: heredan los
+datos), con los especialistas juntos como un modelo agrupado cuando comparten
+hiperparámetros. Los modelos de cada partición se guardan en
+outputs/training/judge_folds/fold_<k>.pt con una huella de todo lo que los define
+(datos, filas de la partición, columnas, hiperparámetros, épocas y semilla): si
+nada cambió se reutilizan y la partición no se vuelve a entrenar.
+
+--in-sample conserva el comportamiento anterior (scores de los pesos de outputs/weights).
+
+Uso:
+    python scripts/preprocess_judge.py                      # 5 particiones, todos los núcleos
+    python scripts/preprocess_judge.py --folds 10 --workers 4
+    python scripts/preprocess_judge.py --in-sample
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 import numpy as np
 import torch
 import os
 import sys
+from sklearn.model_selection import StratifiedKFold, train_test_split
 
 # --- Añadir la ruta del proyecto al path ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 
 # --- Importar TODAS las arquitecturas y configuraciones ---
-from model.train.train_specialists import SPECIALIST_CONFIG
+from model.train.train_specialists import (
+    SPECIALIST_CONFIG, MAX_EPOCHS, PATIENCE, fit_grouped, fit_specialist, init_worker, shared_hyperparams
+)
+from model.architecture.m_common import hidden_sizes_from_state_dict
 
 # --------------------------------------------------------------------------
 # 1. CONFIGURACIÓN
@@ -20,67 +58,259 @@ PROCESSED_BASE_PATH = os.path.join(BASE_DIR, "data", "processed")
 TRAIN_PATH = os.path.join(PROCESSED_BASE_PATH, "train_set")
 WEIGHTS_PATH = os.path.join(BASE_DIR, "outputs", "weights")
 JUDGE_DATA_PATH = os.path.join(PROCESSED_BASE_PATH, "judge_set")
-os.makedirs(JUDGE_DATA_PATH, exist_ok=True)
+FOLD_CACHE_PATH = os.path.join(BASE_DIR, "outputs", "training", "judge_folds")
+
+# Particiones de los scores out-of-fold
+N_FOLDS = 5
 
 # --------------------------------------------------------------------------
 # 2. FUNCIÓN AUXILIAR PARA OBTENER SCORES
 # --------------------------------------------------------------------------
+def specialist_scores(model, features):
+    """Scores (sigmoide de la salida) de un especialista para sus columnas."""
+    model.eval()
+    with torch.no_grad():
+        logits = model(torch.tensor(features, dtype=torch.float32))
+        return torch.sigmoid(logits).numpy().flatten()
+
+
 def get_specialist_scores(specialist_name, full_data):
     """Carga un especialista, procesa los datos y devuelve sus scores."""
     print(f"Procesando con el especialista: '{specialist_name}'...")
-    
+
     # Obtener configuración del especialista
     config = SPECIALIST_CONFIG[specialist_name]
     model_class = config['model_class']
     feature_columns = config['feature_columns']
     model_filename = config['output_filename']
-    
-    # Preparar datos de entrada para este especialista
-    specialist_data = full_data[feature_columns].values
-    specialist_tensor = torch.tensor(specialist_data, dtype=torch.float32)
-    
+
     # Cargar modelo y pesos
     input_features = len(feature_columns)
-    model = model_class(input_features=input_features)
-    model.load_state_dict(torch.load(os.path.join(WEIGHTS_PATH, model_filename)))
-    model.eval()
-    
-    # Obtener scores
-    with torch.no_grad():
-        logits = model(specialist_tensor)
-        scores = torch.sigmoid(logits).numpy().flatten()
-        
-    return scores
+    state = torch.load(os.path.join(WEIGHTS_PATH, model_filename))
+    model = model_class(input_features=input_features, hidden_sizes=hidden_sizes_from_state_dict(state))
+    model.load_state_dict(state)
+
+    return specialist_scores(model, full_data[feature_columns].values)
 
 # --------------------------------------------------------------------------
-# 3. BUCLE PRINCIPAL
+# 3. MODELOS POR PARTICIÓN (en los workers)
 # --------------------------------------------------------------------------
-if __name__ == "__main__":
+# Datos que heredan los workers (fork); solo se leen
+_shared = {}
+
+
+def fold_fingerprint(X_full, y_full, names, max_epochs, patience, seed):
+    """
+    Huella de lo que comparten todas las particiones: datos, especialistas (columnas,
+    arquitectura e hiperparámetros) y parámetros del entrenamiento.
+    """
+    digest = hashlib.sha1()
+    for name in names:
+        config = SPECIALIST_CONFIG[name]
+        digest.update(json.dumps([
+            name, config['model_class'].__name__, list(config['feature_columns']),
+            config['learning_rate'], config['batch_size'], list(config['hidden_sizes'])
+        ]).encode())
+        digest.update(np.ascontiguousarray(X_full[config['feature_columns']].values, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y_full, dtype=np.float64).tobytes())
+    digest.update(json.dumps([max_epochs, patience, seed]).encode())
+    return digest.hexdigest()
+
+
+def _fold_models(fold, train_idx, seed, max_epochs, patience):
+    """Entrena los especialistas con las filas train_idx; devuelve sus pesos por nombre."""
+    X_full, y_full, names = _shared["X"], _shared["y"], _shared["names"]
+    configs = [SPECIALIST_CONFIG[name] for name in names]
+    torch.manual_seed(seed + fold)
+
+    # Validación interna (early stopping y mejor época), como en train_specialist
+    fit_idx, val_idx = train_test_split(train_idx, test_size=0.2, random_state=42, stratify=y_full[train_idx])
+    feature_sets = [X_full[config['feature_columns']].values for config in configs]
+    options = dict(max_epochs=max_epochs, patience=patience, log_every=0)
+
+    if len(names) > 1 and shared_hyperparams(configs) is not None:
+        models, result = fit_grouped(
+            names, configs,
+            [features[fit_idx] for features in feature_sets], y_full[fit_idx],
+            [features[val_idx] for features in feature_sets], y_full[val_idx],
+            **options
+        )
+        epochs = result["epochs"]
+    else:
+        models, epochs = [], 0
+        for name, config, features in zip(names, configs, feature_sets):
+            model, result = fit_specialist(
+                name, config, features[fit_idx], y_full[fit_idx], features[val_idx], y_full[val_idx], **options
+            )
+            models.append(model)
+            epochs = max(epochs, result["epochs"])
+    return {name: model.state_dict() for name, model in zip(names, models)}, epochs
+
+
+def run_fold(task):
+    """
+    Scores out-of-fold de una partición: reutiliza sus modelos de la caché si la
+    huella coincide y si no los entrena (y los guarda).
+
+    Args:
+        task: (fold, train_idx, test_idx, fingerprint, seed, max_epochs, patience, cache_path)
+
+    Returns:
+        {fold, test_idx, scores (por especialista), cached, epochs, seconds}
+    """
+    fold, train_idx, test_idx, fingerprint, seed, max_epochs, patience, cache_path = task
+    started = time.time()
+    key = hashlib.sha1(fingerprint.encode() + np.ascontiguousarray(train_idx, dtype=np.int64).tobytes()).hexdigest()
+    path = os.path.join(cache_path, f"fold_{fold}.pt") if cache_path else None
+
+    cached = None
+    if path and os.path.exists(path):
+        cached = torch.load(path, map_location="cpu", weights_only=False)
+        if cached.get("key") != key:
+            cached = None
+
+    if cached is None:
+        states, epochs = _fold_models(fold, train_idx, seed, max_epochs, patience)
+        cached = {"key": key, "states": states, "epochs": epochs}
+        if path:
+            os.makedirs(cache_path, exist_ok=True)
+            torch.save(cached, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+        from_cache = False
+    else:
+        from_cache = True
+
+    scores = {}
+    for name, state in cached["states"].items():
+        config = SPECIALIST_CONFIG[name]
+        model = config['model_class'](input_features=len(config['feature_columns']),
+                                      hidden_sizes=hidden_sizes_from_state_dict(state))
+        model.load_state_dict(state)
+        scores[name] = specialist_scores(model, _shared["X"][config['feature_columns']].values[test_idx])
+
+    return {
+        "fold": fold,
+        "test_idx": test_idx,
+        "scores": scores,
+        "cached": from_cache,
+        "epochs": cached["epochs"],
+        "seconds": time.time() - started
+    }
+
+# --------------------------------------------------------------------------
+# 4. CONJUNTO DEL JUEZ
+# --------------------------------------------------------------------------
+def build_judge_set(X_full, y_full, folds=N_FOLDS, workers=1, max_epochs=MAX_EPOCHS, patience=PATIENCE,
+                    seed=0, cache_path=FOLD_CACHE_PATH):
+    """
+    Scores out-of-fold de todos los especialistas para cada fila de X_full.
+
+    Args:
+        X_full: Características de entrenamiento (todas las columnas)
+        y_full: Etiquetas (array 1D)
+        folds: Particiones estratificadas
+        workers: Procesos (1 = en el proceso actual)
+        max_epochs: Máximo de épocas de los modelos de cada partición
+        patience: Paciencia del early stopping (0 = sin early stopping)
+        seed: Semilla de las particiones y de la inicialización de los modelos
+        cache_path: Directorio de la caché de modelos por partición (None = sin caché)
+
+    Returns:
+        (DataFrame X_judge con una columna score_<especialista>, resumen por partición)
+
+    Raises:
+        ValueError: Si folds < 2
+    """
+    if folds < 2:
+        raise ValueError("Se necesitan al menos 2 particiones")
+    names = list(SPECIALIST_CONFIG)
+    fingerprint = fold_fingerprint(X_full, y_full, names, max_epochs, patience, seed)
+    splits = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(np.zeros(len(y_full)), y_full)
+    tasks = [
+        (fold, train_idx, test_idx, fingerprint, seed, max_epochs, patience, cache_path)
+        for fold, (train_idx, test_idx) in enumerate(splits)
+    ]
+
+    workers = max(1, min(workers, folds))
+    _shared.update(X=X_full, y=np.asarray(y_full), names=names)
+    try:
+        if workers == 1:
+            results = [run_fold(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=init_worker,
+                initargs=(max(1, (os.cpu_count() or 1) // workers),)
+            ) as pool:
+                results = list(pool.map(run_fold, tasks))
+    finally:
+        _shared.clear()
+
+    scores = {name: np.zeros(len(y_full), dtype=np.float32) for name in names}
+    for result in results:
+        for name in names:
+            scores[name][result["test_idx"]] = result["scores"][name]
+    X_judge = pd.DataFrame({f'score_{name}': scores[name] for name in names})
+    summary = [{key: result[key] for key in ("fold", "cached", "epochs", "seconds")} for result in results]
+    return X_judge, summary
+
+# --------------------------------------------------------------------------
+# 5. BUCLE PRINCIPAL
+# --------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Generación del conjunto de entrenamiento del Juez")
+    parser.add_argument("--folds", type=int, default=N_FOLDS, help="Particiones de los scores out-of-fold")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Particiones en paralelo")
+    parser.add_argument("--max-epochs", type=int, default=MAX_EPOCHS, help="Máximo de épocas por partición")
+    parser.add_argument("--patience", type=int, default=PATIENCE,
+                        help="Épocas sin mejorar antes de detener (0 = sin early stopping)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-cache", action="store_true", help="No leer ni guardar los modelos por partición")
+    parser.add_argument("--in-sample", action="store_true",
+                        help="Scores de los pesos finales sobre sus propias filas de entrenamiento (lo anterior)")
+    args = parser.parse_args()
+
     print("Iniciando la generación de datos para el Juez...")
-    
+    started = time.time()
+
     # Cargar el dataset de entrenamiento completo
     X_train_full = pd.read_csv(os.path.join(TRAIN_PATH, "X_train.csv"))
     y_train_full = pd.read_csv(os.path.join(TRAIN_PATH, "y_train.csv"))
 
-    # Crear un nuevo DataFrame para los scores que alimentarán al Juez
-    X_judge = pd.DataFrame()
+    if args.in_sample:
+        X_judge = pd.DataFrame()
+        for name in SPECIALIST_CONFIG.keys():
+            X_judge[f'score_{name}'] = get_specialist_scores(name, X_train_full)
+    else:
+        try:
+            X_judge, summary = build_judge_set(
+                X_train_full, y_train_full.values.flatten(), args.folds, args.workers, args.max_epochs,
+                args.patience, args.seed, None if args.no_cache else FOLD_CACHE_PATH
+            )
+        except ValueError as e:
+            print(f"❌ {str(e)}")
+            sys.exit(1)
+        for fold in summary:
+            origin = "en caché" if fold["cached"] else f"entrenada, {fold['epochs']} épocas"
+            print(f"  Partición {fold['fold']}: {fold['seconds']:.1f}s ({origin})")
 
-    # Iterar sobre cada especialista para obtener sus scores
-    for name in SPECIALIST_CONFIG.keys():
-        scores = get_specialist_scores(name, X_train_full)
-        X_judge[f'score_{name}'] = scores
-        
     # Las etiquetas (y) siguen siendo las mismas
     y_judge = y_train_full
-    
+
     # Guardar el nuevo dataset para el Juez
+    os.makedirs(JUDGE_DATA_PATH, exist_ok=True)
     X_judge_path = os.path.join(JUDGE_DATA_PATH, "X_judge.csv")
     y_judge_path = os.path.join(JUDGE_DATA_PATH, "y_judge.csv")
-    
+
     X_judge.to_csv(X_judge_path, index=False)
     y_judge.to_csv(y_judge_path, index=False)
-    
+
     print("\n--- Vista previa de los datos del Juez (X_judge.csv): ---")
     print(X_judge.head())
-    
-    print(f"\n✅ ¡Datos para el Juez generados y guardados en '{JUDGE_DATA_PATH}'!")
\ No newline at end of file
+
+    print(f"\n✅ ¡Datos para el Juez generados y guardados en '{JUDGE_DATA_PATH}' ({time.time() - started:.1f}s)!")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 # scripts/upload_to_supabase.py (Final Version with kepoi_name)
 
-import pandas as pd
 from supabase import create_client, Client
 import os
+import sys
 import numpy as np
 
 # --- CONFIGURATION ---
@@ -13,6 +13,8 @@ SUPABASE_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpc3MiOiJzdXBhYmFzZSIsInJ
 # Path to the CSV file
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW_DATA_PATH = os.path.join(BASE_DIR, "data", "raw", "Kepler.csv")
+sys.path.append(BASE_DIR)
+from api.utils.raw_catalogs import load_catalog
 
 # --- SCRIPT ---
 print("Connecting to Supabase...")
@@ -20,7 +22,21 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 print("Connection successful.")
 
 print("Loading and filtering Kepler data...")
-df = pd.read_csv(RAW_DATA_PATH, comment='#')
+# --- FINAL CORRECTION: Add 'kepoi_name' to the list ---
+columnas_a_subir = [
+    'kepid', 'kepoi_name', # <-- ADDED kepoi_name HERE
+    'koi_period', 'koi_period_err1', 'koi_period_err2', 'koi_time0bk',
+    'koi_time0bk_err1', 'koi_time0bk_err2', 'koi_impact', 'koi_duration',
+    'koi_duration_err1', 'koi_duration_err2', 'koi_depth', 'koi_depth_err1',
+    'koi_depth_err2', 'koi_prad', 'koi_prad_err1', 'koi_prad_err2', 'koi_teq',
+    'koi_insol', 'koi_insol_err1', 'koi_insol_err2', 'koi_model_snr', 'koi_steff',
+    'koi_steff_err1', 'koi_steff_err2', 'koi_slogg', 'koi_slogg_err1',
+    'koi_slogg_err2', 'koi_srad', 'koi_srad_err1', 'koi_srad_err2', 'ra',
+    'dec', 'koi_kepmag', 'koi_fpflag_nt', 'koi_fpflag_ss', 'koi_fpflag_co', 'koi_fpflag_ec'
+]
+
+# Only memory-map the columns we upload plus the disposition
+df = load_catalog(RAW_DATA_PATH, columns=['koi_disposition'] + columnas_a_subir)
 candidates_df = df[df['koi_disposition'] == 'CANDIDATE'].copy()
 
 # --- DATA CLEANING ---
@@ -36,19 +52,7 @@ else:
     print("No duplicate candidates found.")
 # -------------------------
 
-# --- FINAL CORRECTION: Add 'kepoi_name' to the list ---
-columnas_a_subir = [
-    'kepid', 'kepoi_name', # <-- ADDED kepoi_name HERE
-    'koi_period', 'koi_period_err1', 'koi_period_err2', 'koi_time0bk',
-    'koi_time0bk_err1', 'koi_time0bk_err2', 'koi_impact', 'koi_duration',
-    'koi_duration_err1', 'koi_duration_err2', 'koi_depth', 'koi_depth_err1',
-    'koi_depth_err2', 'koi_prad', 'koi_prad_err1', 'koi_prad_err2', 'koi_teq',
-    'koi_insol', 'koi_insol_err1', 'koi_insol_err2', 'koi_model_snr', 'koi_steff',
-    'koi_steff_err1', 'koi_steff_err2', 'koi_slogg', 'koi_slogg_err1',
-    'koi_slogg_err2', 'koi_srad', 'koi_srad_err1', 'koi_srad_err2', 'ra',
-    'dec', 'koi_kepmag', 'koi_fpflag_nt', 'koi_fpflag_ss', 'koi_fpflag_co', 'koi_fpflag_ec'
-]
-candidates_df = candidates_df[columnas_a_subir]
+candidates_df = candidates_df[columnas_a_subir].astype(object)
 
 # Replace NaN with None for JSON compatibility
 candidates_df = candidates_df.replace(np.nan, None)